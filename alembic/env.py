@@ -19,8 +19,9 @@ from app.models import User, Calculation, CalculationType
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. Skipped when app.migrations runs
+# the upgrade inside the app process, whose logging is already set up.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -0,0 +1,81 @@
+"""Hash-partition calculations on user_id (Postgres only)
+
+Revision ID: 3f8a6c2e9b17
+Revises:
+Create Date: 2026-10-19 12:00:00.000000
+
+Opt-in: this is the root of its own branch, "partitioning", so
+`alembic upgrade main@head` (and app.migrations) never runs it. Apply it
+with `alembic upgrade partitioning@head`; it needs the main chain at
+7c2d9e1f4a3b or later.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a6c2e9b17'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = ('partitioning',)
+depends_on: Union[str, Sequence[str], None] = '7c2d9e1f4a3b'
+
+# Initial partition count; `python -m app.partitioning split` doubles a
+# partition later without touching the others.
+PARTITIONS = 16
+
+COLUMNS = """
+    id INTEGER NOT NULL DEFAULT nextval('calculations_id_seq'),
+    a FLOAT NOT NULL,
+    b FLOAT NOT NULL,
+    type calculation_type NOT NULL,
+    result FLOAT,
+    precision_mode VARCHAR(16) NOT NULL DEFAULT 'float',
+    result_exact NUMERIC,
+    user_id INTEGER REFERENCES users (id)
+"""
+
+COLUMN_NAMES = "id, a, b, type, result, precision_mode, result_exact, user_id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return  # SQLite has no table partitioning; the plain table stays
+
+    # Rewrites the whole table under an exclusive lock: schedule it.
+    op.execute("ALTER TABLE calculations RENAME TO calculations_unpartitioned")
+    op.execute(f"CREATE TABLE calculations ({COLUMNS}) PARTITION BY HASH (user_id)")
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE calculations_m{PARTITIONS}_r{remainder} PARTITION OF calculations "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute(f"INSERT INTO calculations ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM calculations_unpartitioned")
+
+    # Indexes after the copy: building them once is much cheaper than
+    # maintaining them row by row. A primary key on a partitioned table must
+    # contain the partition key (and user_id is nullable), so each partition
+    # gets its own key on id; the shared sequence keeps ids unique overall.
+    for remainder in range(PARTITIONS):
+        op.execute(f"ALTER TABLE calculations_m{PARTITIONS}_r{remainder} ADD PRIMARY KEY (id)")
+    # Partitioned index: every partition, present and future, gets one.
+    op.execute("CREATE INDEX ix_calculations_user_id_id ON calculations (user_id, id)")
+
+    op.execute("ALTER SEQUENCE calculations_id_seq OWNED BY calculations.id")
+    op.execute("DROP TABLE calculations_unpartitioned")
+    op.execute("ANALYZE calculations")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE calculations RENAME TO calculations_partitioned")
+    op.execute(f"CREATE TABLE calculations ({COLUMNS}, PRIMARY KEY (id))")
+    op.execute(f"INSERT INTO calculations ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM calculations_partitioned")
+    op.execute("CREATE INDEX ix_calculations_id ON calculations (id)")
+    op.execute("ALTER SEQUENCE calculations_id_seq OWNED BY calculations.id")
+    op.execute("DROP TABLE calculations_partitioned")  # partitions go with it
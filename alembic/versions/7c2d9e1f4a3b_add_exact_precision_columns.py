@@ -0,0 +1,35 @@
+"""Add precision_mode and result_exact columns for exact compute modes
+
+Revision ID: 7c2d9e1f4a3b
+Revises: 4609aba8a69c
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e1f4a3b'
+down_revision: Union[str, Sequence[str], None] = '4609aba8a69c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NUMERIC on Postgres; SQLite keeps the decimal string as TEXT because its
+    # NUMERIC affinity would silently convert it to a lossy REAL.
+    exact_type = sa.Numeric().with_variant(sa.Text(), 'sqlite')
+    with op.batch_alter_table('calculations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('precision_mode', sa.String(length=16), nullable=False, server_default='float'))
+        batch_op.add_column(sa.Column('result_exact', exact_type, nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('calculations', schema=None) as batch_op:
+        batch_op.drop_column('result_exact')
+        batch_op.drop_column('precision_mode')
@@ -0,0 +1,65 @@
+# app/auth.py
+"""
+The single authentication dependency for every protected route.
+
+The principal is resolved once per request and cached on `request.state`,
+and the lookup runs on the same `get_db` session the route handler
+receives, so a request never opens a second session just to authenticate.
+"""
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+
+from app.db import get_db
+from app.models import User
+from app.security import decode_access_token
+
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+    """Return the user for `Authorization: Bearer <token>`, or raise 401."""
+    user = getattr(request.state, "current_user", None)
+    if user is None:
+        user = lookup_user(db, request.headers.get("authorization"))
+        request.state.current_user = user
+        # lets app.read_replica attribute this session's writes to the user
+        db.info.update(user_id=user.id)
+    return user
+
+
+def bearer_user_id(headers: Headers) -> Optional[int]:
+    """
+    The user id in a valid `Authorization: Bearer <token>`, else None.
+    Verified but database-free, for middleware that runs before the route.
+    """
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return int(decode_access_token(token.strip())["sub"])
+    except Exception:
+        return None
+
+
+def lookup_user(db: Session, authorization: Optional[str]) -> User:
+    """Validate the bearer token and load its user (one query)."""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing token")
+
+    parts = authorization.split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        raise HTTPException(status_code=401, detail="Invalid Authorization header")
+
+    from jose import JWTError  # deferred like the rest of python-jose (see app.security)
+
+    try:
+        payload = decode_access_token(parts[1])
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
@@ -1,17 +1,55 @@
 # app/calculation_factory.py
+import math
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
 from app.models import CalculationType
 
+# log10 of the largest finite float; results must fit a Float column.
+MAX_RESULT_LOG10 = math.log10(sys.float_info.max)
+
+# CPU seconds one evaluation (e.g. every binding of an expression request)
+# may use before it is abandoned.
+CPU_BUDGET_SECONDS = float(os.getenv("EVALUATION_CPU_BUDGET", "1.0"))
+
+
+class EvaluationBudgetExceeded(ValueError):
+    """Raised when an evaluation runs past its CPU-time budget."""
+
+
+class CPUBudget:
+    """
+    Cooperative CPU-time limit for one evaluation. Call check() between
+    steps. Uses per-thread CPU time, so a worker thread is not charged for
+    time spent waiting on the GIL or the database.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = CPU_BUDGET_SECONDS if seconds is None else seconds
+        self.deadline = time.thread_time() + self.seconds
+
+    def check(self) -> None:
+        if time.thread_time() > self.deadline:
+            raise EvaluationBudgetExceeded(f"Evaluation exceeded its CPU budget of {self.seconds:g}s")
+
 
 class CalculationOperation:
     """
     Simple operation wrapper with a uniform compute(a, b) interface.
     The factory returns instances of this class bound to specific logic.
+    An optional guard runs first and rejects inputs that are out of the
+    operation's domain or whose result would be too large to compute.
     """
 
-    def __init__(self, func):
+    def __init__(self, func, guard=None):
         self._func = func
+        self._guard = guard
 
     def compute(self, a: float, b: float) -> float:
+        if self._guard is not None:
+            self._guard(a, b)
         return self._func(a, b)
 
 
@@ -74,6 +112,63 @@ def _log_base(a: float, b: float) -> float:
     return math.log(a, b)
 
 
+# ---------- Cost guards ----------
+# Each predicts log10 of the result's magnitude from the inputs, so
+# e.g. 10 ** 10000000 is refused up front instead of tying up a worker
+# building a ten-million-digit integer.
+
+def _check_magnitude(log10_result: float) -> None:
+    if log10_result > MAX_RESULT_LOG10:
+        # 10^10000000 reads fine; a 300-digit exponent does not
+        exponent = f"{log10_result:.0f}" if log10_result < 1e6 else f"{log10_result:.3g}"
+        raise OverflowError(f"Result is too large (about 10^{exponent})")
+
+
+def _guard_power(a: float, b: float) -> None:
+    if not (math.isfinite(a) and math.isfinite(b)):
+        return  # float arithmetic on inf/nan is already cheap
+    if a < 0 and b != int(b):
+        raise ValueError("Negative base requires an integer exponent")
+    if a == 0 or b == 0 or abs(a) == 1:
+        return
+    _check_magnitude(b * math.log10(abs(a)))
+
+
+def _guard_nth_root(a: float, b: float) -> None:
+    if b <= 0:
+        raise ValueError("Root index (b) must be positive")
+    if a < 0 and math.isfinite(b) and b != int(b):
+        raise ValueError("Cannot take a fractional root of a negative number")
+    if not (math.isfinite(a) and math.isfinite(b)) or a == 0:
+        return
+    # |a| ** (1 / b) only grows for 0 < b < 1
+    _check_magnitude(math.log10(abs(a)) / b)
+
+
+def _guard_log_base(a: float, b: float) -> None:
+    if a <= 0:
+        raise ValueError("Logarithm argument (a) must be positive")
+    if b <= 0:
+        raise ValueError("Logarithm base (b) must be positive")
+    if b == 1:
+        raise ValueError("Logarithm base (b) cannot be 1")
+    # |ln a / ln b| is bounded for any finite inputs, nothing else to check
+
+
+GUARDS: Dict[CalculationType, Callable[[float, float], None]] = {
+    CalculationType.POWER: _guard_power,
+    CalculationType.NTH_ROOT: _guard_nth_root,
+    CalculationType.LOG_BASE: _guard_log_base,
+}
+
+
+def check_cost(calc_type: CalculationType, a: float, b: float) -> None:
+    """Run the operation's guard, if it has one. Used by the exact modes too."""
+    guard = GUARDS.get(calc_type)
+    if guard is not None:
+        guard(a, b)
+
+
 class CalculationFactory:
     @staticmethod
     def get_operation(calc_type: CalculationType) -> CalculationOperation:
@@ -90,15 +185,15 @@ class CalculationFactory:
         if calc_type == CalculationType.DIVIDE:
             return CalculationOperation(_divide)
         if calc_type == CalculationType.POWER:
-            return CalculationOperation(_power)
+            return CalculationOperation(_power, _guard_power)
         if calc_type == CalculationType.MODULUS:
             return CalculationOperation(_modulus)
         if calc_type == CalculationType.PERCENT_OF:
             return CalculationOperation(_percent_of)
         if calc_type == CalculationType.NTH_ROOT:
-            return CalculationOperation(_nth_root)
+            return CalculationOperation(_nth_root, _guard_nth_root)
         if calc_type == CalculationType.LOG_BASE:
-            return CalculationOperation(_log_base)
+            return CalculationOperation(_log_base, _guard_log_base)
 
         # This branch is exercised in tests when an invalid type is passed
         raise ValueError(f"Unsupported calculation type: {calc_type}")
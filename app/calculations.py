@@ -1,61 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.db import get_db
+from app import write_behind
+from app.auth import get_current_user
 from app.models import Calculation, User
-from app.schemas import CalculationCreate, CalculationRead
-from app.calculation_factory import CalculationFactory
-from fastapi import Depends
-from app.security import decode_access_token
-from sqlalchemy.orm import Session
-from fastapi import Header
-from app.db import SessionLocal
-
-
-def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> User:
-    """Simple bearer token parsing to load the current user.
-
-    Expects header: `Authorization: Bearer <token>`
-    """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing Authorization header")
-
-    parts = authorization.split()
-    if parts[0].lower() != "bearer" or len(parts) != 2:
-        raise HTTPException(status_code=401, detail="Invalid Authorization header")
+from app.schemas import CalculationCreate, CalculationQueued, CalculationRead
+from app.precision import compute
+from app.profiling import ProfiledRoute
+from app.read_replica import get_read_db
+from app.responses import rows_response
+from app.sharding import get_shard_db
+from app.queries import BROWSE_FIELDS, calculation_rows
 
-    token = parts[1]
-    try:
-        payload = decode_access_token(token)
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    user_id = int(payload.get("sub"))
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/calculations", response_model=List[CalculationRead])
-def browse_calculations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    items = db.query(Calculation).filter(Calculation.user_id == current_user.id).all()
-    return items
-
-
-@router.post("/calculations", response_model=CalculationRead)
-def add_calculation(payload: CalculationCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Compute result using factory
-    operation = CalculationFactory.get_operation(payload.type)
+def browse_calculations(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    # Fast path: rows come back as plain tuples and are encoded straight to
+    # JSON bytes; stored rows were validated on write, so no per-row
+    # CalculationRead validation (response_model stays for the OpenAPI docs).
+    rows = calculation_rows(db, current_user.id)
+    return rows_response(BROWSE_FIELDS, rows)
+
+
+@router.post("/calculations", response_model=CalculationRead, responses={202: {"model": CalculationQueued}})
+def add_calculation(
+    payload: CalculationCreate,
+    request: Request,
+    db: Session = Depends(get_shard_db),
+    current_user: User = Depends(get_current_user),
+    prefer: Optional[str] = Header(None),
+):
+    # Compute result using factory (or the requested exact mode)
     try:
-        result = operation.compute(payload.a, payload.b)
-    except ValueError as e:
+        result, exact = compute(payload.type, payload.a, payload.b, payload.precision, payload.digits)
+    except (ValueError, ZeroDivisionError, OverflowError) as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    db_calc = Calculation(a=payload.a, b=payload.b, type=payload.type, result=result, user_id=current_user.id)
+    values = dict(
+        a=payload.a,
+        b=payload.b,
+        type=payload.type,
+        result=result,
+        precision_mode=payload.precision.value,
+        result_exact=exact,
+        user_id=current_user.id,
+    )
+    # Opt-in write-behind: 202 now, batched INSERT later (app/write_behind.py)
+    buffer = write_behind.for_app(request.app)
+    if buffer is not None and write_behind.respond_async(prefer):
+        return write_behind.queued_response(buffer, values)
+
+    db_calc = Calculation(**values)
     db.add(db_calc)
     db.commit()
     db.refresh(db_calc)
@@ -63,7 +61,7 @@ def add_calculation(payload: CalculationCreate, db: Session = Depends(get_db), c
 
 
 @router.get("/calculations/{calc_id}", response_model=CalculationRead)
-def read_calculation(calc_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def read_calculation(calc_id: int, db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
     calc = db.query(Calculation).filter(Calculation.id == calc_id).first()
     if not calc:
         raise HTTPException(status_code=404, detail="Calculation not found")
@@ -73,7 +71,7 @@ def read_calculation(calc_id: int, db: Session = Depends(get_db), current_user:
 
 
 @router.put("/calculations/{calc_id}", response_model=CalculationRead)
-def update_calculation(calc_id: int, payload: CalculationCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def update_calculation(calc_id: int, payload: CalculationCreate, db: Session = Depends(get_shard_db), current_user: User = Depends(get_current_user)):
     calc = db.query(Calculation).filter(Calculation.id == calc_id).first()
     if not calc:
         raise HTTPException(status_code=404, detail="Calculation not found")
@@ -84,11 +82,11 @@ def update_calculation(calc_id: int, payload: CalculationCreate, db: Session = D
     calc.b = payload.b
     calc.type = payload.type
     # Recompute
-    operation = CalculationFactory.get_operation(payload.type)
     try:
-        calc.result = operation.compute(payload.a, payload.b)
-    except ValueError as e:
+        calc.result, calc.result_exact = compute(payload.type, payload.a, payload.b, payload.precision, payload.digits)
+    except (ValueError, ZeroDivisionError, OverflowError) as e:
         raise HTTPException(status_code=400, detail=str(e))
+    calc.precision_mode = payload.precision.value
 
     db.add(calc)
     db.commit()
@@ -97,7 +95,7 @@ def update_calculation(calc_id: int, payload: CalculationCreate, db: Session = D
 
 
 @router.delete("/calculations/{calc_id}")
-def delete_calculation(calc_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_calculation(calc_id: int, db: Session = Depends(get_shard_db), current_user: User = Depends(get_current_user)):
     calc = db.query(Calculation).filter(Calculation.id == calc_id).first()
     if not calc:
         raise HTTPException(status_code=404, detail="Calculation not found")
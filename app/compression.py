@@ -0,0 +1,242 @@
+# app/compression.py
+"""
+Negotiated response compression (zstd / brotli / gzip).
+
+Starlette only ships a gzip middleware, so this is a small ASGI middleware
+that picks the best encoding the client accepts, skips tiny bodies and
+content that is already compressed, and keeps a streaming compressor open
+for responses sent in several chunks (e.g. StreamingResponse).
+"""
+import zlib
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:  # optional: pip install zstandard
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+
+# Content types that are already compressed (or must not be buffered).
+EXCLUDED_CONTENT_TYPES = (
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "application/x-brotli",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "text/event-stream",
+    "video/*",
+)
+
+# File suffixes of precompressed static assets.
+EXCLUDED_SUFFIXES = (".gz", ".br", ".zst")
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int = 5):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+class _ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Encodings this process can produce, in server preference order."""
+    names = []
+    if zstandard is not None:
+        names.append("zstd")
+    if brotli is not None:
+        names.append("br")
+    names.append("gzip")
+    return tuple(names)
+
+
+def get_encoder(name: str):
+    """Return a fresh streaming encoder for the given content-coding."""
+    if name == "zstd" and zstandard is not None:
+        return _ZstdEncoder()
+    if name == "br" and brotli is not None:
+        return _BrotliEncoder()
+    if name == "gzip":
+        return _GzipEncoder()
+    raise ValueError(f"Unsupported encoding: {name}")
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for item in value.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str, supported: Tuple[str, ...]) -> Optional[str]:
+    """
+    Pick the encoding to use for a response, or None for identity.
+    Highest q wins; ties are broken by the server preference order.
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in supported:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts.
+
+    - bodies smaller than `minimum_size` are sent as-is
+    - responses that already carry Content-Encoding, use an excluded
+      content type, or are precompressed files are passed through
+    - streamed responses (more_body=True) are compressed chunk by chunk
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, encodings: Optional[Tuple[str, ...]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = encodings or available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].endswith(EXCLUDED_SUFFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.encoder = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the headers back until we know whether we compress.
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or _is_excluded(headers.get("content-type", ""))
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body and len(body) < self.minimum_size:
+                # Not worth the CPU for tiny responses.
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.encoder = get_encoder(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = self.encoder.compress(body)
+            else:
+                message["body"] = self.encoder.finish(body)
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        # Remaining chunks of a streamed response.
+        message["body"] = self.encoder.compress(body) if more_body else self.encoder.finish(body)
+        await self.send(message)
+
+
+def _is_excluded(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type in EXCLUDED_CONTENT_TYPES or f"{media_type.partition('/')[0]}/*" in EXCLUDED_CONTENT_TYPES
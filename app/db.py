@@ -1,31 +1,192 @@
 # app/db.py
+"""
+Database engine and sessions.
+
+The engine is created lazily, on first use in each process, rather than at
+import time. A prefork server (gunicorn --preload) imports the app in the
+master and forks workers from it; an engine created there would hand every
+worker copies of the same pooled sockets. get_engine() notices when it is
+running in a different process than the one that built the engine and
+builds a fresh one, dropping the inherited pool without closing the
+parent's connections.
+
+`from app.db import engine` still works and returns the current process's
+engine.
+
+An optional read replica (DATABASE_READ_URL) gets its own engine, built the
+same way by get_read_engine(); routing between the two is in
+app.read_replica. Calculation shards (app.sharding) get theirs from
+get_shard_engine().
+
+Each app built by create_app() keeps its own Database on app.state.database,
+so two apps in one process never share engines; get_db() reads it from the
+request. The module-level functions work on a process default Database
+(DATABASE_URL), which the CLIs and scripts use.
+"""
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+from typing import Dict, Optional, Tuple
 
-# Use DATABASE_URL if provided (Docker / CI),
-# otherwise default to a local SQLite DB for development & tests.
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    DATABASE_URL = "sqlite:///./app.db"
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.requests import Request
 
-# Extra connect args for SQLite
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+from app.settings import default_database_url, default_read_database_url
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = default_database_url()
+DATABASE_READ_URL = default_read_database_url()
 
 Base = declarative_base()
 
+# Sessions are bound per call in get_db(), to this process's engine
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def _connect_args(url: str) -> dict:
+    # Extra connect args for SQLite
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+
+class Database:
+    """
+    The engines of one app: the primary, the optional replica and the
+    calculation shards, each created on first use in each process.
+    """
+
+    def __init__(self, url: str, read_url: Optional[str] = None):
+        self.url = url
+        self.read_url = read_url
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False)
+        self._engine: Optional[Engine] = None
+        self._engine_pid: Optional[int] = None
+        self._read_engine: Optional[Engine] = None
+        self._read_engine_pid: Optional[int] = None
+        self._shard_engines: Dict[str, Tuple[str, Engine]] = {}  # name -> (url, engine)
+        self._shard_engines_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get_engine(self) -> Engine:
+        pid = os.getpid()
+        if self._engine is not None and self._engine_pid == pid:
+            return self._engine
+        with self._lock:
+            if self._engine is not None and self._engine_pid != pid:
+                # Inherited across fork: forget the parent's pool, don't close it.
+                self._engine.dispose(close=False)
+                self._engine = None
+            if self._engine is None:
+                self._engine = create_engine(self.url, connect_args=_connect_args(self.url))
+                self._engine_pid = pid
+            return self._engine
+
+    def get_read_engine(self) -> Optional[Engine]:
+        """The replica's engine, or None when there is no read URL."""
+        if self.read_url is None:
+            return None
+        pid = os.getpid()
+        if self._read_engine is not None and self._read_engine_pid == pid:
+            return self._read_engine
+        with self._lock:
+            if self._read_engine is not None and self._read_engine_pid != pid:
+                self._read_engine.dispose(close=False)
+                self._read_engine = None
+            if self._read_engine is None:
+                self._read_engine = create_engine(self.read_url, connect_args=_connect_args(self.read_url))
+                self._read_engine_pid = pid
+            return self._read_engine
+
+    def get_shard_engine(self, name: str, url: str) -> Engine:
+        """This process's engine for shard `name` (rebuilt if its URL changed)."""
+        pid = os.getpid()
+        entry = self._shard_engines.get(name)
+        if entry is not None and entry[0] == url and self._shard_engines_pid == pid:
+            return entry[1]
+        with self._lock:
+            if self._shard_engines_pid != pid:
+                for _, inherited in self._shard_engines.values():
+                    inherited.dispose(close=False)
+                self._shard_engines.clear()
+                self._shard_engines_pid = pid
+            entry = self._shard_engines.get(name)
+            if entry is None or entry[0] != url:
+                if entry is not None:
+                    entry[1].dispose()
+                entry = self._shard_engines[name] = (url, create_engine(url, connect_args=_connect_args(url)))
+            return entry[1]
+
+    def session(self, engine: Optional[Engine] = None) -> Session:
+        """A new session on `engine`, the primary by default."""
+        return self.sessionmaker(bind=engine if engine is not None else self.get_engine())
+
+    def dispose(self, close: bool = True) -> None:
+        """Release the engines' pools (on shutdown, or after fork with close=False)."""
+        with self._lock:
+            engines = [self._engine, self._read_engine] + [engine for _, engine in self._shard_engines.values()]
+            self._engine = self._engine_pid = self._read_engine = self._read_engine_pid = None
+            self._shard_engines.clear()
+            self._shard_engines_pid = None
+        for engine in engines:
+            if engine is not None:
+                engine.dispose(close=close)
+
+
+_default = Database(DATABASE_URL, DATABASE_READ_URL)
+_lock = threading.Lock()
+
+
+def default_database() -> Database:
+    """The process default Database, pointed at by configure()."""
+    return _default
+
+
+def for_app(app) -> Database:
+    """The app's Database (see create_app), else the process default."""
+    return getattr(app.state, "database", None) or _default
+
+
+def configure(url: str, read_url: Optional[str] = None) -> None:
+    """Point the process default at another database (and replica); engines are rebuilt on next use."""
+    global DATABASE_URL, DATABASE_READ_URL
+    with _lock:
+        if url == DATABASE_URL and read_url == DATABASE_READ_URL:
+            return
+        DATABASE_URL, DATABASE_READ_URL = url, read_url
+        _default.url, _default.read_url = url, read_url
+    _default.dispose()
+
+
+def get_engine() -> Engine:
+    return _default.get_engine()
+
+
+def get_read_engine() -> Optional[Engine]:
+    """The default replica's engine, or None when DATABASE_READ_URL is not set."""
+    return _default.get_read_engine()
+
+
+def get_shard_engine(name: str, url: str) -> Engine:
+    return _default.get_shard_engine(name, url)
+
+
+def dispose_engine(close: bool = True) -> None:
+    """Release the default engines' pools (on shutdown, or after fork with close=False)."""
+    _default.dispose(close=close)
+
+
+def __getattr__(name: str):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-def get_db():
+def get_db(request: Request = None):
     """
-    Dependency that yields a database session.
+    Dependency that yields a session on the app's primary database (the
+    process default when called outside a request).
     We'll test this to hit 100% coverage in this file.
     """
-    db = SessionLocal()
+    db = (for_app(request.app) if request is not None else _default).session()
     try:
         yield db
     finally:
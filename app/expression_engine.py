@@ -0,0 +1,481 @@
+# app/expression_engine.py
+"""
+Arithmetic expression engine built on CalculationFactory.
+
+    f = compile_expression("(a + b) ^ c / d")
+    f.evaluate({"a": 1, "b": 2, "c": 2, "d": 3})   # 3.0
+
+Operators: + - * / % ^ (right-associative), unary minus, parentheses.
+Nesting is limited to MAX_DEPTH levels.
+Functions: any CalculationType name taking two arguments, e.g.
+power(x, 2), nth_root(x, 3), log_base(x, 2), percent_of(x, 15), modulus(x, 7).
+
+The text is parsed into an AST of small named tuples, canonicalized
+(commutative operands ordered, constants folded) and compiled once into a
+straight-line Python function in which every repeated subterm is computed
+a single time. Compiled functions live in a bounded, process-wide cache
+keyed by the canonical AST, so `a+b` and `b + a` share one entry.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from app.calculation_factory import CalculationFactory, CPUBudget
+from app.models import CalculationType
+
+
+class ExpressionError(ValueError):
+    """Raised for malformed expressions or missing variables."""
+
+
+# ---------- AST ----------
+
+class Num(NamedTuple):
+    value: float
+
+
+class Var(NamedTuple):
+    name: str
+
+
+class Neg(NamedTuple):
+    operand: "Node"
+
+
+class Call(NamedTuple):
+    op: CalculationType
+    args: Tuple["Node", ...]
+
+
+Node = Union[Num, Var, Neg, Call]
+
+BINARY_OPERATORS = {
+    "+": CalculationType.ADD,
+    "-": CalculationType.SUBTRACT,
+    "*": CalculationType.MULTIPLY,
+    "/": CalculationType.DIVIDE,
+    "%": CalculationType.MODULUS,
+    "^": CalculationType.POWER,
+}
+
+FUNCTIONS = {t.value: t for t in CalculationType}
+
+# Parentheses, function calls, unary signs and exponents may nest this deep.
+MAX_DEPTH = 100
+
+
+# ---------- Parser ----------
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|(?P<name>[A-Za-z_]\w*)|(?P<op>[-+*/%^(),]))"
+)
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise ExpressionError(f"Unexpected character at position {pos}: {text[pos]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser; one method per precedence level."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.depth = 0
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ExpressionError("Empty expression")
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"Unexpected token {self.tokens[self.pos][1]!r}")
+        return node
+
+    def peek(self):
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def take(self, expected=None):
+        if self.pos >= len(self.tokens):
+            raise ExpressionError("Unexpected end of expression")
+        kind, value = self.tokens[self.pos]
+        if expected is not None and value != expected:
+            raise ExpressionError(f"Expected {expected!r}, got {value!r}")
+        self.pos += 1
+        return kind, value
+
+    def expr(self) -> Node:
+        node = self.term()
+        while self.peek() in ("+", "-"):
+            _, op = self.take()
+            node = Call(BINARY_OPERATORS[op], (node, self.term()))
+        return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        while self.peek() in ("*", "/", "%"):
+            _, op = self.take()
+            node = Call(BINARY_OPERATORS[op], (node, self.unary()))
+        return node
+
+    def unary(self) -> Node:
+        # Every nesting level passes through here, so this bounds the recursion.
+        if self.depth >= MAX_DEPTH:
+            raise ExpressionError(f"Expression is nested more than {MAX_DEPTH} levels deep")
+        self.depth += 1
+        try:
+            return self._unary()
+        finally:
+            self.depth -= 1
+
+    def _unary(self) -> Node:
+        if self.peek() == "-":
+            self.take()
+            return Neg(self.unary())
+        if self.peek() == "+":
+            self.take()
+            return self.unary()
+        return self.power()
+
+    def power(self) -> Node:
+        base = self.atom()
+        if self.peek() == "^":
+            self.take()
+            # right-associative, and binds tighter than unary minus on the left
+            return Call(CalculationType.POWER, (base, self.unary()))
+        return base
+
+    def atom(self) -> Node:
+        kind, value = self.take()
+        if kind == "num":
+            return Num(float(value))
+        if kind == "name":
+            if self.peek() != "(":
+                return Var(value)
+            if value not in FUNCTIONS:
+                raise ExpressionError(f"Unknown function: {value}")
+            self.take("(")
+            args = [self.expr()]
+            while self.peek() == ",":
+                self.take()
+                args.append(self.expr())
+            self.take(")")
+            if len(args) != 2:
+                raise ExpressionError(f"{value}() takes 2 arguments, got {len(args)}")
+            return Call(FUNCTIONS[value], tuple(args))
+        if value == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        raise ExpressionError(f"Unexpected token {value!r}")
+
+
+def parse(text: str) -> Node:
+    return _Parser(text).parse()
+
+
+# ---------- Normalization ----------
+
+COMMUTATIVE = {CalculationType.ADD, CalculationType.MULTIPLY}
+
+
+def _children(node: Node) -> Tuple[Node, ...]:
+    if isinstance(node, Neg):
+        return (node.operand,)
+    if isinstance(node, Call):
+        return node.args
+    return ()
+
+
+def _post_order(tree: Node) -> List[Node]:
+    """Every distinct node object of the tree, children before parents, without recursion."""
+    order: List[Node] = []
+    seen = set()
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in seen:
+            continue
+        children = _children(node)
+        if expanded or not children:
+            seen.add(id(node))
+            order.append(node)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+    return order
+
+
+def _rewrite(node: Node, args: Tuple[Node, ...], keys: Dict[int, int]) -> Node:
+    """One canonicalization step for `node`, whose children are already canonical `args`."""
+    if isinstance(node, Neg):
+        (operand,) = args
+        if isinstance(operand, Num):
+            return Num(-operand.value)
+        if isinstance(operand, Neg):
+            return operand.operand
+        return Neg(operand)
+    if isinstance(node, Call):
+        if node.op in COMMUTATIVE:
+            args = tuple(sorted(args, key=lambda arg: keys[id(arg)]))
+        if all(isinstance(arg, Num) for arg in args):
+            try:
+                return Num(CalculationFactory.get_operation(node.op).compute(*(arg.value for arg in args)))
+            except (ValueError, ZeroDivisionError, OverflowError):
+                pass  # leave it for evaluation, which reports the error
+        return Call(node.op, args)
+    return node
+
+
+def _structural_key(node: Node, keys: Dict[int, int]) -> int:
+    """Hash of the subtree, from the keys of its (canonical) children."""
+    if isinstance(node, Num):
+        return hash(("num", node.value))
+    if isinstance(node, Var):
+        return hash(("var", node.name))
+    if isinstance(node, Neg):
+        return hash(("neg", keys[id(node.operand)]))
+    return hash((node.op.value,) + tuple(keys[id(arg)] for arg in node.args))
+
+
+def cache_key(tree: Node) -> Tuple[tuple, ...]:
+    """
+    The tree in prefix order as a flat tuple of (kind, payload) pairs.
+    Unlike the nested AST it hashes and compares without recursing, however
+    deep the tree is.
+    """
+    out = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Num):
+            out.append(("num", node.value))
+        elif isinstance(node, Var):
+            out.append(("var", node.name))
+        elif isinstance(node, Neg):
+            out.append(("neg",))
+            stack.append(node.operand)
+        else:
+            out.append((node.op.value, len(node.args)))
+            stack.extend(reversed(node.args))
+    return tuple(out)
+
+
+def canonicalize(node: Node) -> Node:
+    """
+    Rewrite the AST into a canonical form, so equivalent spellings share a
+    cache entry: operands of + and * are put in a fixed order (a + b and
+    b + a are the same tree), constant subtrees are folded, and double
+    negation is removed. Every rewrite is exact in float arithmetic; sums
+    are not re-associated.
+
+    Works bottom-up over an explicit stack. Operands are ordered by a
+    structural hash computed once per node, so the cost is linear in the
+    size of the tree.
+    """
+    canonical: Dict[int, Node] = {}  # id(original node) -> canonical node
+    keys: Dict[int, int] = {}  # id(canonical node) -> structural key
+    for current in _post_order(node):
+        args = tuple(canonical[id(child)] for child in _children(current))
+        result = canonical[id(current)] = _rewrite(current, args, keys)
+        if id(result) not in keys:
+            keys[id(result)] = _structural_key(result, keys)
+    return canonical[id(node)]
+
+
+# ---------- Compiler ----------
+
+Evaluator = Callable[[Mapping[str, float]], float]
+
+
+def _generate(tree: Node) -> Tuple[str, Dict[str, object]]:
+    """
+    Emit straight-line Python for the tree. Each distinct subtree becomes
+    one local assigned once (common-subexpression elimination), so a term
+    like log_base(x, 2) used twice is computed once per evaluation.
+
+    Equal subtrees are found by hash-consing: a node's signature is its
+    kind plus the locals already assigned to its children.
+    """
+    namespace: Dict[str, object] = {}
+    slots: Dict[tuple, str] = {}  # signature -> local name
+    names: Dict[int, str] = {}  # id(node) -> local name
+    lines: List[str] = []
+
+    for node in _post_order(tree):
+        args = [names[id(child)] for child in _children(node)]
+        if isinstance(node, Num):
+            signature = ("num", node.value)
+        elif isinstance(node, Var):
+            signature = ("var", node.name)
+        elif isinstance(node, Neg):
+            signature = ("neg", args[0])
+        else:
+            signature = (node.op.value, *args)
+        name = slots.get(signature)
+        if name is None:
+            if isinstance(node, Num):
+                name = f"_k{len(namespace)}"
+                namespace[name] = node.value
+            else:
+                if isinstance(node, Var):
+                    expr = f"env[{node.name!r}]"
+                elif isinstance(node, Neg):
+                    expr = f"-{args[0]}"
+                else:
+                    op_name = f"_op_{node.op.value}"
+                    namespace[op_name] = CalculationFactory.get_operation(node.op).compute
+                    expr = f"{op_name}({', '.join(args)})"
+                name = f"t{len(lines)}"
+                lines.append(f"    {name} = {expr}")
+            slots[signature] = name
+        names[id(node)] = name
+
+    result = names[id(tree)]
+    source = "def _expression(env):\n" + "\n".join(lines + [f"    return {result}"]) + "\n"
+    return source, namespace
+
+
+def _compile(tree: Node) -> Tuple[Evaluator, str]:
+    source, namespace = _generate(tree)
+    exec(compile(source, "<expression>", "exec"), namespace)
+    fn = namespace["_expression"]
+
+    def evaluator(env):
+        try:
+            return fn(env)
+        except KeyError as e:
+            raise ExpressionError(f"Missing value for variable: {e.args[0]}")
+
+    return evaluator, source
+
+
+def variables(node: Node) -> Tuple[str, ...]:
+    """Variable names used by the expression, sorted."""
+    found = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, Var):
+            found.add(current.name)
+        stack.extend(_children(current))
+    return tuple(sorted(found))
+
+
+class CompiledExpression:
+    def __init__(self, text: str, tree: Node):
+        self.text = text
+        self.tree = tree
+        self.variables = variables(tree)
+        self._fn, self.source = _compile(tree)
+
+    def evaluate(self, env: Mapping[str, float]) -> float:
+        return self._fn(env)
+
+    def evaluate_many(
+        self, bindings: Iterable[Mapping[str, float]], budget: Optional[CPUBudget] = None
+    ) -> List[float]:
+        """Evaluate every binding, checking `budget` (if given) after each one."""
+        fn = self._fn
+        if budget is None:
+            return [fn(env) for env in bindings]
+        results = []
+        for env in bindings:
+            results.append(fn(env))
+            budget.check()
+        return results
+
+
+# ---------- Cache ----------
+
+class ExpressionCache:
+    """
+    Process-wide, bounded LRU of compiled expressions keyed by the
+    canonical AST (flattened by cache_key). A second index maps raw text to its key, so a repeated string
+    skips parsing as well as compiling.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, CompiledExpression]" = OrderedDict()
+        self._texts: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str) -> CompiledExpression:
+        with self._lock:
+            key = self._texts.get(text)
+            if key is not None and key in self._entries:
+                self._texts.move_to_end(text)
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        tree = canonicalize(parse(text))
+        key = cache_key(tree)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                # Different spelling of an expression we already compiled.
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.normalized_hits += 1
+            else:
+                self.misses += 1
+        if compiled is None:
+            compiled = CompiledExpression(text, tree)
+
+        with self._lock:
+            self._entries[key] = self._entries.get(key, compiled)
+            self._entries.move_to_end(key)
+            self._texts[text] = key
+            self._texts.move_to_end(text)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            while len(self._texts) > self.maxsize:
+                self._texts.popitem(last=False)
+            return self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._texts.clear()
+            self.hits = self.normalized_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "normalized_hits": self.normalized_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+expression_cache = ExpressionCache(maxsize=int(os.getenv("EXPRESSION_CACHE_SIZE", "1024")))
+
+
+def compile_expression(text: str) -> CompiledExpression:
+    """Parse and compile `text`, going through the shared cache."""
+    return expression_cache.get(text)
+
+
+def evaluate(text: str, env: Dict[str, float] = None) -> float:
+    return compile_expression(text).evaluate(env or {})
@@ -0,0 +1,42 @@
+# app/expressions.py
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth import get_current_user
+from app.calculation_factory import CPUBudget
+from app.expression_engine import ExpressionError, compile_expression, expression_cache
+from app.models import User
+from app.profiling import ProfiledRoute
+from app.schemas import ExpressionEvaluate, ExpressionResult
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.post("/expressions/evaluate", response_model=ExpressionResult)
+def evaluate_expression(payload: ExpressionEvaluate, current_user: User = Depends(get_current_user)):
+    """
+    Evaluate a multi-step formula against one or more variable bindings in a
+    single request, instead of one POST /api/calculations per step.
+    Nothing is persisted.
+    """
+    try:
+        compiled = compile_expression(payload.expression)
+    except ExpressionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One budget for the whole request, however many bindings it carries
+    budget = CPUBudget()
+    results = []
+    for index, env in enumerate(payload.bindings):
+        try:
+            results.append(compiled.evaluate(env))
+            budget.check()
+        except (ValueError, ZeroDivisionError, OverflowError) as e:
+            raise HTTPException(status_code=400, detail=f"Binding {index}: {e}")
+
+    return ExpressionResult(expression=payload.expression, variables=list(compiled.variables), results=results)
+
+
+@router.get("/expressions/cache")
+def expression_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters of the process-wide compiled-expression cache."""
+    return expression_cache.stats()
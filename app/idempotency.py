@@ -0,0 +1,209 @@
+# app/idempotency.py
+"""
+Idempotency keys for the create endpoints (POST /api/calculations and the
+batch /api/expressions/evaluate).
+
+A client that may retry sends `Idempotency-Key: <unique string>`. The first
+request with a key runs normally and its response is kept for
+IDEMPOTENCY_TTL seconds. Retries with the same key and body get that
+response back with `Idempotent-Replayed: true`, and nothing is recomputed
+or inserted again. Keys are scoped per user (from the bearer token) and
+per path.
+
+- A duplicate that arrives while the first request is still running waits
+  for it (up to IDEMPOTENCY_WAIT seconds, then 409) instead of racing it.
+- Reusing a key with a different body is a client error: 422.
+- 5xx responses (and 401/403/429) are not kept, so a retry runs again.
+- Requests without the header, or without a valid token, are untouched.
+
+The store is an in-process LRU of at most IDEMPOTENCY_MAX_KEYS responses
+per worker. Behind several workers, a retry that lands on another worker
+is not recognised. Put sticky routing in front if that matters.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import bearer_user_id
+
+HEADER = "idempotency-key"
+TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "30"))
+MAX_KEY_LENGTH = 255
+IDEMPOTENT_PATHS = ("/api/calculations", "/api/expressions/evaluate")
+UNSTORED_STATUSES = frozenset({401, 403, 429})
+
+
+class StoredResponse:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "response", "expires")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = asyncio.Event()
+        self.response: Optional[StoredResponse] = None
+        self.expires = float("inf")  # in flight: never expires or gets evicted
+
+
+class IdempotencyStore:
+    """
+    LRU of (user_id, path, key) -> response, with a TTL.
+
+    Counters:
+    - replays:   retries answered from the store
+    - conflicts: keys reused with a different body
+    - evictions: finished entries dropped to stay under max_keys
+    """
+
+    def __init__(self, ttl: float = TTL, max_keys: int = MAX_KEYS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.replays = self.conflicts = self.evictions = 0
+
+    def begin(self, key: Hashable, fingerprint: str) -> Tuple[_Entry, bool]:
+        """The entry for `key` and whether the caller is the one to run the request."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, False
+            entry = self._entries[key] = _Entry(fingerprint)
+            self._evict()
+            return entry, True
+
+    def finish(self, key: Hashable, entry: _Entry, response: Optional[StoredResponse]) -> None:
+        """Keep `response` for replay, or forget the key if it is None; wakes any waiters."""
+        with self._lock:
+            if response is None:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            else:
+                entry.response = response
+                entry.expires = self.clock() + self.ttl
+        entry.done.set()
+
+    def _evict(self) -> None:
+        excess = len(self._entries) - self.max_keys
+        if excess <= 0:
+            return
+        for key in [k for k, e in self._entries.items() if e.response is not None][:excess]:
+            del self._entries[key]
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _error(status: int, detail: str) -> Response:
+    return JSONResponse({"detail": detail}, status_code=status)
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, store: Optional[IdempotencyStore] = None,
+                 paths: Sequence[str] = IDEMPOTENT_PATHS, wait: float = WAIT):
+        self.app = app
+        self.store = store if store is not None else IdempotencyStore()
+        self.paths = frozenset(paths)
+        self.wait = wait
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get(HEADER)
+        user_id = bearer_user_id(headers) if key is not None else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        store_key = (user_id, scope["path"], key)
+        while True:
+            entry, leader = self.store.begin(store_key, fingerprint)
+            if leader:
+                await self._run(scope, body, send, store_key, entry)
+                return
+            if entry.fingerprint != fingerprint:
+                self.store.conflicts += 1
+                await _error(422, "Idempotency-Key was already used with a different request body")(scope, receive, send)
+                return
+            try:
+                await asyncio.wait_for(entry.done.wait(), self.wait)
+            except asyncio.TimeoutError:
+                await _error(409, "A request with this Idempotency-Key is still in progress")(scope, receive, send)
+                return
+            if entry.response is not None:
+                self.store.replays += 1
+                await _replay(entry.response, send)
+                return
+            # The first attempt failed and was forgotten: run this one instead.
+
+    async def _run(self, scope: Scope, body: bytes, send: Send, store_key, entry: _Entry) -> None:
+        start: Message = {}
+        chunks: List[bytes] = []
+
+        async def receive() -> Message:
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, receive, capture)
+            status = start.get("status", 500)
+            if status < 500 and status not in UNSTORED_STATUSES:
+                response = StoredResponse(status, list(start.get("headers", [])), b"".join(chunks))
+        finally:
+            self.store.finish(store_key, entry, response)
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _replay(stored: StoredResponse, send: Send) -> None:
+    headers = stored.headers + [(b"idempotent-replayed", b"true")]
+    await send({"type": "http.response.start", "status": stored.status, "headers": headers})
+    await send({"type": "http.response.body", "body": stored.body})
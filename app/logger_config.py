@@ -1,17 +1,32 @@
 import logging
 from pathlib import Path
 
+FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 
-def configure_logger():
+# Handlers this module attached to the root logger, by log file path (or
+# "console"), so every app gets its own log_dir without doubling output
+_handlers = {}
+
+
+def _attach(key: str, make) -> None:
+    root = logging.getLogger()
+    handler = _handlers.get(key)
+    if handler is None or handler not in root.handlers:
+        handler = _handlers[key] = make()
+        handler.setFormatter(logging.Formatter(FORMAT))
+        root.addHandler(handler)
+
+
+def configure_logger(log_dir: str = "logs"):
     # ensure a logs dir exists (optional)
-    Path("logs").mkdir(exist_ok=True)
+    Path(log_dir).mkdir(exist_ok=True)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        handlers=[
-            logging.FileHandler("logs/app.log"),
-            logging.StreamHandler()
-        ],
-    )
+    root = logging.getLogger()
+    if root.level > logging.INFO:
+        root.setLevel(logging.INFO)
+    _attach("console", logging.StreamHandler)
+    path = (Path(log_dir) / "app.log").resolve()
+    # delay: the file is opened on the first record, i.e. in the
+    # worker that writes it, not in a preloading master
+    _attach(str(path), lambda: logging.FileHandler(path, delay=True))
     return logging.getLogger("fastapi_calculator")
@@ -1,36 +1,44 @@
-from fastapi import FastAPI, HTTPException, Depends
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Request
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app import db as database
+from app import write_behind
+from app.db import Database, get_db
 from app.models import User
 from app.schemas import UserCreate, UserLogin, Token
 from app.security import hash_password, verify_password, create_access_token
 from app.operations import add, subtract, multiply, divide
 from app.logger_config import configure_logger
+from app.migrations import HEAD_REVISION, SCHEMA_CHECK_MODES, current_revision, upgrade as migrate, verify as verify_schema
 from app.users import router as users_router
 from app.calculations import router as calculations_router
-from app.statistics import router as statistics_router
-from app.db import Base, engine
-
-logger = configure_logger()
-
-app = FastAPI(
-    title="FastAPI Calculator",
-    version="0.2.0",
-    description="Simple calculator API with secure user model for Module 10",
-)
-
-# Serve simple frontend pages for Module 13
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.include_router(users_router, prefix="/api")
-app.include_router(calculations_router, prefix="/api")
-app.include_router(statistics_router, prefix="/api")
-
-
-def custom_openapi():
+from app.statistics import build_flight as build_statistics_flight, router as statistics_router
+from app.expressions import router as expressions_router
+from app.compression import CompressionMiddleware
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.profiling import ProfiledRoute, ProfilingMiddleware, router as profiling_router
+from app.query_stats import QueryStatsMiddleware
+from app.rate_limit import RateLimitMiddleware
+from app.responses import ORJSONResponse
+from app.settings import Settings
+from app.sharding import Shards
+from app.static_assets import page_response, static_files
+from app.write_behind import router as write_behind_router
+from app.db import Base
+
+# Handlers are attached by configure_logger() in create_app()
+logger = logging.getLogger("fastapi_calculator")
+
+# Top-level calculator, page and form routes (the /api routers live in their modules)
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def custom_openapi(app: FastAPI):
     if app.openapi_schema:
         return app.openapi_schema
     openapi_schema = get_openapi(
@@ -49,7 +57,7 @@ def custom_openapi():
     }
     # Mark calculation endpoints as requiring Bearer auth
     for path, path_item in openapi_schema["paths"].items():
-        if "/api/calculations" in path:
+        if "/api/calculations" in path or "/api/expressions" in path:
             for method in path_item:
                 if isinstance(path_item[method], dict):
                     if "security" not in path_item[method]:
@@ -58,47 +66,159 @@ def custom_openapi():
     return app.openapi_schema
 
 
-app.openapi = custom_openapi
-
-
-@app.on_event("startup")
-def on_startup():
+def on_startup(schema_check: str = "create", db: Optional[Database] = None):
     """
-    Create database tables on application startup.
+    Prepare the database on application startup (see app.migrations for
+    the modes). "create" creates tables unless Alembic says the schema is
+    already at head (one indexed read instead of reflecting every table).
+    A database Alembic migrated to an older revision is upgraded instead:
+    create_all() never adds columns to existing tables.
+    `db` defaults to the process-wide database (DATABASE_URL).
     This will be tested directly to get full coverage.
     """
+    if schema_check == "off":
+        return
+    engine = (db or database.default_database()).get_engine()
+    if schema_check == "verify":
+        verify_schema(engine)  # raises SchemaOutOfDate: refuse to serve
+        logger.info("Database schema is at Alembic head %s", HEAD_REVISION)
+        return
+    revision = current_revision(engine)
+    if revision == HEAD_REVISION:
+        logger.info("Database schema is at Alembic head %s", HEAD_REVISION)
+        return
+    if revision is not None:
+        logger.info("Database schema is at %s, migrating to %s", revision, HEAD_REVISION)
+        migrate(engine)
+        return
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created")
 
 
-@app.get("/")
+def on_shutdown(app: FastAPI):
+    """Flush the app's buffered writes, then close its pooled DB connections."""
+    if app.state.write_behind is not None:
+        app.state.write_behind.close()
+    app.state.database.dispose()
+    logger.info("Database connections closed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = app.state.settings
+    on_startup(settings.schema_check, app.state.database)
+    if app.state.shards is not None and settings.schema_check == "create":
+        app.state.shards.prepare()
+    buffer = app.state.write_behind
+    if buffer is not None and settings.write_behind_durability != "memory":
+        write_behind.recover(settings.write_behind_spool_dir, buffer.writer, buffer.locator)
+    yield
+    on_shutdown(app)
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the application. Nothing here opens a connection or a file: the
+    engine is created on first use in each process and the log file on the
+    first record, so a prefork master can call this and fork safely.
+
+    The app's database, shards and write-behind buffer live on app.state,
+    so several apps with different settings can share a process.
+
+        uvicorn app.main:create_app --factory
+    """
+    settings = settings or Settings.from_env()
+    if settings.schema_check not in SCHEMA_CHECK_MODES:
+        raise ValueError(f"SCHEMA_CHECK must be one of {', '.join(SCHEMA_CHECK_MODES)}")
+    configure_logger(settings.log_dir)
+    db = Database(settings.database_url, settings.database_read_url)
+    shards = Shards(settings.database_shards, db) if settings.database_shards else None
+
+    app = FastAPI(
+        title="FastAPI Calculator",
+        version="0.2.0",
+        description="Simple calculator API with secure user model for Module 10",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+    app.state.database = db
+    app.state.shards = shards
+    app.state.write_behind = write_behind.build_buffer(settings, db, shards) if settings.write_behind else None
+    app.state.statistics_flight = build_statistics_flight()
+
+    # Replay stored responses for retried Idempotency-Key requests; innermost,
+    # so the stored body is the uncompressed one
+    if settings.idempotency:
+        app.state.idempotency_store = IdempotencyStore()
+        app.add_middleware(IdempotencyMiddleware, store=app.state.idempotency_store)
+
+    # Compress large JSON/HTML responses (gzip, plus br/zstd when installed)
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
+    # Opt-in, admin-only profiling (X-Profile header / sampling endpoint)
+    if settings.profiling:
+        app.add_middleware(ProfilingMiddleware, admin_ids=settings.profiling_admin_ids)
+
+    # Debug only: per-request query count and DB time as Server-Timing
+    if settings.query_debug:
+        app.add_middleware(QueryStatsMiddleware)
+
+    # Token-bucket limits per user (JWT) or IP; added last so it runs first
+    # and rejected requests never reach the DB pool
+    if settings.rate_limit:
+        app.add_middleware(RateLimitMiddleware)
+
+    # Serve simple frontend pages for Module 13
+    # (fingerprinted + precompressed copies under /static/dist after `python -m app.static_assets`)
+    app.mount("/static", static_files, name="static")
+    app.include_router(users_router, prefix="/api")
+    app.include_router(calculations_router, prefix="/api")
+    app.include_router(statistics_router, prefix="/api")
+    app.include_router(expressions_router, prefix="/api", tags=["expressions"])
+    app.include_router(router)
+
+    # 🔐 Secure user endpoints
+    app.include_router(users_router, prefix="/api", tags=["users"])
+    app.include_router(calculations_router, prefix="/api", tags=["calculations"])
+
+    if settings.profiling:
+        app.include_router(profiling_router, prefix="/api", tags=["profiling"])
+    if settings.write_behind:
+        app.include_router(write_behind_router, prefix="/api", tags=["calculations"])
+
+    app.openapi = lambda: custom_openapi(app)
+    return app
+
+
+@router.get("/")
 def root():
     logger.info("Root endpoint called")
     return {"message": "Welcome to the FastAPI Calculator!"}
 
 
-@app.get("/add", summary="Add Route")
+@router.get("/add", summary="Add Route")
 def add_route(a: float, b: float):
     result = add(a, b)
     logger.info(f"ADD {a} + {b} = {result}")
     return {"result": result}
 
 
-@app.get("/subtract", summary="Subtract Route")
+@router.get("/subtract", summary="Subtract Route")
 def subtract_route(a: float, b: float):
     result = subtract(a, b)
     logger.info(f"SUBTRACT {a} - {b} = {result}")
     return {"result": result}
 
 
-@app.get("/multiply", summary="Multiply Route")
+@router.get("/multiply", summary="Multiply Route")
 def multiply_route(a: float, b: float):
     result = multiply(a, b)
     logger.info(f"MULTIPLY {a} * {b} = {result}")
     return {"result": result}
 
 
-@app.get("/divide", summary="Divide Route")
+@router.get("/divide", summary="Divide Route")
 def divide_route(a: float, b: float):
     try:
         result = divide(a, b)
@@ -109,29 +229,24 @@ def divide_route(a: float, b: float):
         raise HTTPException(status_code=400, detail=str(exc))
 
 
-# 🔐 Secure user endpoints
-app.include_router(users_router, prefix="/api", tags=["users"])
-app.include_router(calculations_router, prefix="/api", tags=["calculations"])
-
-
 # Simple frontend endpoints
-@app.get("/register", include_in_schema=False)
-def register_page():
-    return FileResponse("static/register.html")
+@router.get("/register", include_in_schema=False)
+def register_page(request: Request):
+    return page_response("register.html", request)
 
 
-@app.get("/login", include_in_schema=False)
-def login_page():
-    return FileResponse("static/login.html")
+@router.get("/login", include_in_schema=False)
+def login_page(request: Request):
+    return page_response("login.html", request)
 
 
-@app.get("/calculations", include_in_schema=False)
-def calculations_page():
-    return FileResponse("static/calculations.html")
+@router.get("/calculations", include_in_schema=False)
+def calculations_page(request: Request):
+    return page_response("calculations.html", request)
 
 
 # Expose API-compatible routes at top-level for simple frontend posting
-@app.post("/register", response_model=UserCreate)
+@router.post("/register", response_model=UserCreate)
 def register_api(payload: UserCreate, db: Session = Depends(get_db)):
     # Mirror logic from app/users.py create_user
     existing_username = db.query(User).filter(User.username == payload.username).first()
@@ -153,10 +268,13 @@ def register_api(payload: UserCreate, db: Session = Depends(get_db)):
     return payload
 
 
-@app.post("/login", response_model=Token)
+@router.post("/login", response_model=Token)
 def login_api(payload: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == payload.username).first()
     if not user or not verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": str(user.id)})
     return Token(access_token=token)
+
+
+app = create_app()
@@ -0,0 +1,201 @@
+# app/migrations.py
+"""
+Schema-version checks against Alembic, and a one-shot migrate command.
+
+HEAD_REVISION is the newest revision on the "main" branch of
+alembic/versions; bump it together with every new migration
+(tests/unit/test_migrations.py fails otherwise). Reading it from a
+constant keeps Alembic itself out of the app's import path and startup.
+
+The Postgres table partitioning migration is an opt-in branch of its own,
+"partitioning" (`alembic upgrade partitioning@head`). Nothing here
+applies it. Its row in alembic_version is read as the main revision it
+depends on (OPTIONAL_REVISIONS).
+
+Startup modes (SCHEMA_CHECK):
+- create: create_all() unless the schema is already at head (default;
+          local development and the test suite rely on it)
+- verify: read alembic_version and refuse to start unless it is head
+- off:    no database access at startup
+
+With `verify`, run migrations once per deploy, before the workers start:
+
+    python -m app.migrations upgrade   # alembic upgrade main@head, under a lock
+    python -m app.migrations check     # exit 1 unless at head
+
+A database that `create` mode built has tables but no alembic_version.
+`upgrade` stamps it at head when every model table and column is already
+there. Otherwise it stops and asks for `alembic stamp <revision>`.
+"""
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+HEAD_REVISION = "7c2d9e1f4a3b"
+
+# Heads of opt-in branches -> the main revision they depend on. Alembic
+# records such a head in place of that main revision until main moves on.
+OPTIONAL_REVISIONS = {"3f8a6c2e9b17": "7c2d9e1f4a3b"}
+
+SCHEMA_CHECK_MODES = ("create", "verify", "off")
+
+# pg_advisory_lock key shared by every `migrate` process (any constant int8)
+MIGRATION_LOCK_KEY = 7_203_417_551
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the revision this code was built for."""
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    """The main-branch revision stamped in `alembic_version`, or None if there is none."""
+    try:
+        with engine.connect() as conn:
+            stamped = conn.execute(text("SELECT version_num FROM alembic_version")).scalars().all()
+    except DBAPIError:
+        return None  # table missing: never migrated
+    main = [revision for revision in stamped if revision not in OPTIONAL_REVISIONS]
+    if main:
+        return main[0]
+    return next((OPTIONAL_REVISIONS[revision] for revision in stamped), None)
+
+
+def is_current(engine: Engine) -> bool:
+    return current_revision(engine) == HEAD_REVISION
+
+
+def verify(engine: Engine) -> None:
+    revision = current_revision(engine)
+    if revision != HEAD_REVISION:
+        raise SchemaOutOfDate(
+            f"Database schema is at {revision or 'no revision'}, this build expects {HEAD_REVISION}; "
+            "run `python -m app.migrations upgrade`"
+        )
+
+
+@contextmanager
+def migration_lock(engine: Engine) -> Iterator[None]:
+    """
+    Serialize migrations across processes: a Postgres advisory lock, or an
+    flock on a file next to a SQLite database.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        return
+
+    database = engine.url.database if engine.dialect.name == "sqlite" else None
+    if fcntl is None or not database or database == ":memory:":
+        yield  # nothing to lock against
+        return
+    with open(f"{database}.migrate.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _alembic_config(url: str):
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    # alembic.ini names the dev SQLite file; migrate whatever the app uses.
+    # ConfigParser treats % as interpolation, so escape it.
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    # Leave the caller's logging alone (env.py would run fileConfig on it)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def missing_from_schema(engine: Engine) -> List[str]:
+    """Model tables and columns the database lacks, as "table" or "table.column"."""
+    from app.db import Base
+    import app.models  # noqa: F401  (registers the tables on Base.metadata)
+
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            missing.append(table.name)
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in columns)
+    return missing
+
+
+def _built_by_create_all(engine: Engine) -> bool:
+    return current_revision(engine) is None and inspect(engine).has_table("users")
+
+
+def upgrade(engine: Engine) -> bool:
+    """
+    Migrate to head. Safe to run from several processes at once: the
+    first takes the lock and migrates, the rest find the schema current.
+    Returns True if this call ran migrations (or stamped a create_all
+    schema).
+    """
+    from alembic import command
+
+    with migration_lock(engine):
+        if is_current(engine):
+            return False
+        config = _alembic_config(engine.url.render_as_string(hide_password=False))
+        if _built_by_create_all(engine):
+            missing = missing_from_schema(engine)
+            if missing:
+                raise SchemaOutOfDate(
+                    f"Database has tables but no alembic_version, and lacks {', '.join(missing)}; "
+                    "run `alembic stamp <revision it matches>`, then upgrade"
+                )
+            command.stamp(config, HEAD_REVISION)
+            return True
+        command.upgrade(config, "main@head")
+        return True
+
+
+def main(argv=None) -> int:
+    from app.db import get_engine
+
+    args = sys.argv[1:] if argv is None else argv
+    action = args[0] if args else "upgrade"
+    engine = get_engine()
+    if action == "upgrade":
+        try:
+            ran = upgrade(engine)
+        except SchemaOutOfDate as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Migrated to {HEAD_REVISION}" if ran else f"Already at {HEAD_REVISION}")
+        return 0
+    if action == "check":
+        try:
+            verify(engine)
+        except SchemaOutOfDate as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"At {HEAD_REVISION}")
+        return 0
+    print("usage: python -m app.migrations [upgrade|check]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 # app/models.py
+from decimal import Decimal
 from enum import Enum
 
 from sqlalchemy import (
@@ -7,8 +8,11 @@ from sqlalchemy import (
     String,
     DateTime,
     Float,
+    Numeric,
+    Text,
     Enum as SAEnum,
     ForeignKey,
+    TypeDecorator,
     func,
 )
 from sqlalchemy.orm import relationship
@@ -45,6 +49,31 @@ class CalculationType(str, Enum):
     LOG_BASE = "log_base"
 
 
+class ExactNumeric(TypeDecorator):
+    """
+    NUMERIC on Postgres. SQLite would coerce NUMERIC text to a lossy REAL,
+    so there the value is kept as its decimal string instead.
+    """
+
+    impl = Numeric
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(Text())
+        return dialect.type_descriptor(Numeric(asdecimal=True))
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "sqlite":
+            return format(Decimal(value), "f")
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, Decimal):
+            return value
+        return Decimal(value)
+
+
 class Calculation(Base):
     __tablename__ = "calculations"
 
@@ -54,5 +83,10 @@ class Calculation(Base):
     type = Column(SAEnum(CalculationType, name="calculation_type"), nullable=False)
     result = Column(Float, nullable=True)
 
+    # Exact compute modes: "float", "decimal" or "rational" (app/precision.py).
+    # result_exact is only set for the exact modes.
+    precision_mode = Column(String(16), nullable=False, default="float", server_default="float")
+    result_exact = Column(ExactNumeric(), nullable=True)
+
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     user = relationship("User", back_populates="calculations")
@@ -0,0 +1,163 @@
+# app/partitioning.py
+"""
+Maintenance for the hash-partitioned `calculations` table on Postgres.
+
+The opt-in migration branch "partitioning" (revision 3f8a6c2e9b17, applied
+with `alembic upgrade partitioning@head`) turns `calculations` into a table
+partitioned by HASH (user_id) with 16 partitions, named
+calculations_m<modulus>_r<remainder>.
+Queries filtered on user_id (browse, statistics) are pruned to one
+partition and use its (user_id, id) index. The ORM model is unchanged: it
+still maps the table name `calculations`, and Postgres routes rows to
+partitions. SQLite keeps the plain table.
+
+Hash partitions do not fill up over time the way date ranges do. A hash
+partition grows, so the maintenance step is to split a partition that has
+become too large. Splitting partition (m, r) replaces it with (2m, r) and
+(2m, r + m), and only its rows are rewritten. Postgres accepts a mix of
+moduli as long as each one divides the next larger one.
+
+    python -m app.partitioning status                       # partitions, rows, size
+    python -m app.partitioning ensure                       # create missing partitions
+    python -m app.partitioning split calculations_m16_r3    # split one partition in two
+"""
+import argparse
+import re
+import sys
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+TABLE = "calculations"
+PARTITIONS = 16  # the count migration 3f8a6c2e9b17 creates
+
+_BOUND = re.compile(r"modulus (\d+), remainder (\d+)", re.IGNORECASE)
+
+
+class Partition(NamedTuple):
+    name: str
+    modulus: int
+    remainder: int
+    rows: int = 0  # planner estimate (reltuples), cheap on huge tables
+    bytes: int = 0
+
+
+def partition_name(modulus: int, remainder: int) -> str:
+    return f"{TABLE}_m{modulus}_r{remainder}"
+
+
+def parse_bound(bound: str) -> tuple:
+    """'FOR VALUES WITH (modulus 16, remainder 3)' -> (16, 3)."""
+    match = _BOUND.search(bound)
+    if match is None:
+        raise ValueError(f"not a hash partition bound: {bound!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def missing_remainders(existing: Sequence[tuple], modulus: int) -> List[int]:
+    """
+    Remainders (mod `modulus`) not covered by the existing (modulus,
+    remainder) partitions. A partition (m, r) covers every R with R % m == r.
+    """
+    return [
+        remainder
+        for remainder in range(modulus)
+        if not any(remainder % m == r for m, r in existing)
+    ]
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": TABLE},
+    ).scalar())
+
+
+def partitions(conn: Connection) -> List[Partition]:
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, pg_total_relation_size(c.oid)"
+        " FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+        " WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": TABLE}).all()
+    return [Partition(name, *parse_bound(bound), max(rows, 0), size) for name, bound, rows, size in rows]
+
+
+def create_partition(conn: Connection, modulus: int, remainder: int) -> str:
+    name = partition_name(modulus, remainder)
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+    ))
+    # The (user_id, id) index comes from the partitioned index; the key on
+    # id is per partition (see the migration).
+    conn.execute(text(f"ALTER TABLE {name} ADD PRIMARY KEY (id)"))
+    return name
+
+
+def ensure(conn: Connection, modulus: Optional[int] = None) -> List[str]:
+    """
+    Create the partitions needed for every user_id to have a home, at
+    `modulus` (default: the largest one in use, else PARTITIONS).
+    Returns the names created.
+    """
+    existing = [(p.modulus, p.remainder) for p in partitions(conn)]
+    modulus = modulus or max((m for m, _ in existing), default=PARTITIONS)
+    return [create_partition(conn, modulus, remainder) for remainder in missing_remainders(existing, modulus)]
+
+
+def split(conn: Connection, name: str) -> List[str]:
+    """
+    Replace partition `name` (m, r) with (2m, r) and (2m, r + m), moving
+    its rows. Only that partition's rows are rewritten, but DETACH locks
+    the whole table until the transaction commits: run it in a quiet period.
+    """
+    found = {p.name: p for p in partitions(conn)}
+    if name not in found:
+        raise ValueError(f"{name!r} is not a partition of {TABLE}")
+    old = found[name]
+    modulus = old.modulus * 2
+    detached = f"{name}_splitting"
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+    conn.execute(text(f"ALTER TABLE {name} RENAME TO {detached}"))
+    created = [create_partition(conn, modulus, remainder) for remainder in (old.remainder, old.remainder + old.modulus)]
+    conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {detached}"))
+    conn.execute(text(f"DROP TABLE {detached}"))
+    for new in created:
+        conn.execute(text(f"ANALYZE {new}"))
+    return created
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from app.db import get_engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.partitioning", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="list partitions with row estimates and sizes")
+    ensure_parser = sub.add_parser("ensure", help="create missing partitions")
+    ensure_parser.add_argument("--modulus", type=int, default=None)
+    split_parser = sub.add_parser("split", help="split one partition into two")
+    split_parser.add_argument("partition")
+    args = parser.parse_args(argv)
+
+    with get_engine().begin() as conn:
+        if not is_partitioned(conn):
+            print(f"{TABLE} is not partitioned (Postgres only; run `alembic upgrade partitioning@head`)",
+                  file=sys.stderr)
+            return 1
+        if args.command == "status":
+            for p in partitions(conn):
+                print(f"{p.name:<28} modulus {p.modulus:>4} remainder {p.remainder:>4} "
+                      f"{p.rows:>14,} rows {p.bytes / 2**20:>10,.1f} MB")
+        elif args.command == "ensure":
+            created = ensure(conn, args.modulus)
+            print(f"created {', '.join(created)}" if created else "no partitions missing")
+        else:
+            print(f"split {args.partition} into {', '.join(split(conn, args.partition))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# app/precision.py
+"""
+Exact compute modes for calculations.
+
+- float:    the default, CalculationFactory on Python floats
+- decimal:  decimal.Decimal with a configurable number of significant digits
+- rational: fractions.Fraction; exact for + - * / % percent_of and integer
+            powers, irrational results (roots, logs, fractional powers) go
+            through the Decimal implementations and are rounded to `digits`
+
+Inputs arrive as floats from JSON; they are converted through their
+shortest repr, so 0.1 becomes Decimal("0.1") and not the binary value.
+"""
+from decimal import Decimal, InvalidOperation, Overflow, localcontext
+from enum import Enum
+from fractions import Fraction
+from typing import Callable, Dict, Optional, Tuple
+
+from app.calculation_factory import CalculationFactory, check_cost
+from app.models import CalculationType
+
+
+class PrecisionMode(str, Enum):
+    FLOAT = "float"
+    DECIMAL = "decimal"
+    RATIONAL = "rational"
+
+
+DEFAULT_DIGITS = 28
+MAX_DIGITS = 200
+
+# Extra digits carried through ln/exp so the final rounding is correct.
+GUARD_DIGITS = 10
+
+# Largest exact power worth building as a Fraction. The result is rounded
+# to at most MAX_DIGITS anyway, so bigger ones go through Decimal.
+MAX_EXACT_POWER_BITS = 1 << 14
+
+
+def to_decimal(value) -> Decimal:
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    if isinstance(value, Fraction):
+        return Decimal(value.numerator) / Decimal(value.denominator)
+    return Decimal(value)
+
+
+def to_fraction(value) -> Fraction:
+    if isinstance(value, float):
+        return Fraction(Decimal(repr(value)))
+    return Fraction(value)
+
+
+def format_exact(value: Decimal) -> str:
+    """Plain (non-scientific) string for a stored exact result."""
+    return format(value, "f")
+
+
+# ---------- Decimal operations ----------
+# Each runs inside a localcontext whose prec is the requested digits.
+
+def _is_integral(x: Decimal) -> bool:
+    return x == x.to_integral_value()
+
+
+def _dec_divide(a: Decimal, b: Decimal) -> Decimal:
+    if b == 0:
+        raise ZeroDivisionError("Division by zero is not allowed")
+    return a / b
+
+
+def _dec_modulus(a: Decimal, b: Decimal) -> Decimal:
+    if b == 0:
+        raise ZeroDivisionError("Modulus by zero is not allowed")
+    # Decimal's % keeps the dividend's sign; match Python float semantics.
+    r = a % b
+    if r and (r < 0) != (b < 0):
+        r += b
+    return r
+
+
+def _with_guard(fn: Callable[[], Decimal]) -> Decimal:
+    """Evaluate fn with guard digits, then round to the caller's precision."""
+    with localcontext() as ctx:
+        ctx.prec += GUARD_DIGITS
+        value = fn()
+    return +value
+
+
+def _dec_power(a: Decimal, b: Decimal) -> Decimal:
+    if _is_integral(b):
+        if a == 0 and b < 0:
+            raise ZeroDivisionError("Zero cannot be raised to a negative power")
+        # Exact repeated squaring, rounded once by the context.
+        return a ** int(b)
+    if a < 0:
+        raise ValueError("Negative base requires an integer exponent")
+    if a == 0:
+        return Decimal(0)
+    return _with_guard(lambda: (b * a.ln()).exp())
+
+
+def _dec_nth_root(a: Decimal, b: Decimal) -> Decimal:
+    if b <= 0:
+        raise ValueError("Root index (b) must be positive")
+    integral = _is_integral(b)
+    if a < 0 and integral and int(b) % 2 == 0:
+        raise ValueError("Cannot take even root of negative number")
+    if a < 0 and not integral:
+        raise ValueError("Cannot take a fractional root of a negative number")
+    if a == 0:
+        return Decimal(0)
+    if a < 0:
+        return -_dec_nth_root(-a, b)
+
+    def root():
+        x = (a.ln() / b).exp()
+        if integral:
+            # One Newton step polishes the last guard digits.
+            n = int(b)
+            x = ((n - 1) * x + a / x ** (n - 1)) / n
+        return x
+
+    return _with_guard(root)
+
+
+def _dec_log_base(a: Decimal, b: Decimal) -> Decimal:
+    if a <= 0:
+        raise ValueError("Logarithm argument (a) must be positive")
+    if b <= 0:
+        raise ValueError("Logarithm base (b) must be positive")
+    if b == 1:
+        raise ValueError("Logarithm base (b) cannot be 1")
+    return _with_guard(lambda: a.ln() / b.ln())
+
+
+DECIMAL_OPERATIONS: Dict[CalculationType, Callable[[Decimal, Decimal], Decimal]] = {
+    CalculationType.ADD: lambda a, b: a + b,
+    CalculationType.SUBTRACT: lambda a, b: a - b,
+    CalculationType.MULTIPLY: lambda a, b: a * b,
+    CalculationType.DIVIDE: _dec_divide,
+    CalculationType.POWER: _dec_power,
+    CalculationType.MODULUS: _dec_modulus,
+    CalculationType.PERCENT_OF: lambda a, b: a * b / 100,
+    CalculationType.NTH_ROOT: _dec_nth_root,
+    CalculationType.LOG_BASE: _dec_log_base,
+}
+
+
+# ---------- Rational operations ----------
+
+def _frac_divide(a: Fraction, b: Fraction) -> Fraction:
+    if b == 0:
+        raise ZeroDivisionError("Division by zero is not allowed")
+    return a / b
+
+
+def _frac_modulus(a: Fraction, b: Fraction) -> Fraction:
+    if b == 0:
+        raise ZeroDivisionError("Modulus by zero is not allowed")
+    return a % b
+
+
+def _frac_power(a: Fraction, b: Fraction) -> Optional[Fraction]:
+    if b.denominator != 1:
+        return None  # irrational in general: use the Decimal implementation
+    if a == 0 and b < 0:
+        raise ZeroDivisionError("Zero cannot be raised to a negative power")
+    bits = abs(b.numerator) * max(a.numerator.bit_length(), a.denominator.bit_length())
+    if bits > MAX_EXACT_POWER_BITS:
+        return None  # e.g. 1.0001 ** 1000000: same rounded result, far cheaper
+    return a ** b.numerator
+
+
+RATIONAL_OPERATIONS: Dict[CalculationType, Callable[[Fraction, Fraction], Optional[Fraction]]] = {
+    CalculationType.ADD: lambda a, b: a + b,
+    CalculationType.SUBTRACT: lambda a, b: a - b,
+    CalculationType.MULTIPLY: lambda a, b: a * b,
+    CalculationType.DIVIDE: _frac_divide,
+    CalculationType.POWER: _frac_power,
+    CalculationType.MODULUS: _frac_modulus,
+    CalculationType.PERCENT_OF: lambda a, b: a * b / 100,
+}
+
+
+def compute(
+    calc_type: CalculationType,
+    a: float,
+    b: float,
+    mode: PrecisionMode = PrecisionMode.FLOAT,
+    digits: Optional[int] = None,
+) -> Tuple[float, Optional[Decimal]]:
+    """
+    Compute `a <op> b` in the requested mode.
+    Returns (float result, exact Decimal result or None in float mode).
+    """
+    if mode == PrecisionMode.FLOAT:
+        return CalculationFactory.get_operation(calc_type).compute(a, b), None
+
+    check_cost(calc_type, a, b)
+    digits = digits or DEFAULT_DIGITS
+    try:
+        with localcontext() as ctx:
+            ctx.prec = digits
+            exact = None
+            if mode == PrecisionMode.RATIONAL and calc_type in RATIONAL_OPERATIONS:
+                value = RATIONAL_OPERATIONS[calc_type](to_fraction(a), to_fraction(b))
+                if value is not None:
+                    # Division rounds once, to `digits` significant digits.
+                    exact = to_decimal(value)
+            if exact is None:
+                exact = DECIMAL_OPERATIONS[calc_type](to_decimal(a), to_decimal(b))
+            exact = +exact
+            if not exact:
+                # Underflow leaves zeros like 0E-1000026; store a plain 0.
+                exact = Decimal(0)
+    except (InvalidOperation, Overflow):
+        raise ValueError("Result is out of range")
+
+    approx = float(exact)
+    if approx in (float("inf"), float("-inf")):
+        raise OverflowError("Result is too large to store")
+    return approx, exact
@@ -0,0 +1,226 @@
+# app/profiling.py
+"""
+Opt-in production profiling (PROFILING_ENABLED=true), admin-only
+(PROFILING_ADMIN_IDS=1,7 - user ids, as in the JWT `sub`).
+
+- Sampling: POST /api/admin/profile?seconds=10 samples every thread of
+  this worker (sys._current_frames) every interval_ms for that long, and
+  returns collapsed stacks ("thread;outer;...;inner count" per line), the
+  input format of flamegraph.pl, speedscope and inferno.
+- Per request: an admin request with `X-Profile: 1` runs its endpoint
+  under cProfile and gets the pstats report (top functions by cumulative
+  time) instead of the normal body, with the original status in
+  X-Profile-Status. Dependencies (auth, session) are not included. For
+  async endpoints, other coroutines interleaving on the event loop show up
+  too.
+
+When the setting is off there are no admin routes and no middleware; what
+remains is the ProfiledRoute wrapper around each endpoint, which costs one
+context variable lookup per request.
+"""
+import asyncio
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, FrozenSet, Iterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import bearer_user_id, get_current_user
+from app.models import User
+
+PROFILE_HEADER = "x-profile"
+MAX_SAMPLE_SECONDS = 60.0
+REPORT_LIMIT = 40
+
+_request_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+# cProfile attaches to the calling thread; one profiled request at a time
+# keeps two of them from fighting over the same thread pool worker.
+_request_lock = threading.Lock()
+
+
+def _label(code) -> str:
+    path = code.co_filename
+    marker = "site-packages" + os.sep
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    elif path.startswith(os.getcwd()):
+        path = os.path.relpath(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical profiler over all threads; collapsed stacks as output."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def sample(self, skip_thread: Optional[int] = None) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip_thread:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        """Sample until `seconds` have passed (blocks the calling thread)."""
+        me = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            self.sample(skip_thread=me)
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+_sampling_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.ran = False
+
+    @contextmanager
+    def active(self) -> Iterator[None]:
+        self.ran = True
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+
+    def report(self, limit: int = REPORT_LIMIT) -> str:
+        if not self.ran:
+            return "endpoint did not run (rejected by a dependency or validation)\n"
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+def profiled(call: Callable) -> Callable:
+    """Wrap an endpoint so it runs under the request's cProfile, if any."""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            profile = _request_profile.get()
+            if profile is None:
+                return await call(*args, **kwargs)
+            with profile.active():
+                return await call(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        profile = _request_profile.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        with profile.active():
+            return call(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose endpoint runs under the request's cProfile when there is
+    one. The routers use it as route_class: this FastAPI builds a handler
+    per router inclusion, lazily, from route.endpoint, so the endpoint has
+    to be wrapped when the route is created.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+def admin_user_id(headers: Headers, admin_ids: FrozenSet[int]) -> Optional[int]:
+    """The caller's id if the bearer token is valid and belongs to an admin."""
+    user_id = bearer_user_id(headers)
+    return user_id if user_id in admin_ids else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, admin_ids: FrozenSet[int] = frozenset()):
+        self.app = app
+        self.admin_ids = admin_ids
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER) not in ("1", "true") or admin_user_id(headers, self.admin_ids) is None:
+            await self.app(scope, receive, send)
+            return
+        if not _request_lock.acquire(blocking=False):
+            response = PlainTextResponse("another request is being profiled\n", status_code=409)
+            await response(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        status: Dict[str, int] = {}
+
+        async def discard(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        token = _request_profile.set(profile)
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            _request_profile.reset(token)
+            _request_lock.release()
+
+        response = PlainTextResponse(profile.report(), headers={"X-Profile-Status": str(status.get("code", 500))})
+        await response(scope, receive, send)
+
+
+def require_admin(request: Request, current_user: User = Depends(get_current_user)) -> User:
+    if current_user.id not in request.app.state.settings.profiling_admin_ids:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current_user
+
+
+router = APIRouter()
+
+
+@router.post("/admin/profile", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(10.0, gt=0, le=MAX_SAMPLE_SECONDS),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    admin: User = Depends(require_admin),
+):
+    """Sample this worker for `seconds`; returns collapsed stacks for a flamegraph."""
+    if not _sampling_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+    try:
+        profiler = SamplingProfiler(interval=interval_ms / 1000)
+        await run_in_threadpool(profiler.run, seconds)
+    finally:
+        _sampling_lock.release()
+    return PlainTextResponse(profiler.collapsed(), headers={"X-Profile-Samples": str(profiler.samples)})
@@ -0,0 +1,45 @@
+# app/queries.py
+"""
+Read-optimized query helpers.
+
+The read endpoints only need a few scalar columns, so these select just
+those columns instead of loading full Calculation entities (identity map,
+instance state, relationship loaders). Rows come back as SQLAlchemy Row
+objects: plain named tuples, so `row.result` / `row.type` still work.
+"""
+from typing import List, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models import Calculation
+
+# Columns (and JSON keys, in CalculationRead field order) for list responses
+BROWSE_FIELDS = ("a", "type", "b", "id", "result", "user_id", "precision_mode", "result_exact")
+
+# Columns the statistics endpoints aggregate over
+STATS_FIELDS = ("type", "a", "b", "result")
+
+
+def _columns(fields: Sequence[str]):
+    return [getattr(Calculation, field) for field in fields]
+
+
+def calculation_rows(db: Session, user_id: int) -> List:
+    """All of a user's calculations as BROWSE_FIELDS tuples."""
+    return db.query(*_columns(BROWSE_FIELDS)).filter(Calculation.user_id == user_id).all()
+
+
+def statistics_rows(db: Session, user_id: int) -> List:
+    """All of a user's calculations as STATS_FIELDS tuples."""
+    return db.query(*_columns(STATS_FIELDS)).filter(Calculation.user_id == user_id).all()
+
+
+def recent_statistics_rows(db: Session, user_id: int, limit: int) -> List:
+    """The user's `limit` newest calculations as STATS_FIELDS tuples."""
+    return (
+        db.query(*_columns(STATS_FIELDS))
+        .filter(Calculation.user_id == user_id)
+        .order_by(Calculation.id.desc())
+        .limit(limit)
+        .all()
+    )
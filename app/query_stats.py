@@ -0,0 +1,134 @@
+# app/query_stats.py
+"""
+Per-request SQL accounting: statement count, time spent in the database,
+and repeated statements (the usual shape of an N+1, e.g. a lazy
+`User.calculations` load inside a loop).
+
+Two ways to collect:
+
+- QueryStatsMiddleware (debug mode, QUERY_DEBUG=true) gives every HTTP
+  request its own QueryStats through a context variable. Sync routes run
+  in a thread pool with a copy of that context, so their statements land in
+  the same object. The totals go out as a Server-Timing header, and a
+  statement repeated REPEAT_THRESHOLD times or more is logged as a likely
+  N+1.
+- capture(engine) records everything one engine runs while the block is
+  open, whatever the context. The test suite uses it to hold endpoints to
+  a query budget.
+
+The listeners are installed only when one of these is used, so a normal
+production app pays nothing.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("fastapi_calculator")
+
+# The same SQL text this many times in one request is reported as N+1.
+REPEAT_THRESHOLD = 5
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statements run at least `threshold` times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_query_stats_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def install() -> None:
+    """Listen on every Engine (including ones created later); idempotent."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track() -> Iterator[QueryStats]:
+    """Collect this context's statements (needs install())."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def capture(engine: Engine) -> Iterator[QueryStats]:
+    """Collect every statement `engine` runs while the block is open."""
+    stats = QueryStats()
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._query_capture_start = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stats.record(statement, time.perf_counter() - context._query_capture_start)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    try:
+        yield stats
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app: ASGIApp, repeat_threshold: int = REPEAT_THRESHOLD):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        install()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+                self.report(scope, stats)
+            await send(message)
+
+        with track() as stats:
+            await self.app(scope, receive, send_with_timing)
+
+    def report(self, scope: Scope, stats: QueryStats) -> None:
+        path = f"{scope['method']} {scope['path']}"
+        logger.debug("%s: %d queries, %.2f ms in the database", path, stats.count, stats.seconds * 1000)
+        for statement, n in stats.repeated(self.repeat_threshold):
+            logger.warning("Possible N+1 in %s: ran %d times: %s", path, n, " ".join(statement.split()))
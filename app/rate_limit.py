@@ -0,0 +1,353 @@
+# app/rate_limit.py
+"""
+Token-bucket rate limiting.
+
+Every client gets its own bucket per policy, keyed by the user id in a
+valid JWT or, for anonymous requests, the client IP. A bucket holds up to
+`burst` tokens and refills at `rate` tokens per second; each request takes
+one. Because buckets are per client, one tenant hammering the API only
+drains its own bucket and cannot starve everyone else.
+
+Stores:
+- MemoryStore: sharded in-process dicts, for a single worker. Each worker
+               has its own, so under N workers a client effectively gets
+               N times the limit.
+- SQLStore:    one row per bucket in SQLite/Postgres, shared by all workers
+
+Anonymous requests are keyed by the peer address. Behind a load balancer
+that is the balancer's, so every anonymous client would share one bucket:
+list the proxies in RATE_LIMIT_TRUSTED_PROXIES (addresses or CIDR blocks)
+and the client address is taken from their X-Forwarded-For instead.
+
+Responses carry `RateLimit-Limit`, `RateLimit-Remaining`, `RateLimit-Reset`
+and `RateLimit-Policy` headers (IETF RateLimit fields draft); rejected
+requests get `429` with `Retry-After`.
+"""
+import ipaddress
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import Column, Float, MetaData, String, Table, case, create_engine, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    name: str
+    burst: int  # bucket capacity
+    period: float  # seconds to refill a full bucket
+
+    @property
+    def rate(self) -> float:
+        return self.burst / self.period
+
+    def policy(self) -> str:
+        return f"{self.burst};w={self.period:g}"
+
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+
+def parse_limit(name: str, text: str) -> RateLimit:
+    """Parse "100/minute" or "20/10second" into a RateLimit."""
+    match = _LIMIT_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {text!r}")
+    count, multiplier, unit = match.groups()
+    return RateLimit(name, int(count), int(multiplier or 1) * _PERIODS[unit])
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    reset: float  # seconds until the bucket is full again
+    retry_after: float  # seconds until one token is available (0 if allowed)
+
+
+def _refill(tokens: float, updated: float, now: float, limit: RateLimit) -> float:
+    return min(float(limit.burst), tokens + max(0.0, now - updated) * limit.rate)
+
+
+def _decision(allowed: bool, tokens: float, limit: RateLimit) -> Decision:
+    retry_after = 0.0 if allowed else (1 - tokens) / limit.rate
+    return Decision(allowed, int(tokens), (limit.burst - tokens) / limit.rate, retry_after)
+
+
+# ---------- Stores ----------
+
+class MemoryStore:
+    """
+    In-process buckets, split over `shards` dicts each with its own lock so
+    concurrent requests for different clients rarely contend. Buckets that
+    have refilled completely are equivalent to missing ones and are pruned
+    as a shard grows. Each bucket keeps the limit it was filled under, since
+    one shard holds buckets of every policy.
+    """
+
+    blocking = False  # cheap enough to run on the event loop
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000):
+        self._shards: List[Dict[str, Tuple[float, float, RateLimit]]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def consume(self, key: str, limit: RateLimit, now: Optional[float] = None) -> Decision:
+        now = time.monotonic() if now is None else now
+        index = hash(key) % len(self._shards)
+        shard = self._shards[index]
+        with self._locks[index]:
+            tokens, updated, _ = shard.get(key, (float(limit.burst), now, limit))
+            tokens = _refill(tokens, updated, now, limit)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            shard[key] = (tokens, now, limit)
+            if len(shard) > self.max_keys_per_shard:
+                self._prune(shard, now)
+        return _decision(allowed, tokens, limit)
+
+    @staticmethod
+    def _prune(shard: Dict[str, Tuple[float, float, RateLimit]], now: float) -> None:
+        full = [
+            k for k, (tokens, updated, limit) in shard.items()
+            if _refill(tokens, updated, now, limit) >= limit.burst
+        ]
+        for k in full:
+            del shard[k]
+
+    def clear(self) -> None:
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.clear()
+
+
+class SQLStore:
+    """
+    Buckets in a `rate_limit_buckets` table, so every worker process (and
+    host) shares them. Taking a token is a single conditional UPDATE that
+    does the refill arithmetic in SQL, which the database applies
+    atomically; there is no read-modify-write race between workers.
+
+    Rows only record tokens and time, not their limit, so pruning goes by
+    age: at most once per period of each limit, its rows untouched for a
+    whole period (and so certainly full again) are deleted.
+
+    The table holds throwaway operational state and is created on first
+    use rather than through Alembic.
+    """
+
+    blocking = True  # a database round trip: keep it off the event loop
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._metadata = MetaData()
+        self.table = Table(
+            "rate_limit_buckets",
+            self._metadata,
+            Column("key", String(255), primary_key=True),
+            Column("tokens", Float, nullable=False),
+            Column("updated_at", Float, nullable=False),
+        )
+        self._metadata.create_all(engine, checkfirst=True)
+        self._next_prune: Dict[str, float] = {}
+        self._prune_lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str) -> "SQLStore":
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        return cls(create_engine(url, connect_args=connect_args))
+
+    def consume(self, key: str, limit: RateLimit, now: Optional[float] = None) -> Decision:
+        # Wall-clock time: monotonic clocks are not comparable across hosts.
+        now = time.time() if now is None else now
+        self._maybe_prune(limit, now)
+        t = self.table
+        refilled = t.c.tokens + (now - t.c.updated_at) * limit.rate
+        refilled = case((refilled > limit.burst, float(limit.burst)), else_=refilled)
+        for _ in range(2):
+            with self.engine.begin() as conn:
+                taken = conn.execute(
+                    update(t)
+                    .where(t.c.key == key, refilled >= 1)
+                    .values(tokens=refilled - 1, updated_at=now)
+                )
+                row = conn.execute(select(t.c.tokens, t.c.updated_at).where(t.c.key == key)).first()
+                if row is not None:
+                    if taken.rowcount:
+                        return _decision(True, row.tokens, limit)
+                    return _decision(False, _refill(row.tokens, row.updated_at, now, limit), limit)
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(t.insert().values(key=key, tokens=float(limit.burst) - 1, updated_at=now))
+                return _decision(True, float(limit.burst) - 1, limit)
+            except IntegrityError:
+                continue  # another worker created it first; take from that row
+        raise RuntimeError(f"Could not create rate limit bucket {key!r}")  # pragma: no cover
+
+    def _maybe_prune(self, limit: RateLimit, now: float) -> None:
+        with self._prune_lock:
+            if now < self._next_prune.get(limit.name, 0.0):
+                return
+            self._next_prune[limit.name] = now + limit.period
+        t = self.table
+        with self.engine.begin() as conn:
+            conn.execute(
+                t.delete().where(
+                    t.c.key.startswith(f"{limit.name}:", autoescape=True),
+                    t.c.updated_at <= now - limit.period,
+                )
+            )
+
+    def clear(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete())
+
+
+# ---------- Middleware ----------
+
+class Rule(NamedTuple):
+    methods: Optional[FrozenSet[str]]  # None matches every method
+    path_prefix: str
+    limit: RateLimit
+    per_ip: bool = False  # key by IP even when a token is present
+    exact: bool = False  # match path_prefix as the whole path
+
+
+def default_rules() -> List[Rule]:
+    """
+    Login/registration are limited per IP (they are what credential
+    stuffing hits); the rest of the API per user.
+    """
+    auth = parse_limit("auth", os.getenv("RATE_LIMIT_AUTH", "10/minute"))
+    api = parse_limit("api", os.getenv("RATE_LIMIT_API", "300/minute"))
+    post = frozenset({"POST"})
+    return [
+        Rule(post, "/login", auth, per_ip=True),
+        Rule(post, "/register", auth, per_ip=True),
+        Rule(post, "/api/users/login", auth, per_ip=True),
+        Rule(post, "/api/users/register", auth, per_ip=True),
+        Rule(post, "/api/users", auth, per_ip=True, exact=True),
+        Rule(None, "/api/", api),
+    ]
+
+
+def build_store(url: Optional[str] = None):
+    """RATE_LIMIT_STORE_URL selects a shared SQL store; default is in-memory."""
+    url = url if url is not None else os.getenv("RATE_LIMIT_STORE_URL")
+    return SQLStore.from_url(url) if url else MemoryStore()
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_proxies(text: Optional[str] = None) -> Tuple[Network, ...]:
+    """RATE_LIMIT_TRUSTED_PROXIES: comma-separated addresses or CIDR blocks."""
+    text = text if text is not None else os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "")
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in text.split(",") if part.strip())
+
+
+def _trusted(address: str, proxies: Sequence[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in proxies)
+
+
+def client_ip(headers: Headers, scope: Scope, proxies: Sequence[Network] = ()) -> str:
+    """
+    The peer address, or when the peer is a trusted proxy, the right-most
+    X-Forwarded-For address that is not itself a trusted proxy.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not proxies or not _trusted(address, proxies):
+        return address
+    forwarded = [part.strip() for part in headers.get("x-forwarded-for", "").split(",") if part.strip()]
+    for hop in reversed(forwarded):
+        address = hop
+        if not _trusted(hop, proxies):
+            break
+    return address
+
+
+def client_key(headers: Headers, scope: Scope, per_ip: bool = False, proxies: Sequence[Network] = ()) -> str:
+    if not per_ip:
+        from app.auth import bearer_user_id  # deferred: app.settings imports this module
+
+        # Verified decode: an unsigned token must not pick its own bucket;
+        # an invalid one falls back to the IP and the route will 401.
+        user_id = bearer_user_id(headers)
+        if user_id is not None:
+            return f"user:{user_id}"
+    return f"ip:{client_ip(headers, scope, proxies)}"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, store=None, rules: Optional[Sequence[Rule]] = None,
+                 trusted_proxies: Optional[Sequence[Network]] = None):
+        self.app = app
+        self.store = store if store is not None else build_store()
+        self.rules = list(rules) if rules is not None else default_rules()
+        self.trusted_proxies = tuple(trusted_proxies) if trusted_proxies is not None else parse_proxies()
+
+    def match(self, method: str, path: str) -> Optional[Rule]:
+        for rule in self.rules:
+            if rule.methods is not None and method not in rule.methods:
+                continue
+            if path == rule.path_prefix if rule.exact else path.startswith(rule.path_prefix):
+                return rule
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = self.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{rule.limit.name}:{client_key(Headers(scope=scope), scope, rule.per_ip, self.trusted_proxies)}"
+        if getattr(self.store, "blocking", True):
+            decision = await run_in_threadpool(self.store.consume, key, rule.limit)
+        else:
+            decision = self.store.consume(key, rule.limit)
+        headers = rate_limit_headers(rule.limit, decision)
+
+        if not decision.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+            response = JSONResponse({"detail": "Too many requests"}, status_code=429, headers=headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def rate_limit_headers(limit: RateLimit, decision: Decision) -> Dict[str, str]:
+    return {
+        "RateLimit-Limit": str(limit.burst),
+        "RateLimit-Remaining": str(max(0, decision.remaining)),
+        "RateLimit-Reset": str(math.ceil(decision.reset)),
+        "RateLimit-Policy": limit.policy(),
+    }
+
+
+def rate_limit_enabled() -> bool:
+    return os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
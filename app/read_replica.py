@@ -0,0 +1,168 @@
+# app/read_replica.py
+"""
+Read routing for the read-only endpoints (browse, read one, statistics).
+
+get_read_db yields a session on the replica (DATABASE_READ_URL) when it is
+safe to, and otherwise the request's normal get_db session on the primary:
+
+- no replica configured;
+- the replica is unreachable or lags more than DATABASE_READ_MAX_LAG
+  seconds (measured at most once per LAG_CHECK_INTERVAL per worker);
+- the user committed a write less than DATABASE_READ_STICKY_SECONDS ago
+  (read-your-writes: a list fetched right after a create must include it);
+- calculations are sharded (app.sharding): reads go to the user's shard.
+
+Writes are noticed through Session events: get_current_user tags the
+session with the user's id, and a commit that flushed anything marks that
+user as a recent writer. The record is per worker process; behind several
+workers, a user's next request may land on a worker that has not seen the
+write, and then only the lag threshold bounds staleness.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user
+from app import db as database
+from app import sharding
+from app.db import Database
+from app.models import User
+
+MAX_REPLICA_LAG = float(os.getenv("DATABASE_READ_MAX_LAG", "5"))
+STICKY_SECONDS = float(os.getenv("DATABASE_READ_STICKY_SECONDS", "10"))
+LAG_CHECK_INTERVAL = 1.0
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+# (replay_timestamp alone would grow on an idle but caught-up standby).
+_POSTGRES_LAG = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+def replica_lag(engine: Engine) -> float:
+    """Replication lag in seconds; raises if the replica cannot be reached."""
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return float(conn.execute(_POSTGRES_LAG).scalar() or 0)
+        conn.execute(text("SELECT 1"))  # no lag to measure, but it must answer
+        return 0.0
+
+
+class ReplicaMonitor:
+    """Caches whether the replica is usable, re-checking every `interval` seconds."""
+
+    def __init__(
+        self,
+        max_lag: float = MAX_REPLICA_LAG,
+        interval: float = LAG_CHECK_INTERVAL,
+        probe: Callable[[Engine], float] = replica_lag,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_lag = max_lag
+        self.interval = interval
+        self.probe = probe
+        self.clock = clock
+        self.lag: Optional[float] = None  # None: unreachable or not checked yet
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def usable(self, engine: Engine) -> bool:
+        now = self.clock()
+        if self._checked_at is None or now - self._checked_at >= self.interval:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at >= self.interval:
+                    try:
+                        self.lag = self.probe(engine)
+                    except Exception:
+                        self.lag = None
+                    self._checked_at = now
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def reset(self) -> None:
+        self.lag = self._checked_at = None
+
+
+class RecentWriters:
+    """User ids that committed a write within the last `window` seconds."""
+
+    PRUNE_ABOVE = 10_000
+
+    def __init__(self, window: float = STICKY_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._until: Dict[int, float] = {}
+
+    def mark(self, user_id: int) -> None:
+        now = self.clock()
+        self._until[user_id] = now + self.window
+        if len(self._until) > self.PRUNE_ABOVE:
+            self._until = {uid: t for uid, t in list(self._until.items()) if t > now}
+
+    def is_recent(self, user_id: int) -> bool:
+        until = self._until.get(user_id)
+        return until is not None and until > self.clock()
+
+    def clear(self) -> None:
+        self._until.clear()
+
+
+monitor = ReplicaMonitor()
+recent_writers = RecentWriters()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_writer(session):
+    user_id = session.info.get("user_id")
+    if session.info.pop("wrote", False) and user_id is not None:
+        recent_writers.mark(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session):
+    session.info.pop("wrote", None)
+
+
+def use_replica(db: Database, user_id: int, sharded: bool = False) -> Optional[Engine]:
+    """The replica engine of `db` if this user's read may go there, else None."""
+    engine = db.get_read_engine()
+    if engine is None or sharded or recent_writers.is_recent(user_id):
+        return None
+    return engine if monitor.usable(engine) else None
+
+
+def read_route(db: Session) -> str:
+    """Where a get_read_db session reads from: "replica" or "primary"."""
+    return "replica" if db.info.get("replica") else "primary"
+
+
+def get_read_db(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(sharding.get_shard_db),
+) -> Iterator[Session]:
+    """A session for read-only queries: the replica when safe, else `db`."""
+    app_db = database.for_app(request.app)
+    engine = use_replica(app_db, current_user.id, sharded=sharding.for_app(request.app) is not None)
+    if engine is None:
+        yield db
+        return
+    replica = app_db.session(engine)
+    replica.info["replica"] = True
+    try:
+        yield replica
+    finally:
+        replica.close()
@@ -1,10 +1,11 @@
 # app/schemas.py
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr, Field, validator
 
 from app.models import CalculationType
+from app.precision import MAX_DIGITS, PrecisionMode, format_exact
 
 
 # ---------- User Schemas ----------
@@ -51,19 +52,75 @@ class CalculationBase(BaseModel):
 class CalculationCreate(CalculationBase):
     """
     Incoming data when creating a calculation.
+    `precision` selects float (default), decimal or rational arithmetic;
+    `digits` is the significant-digit precision for the exact modes.
     """
-    pass
+    precision: PrecisionMode = PrecisionMode.FLOAT
+    digits: Optional[int] = Field(None, ge=1, le=MAX_DIGITS)
 
 
 class CalculationRead(CalculationBase):
     id: int
     result: float
     user_id: Optional[int] = None
+    precision_mode: PrecisionMode = PrecisionMode.FLOAT
+    result_exact: Optional[str] = None
+
+    @validator("result_exact", pre=True)
+    def exact_as_string(cls, v):
+        # Stored as NUMERIC; sent as a string so no digits are lost in JSON
+        if v is None or isinstance(v, str):
+            return v
+        return format_exact(v)
 
     class Config:
         orm_mode = True
 
 
+class CalculationQueued(CalculationBase):
+    """202 reply to a `Prefer: respond-async` create (see app/write_behind.py)."""
+    provisional_id: str
+    status: str = "queued"
+    result: float
+    user_id: Optional[int] = None
+    precision_mode: PrecisionMode = PrecisionMode.FLOAT
+    result_exact: Optional[str] = None
+
+    @validator("result_exact", pre=True)
+    def exact_as_string(cls, v):
+        if v is None or isinstance(v, str):
+            return v
+        return format_exact(v)
+
+
+# ---------- Expression Schemas ----------
+
+MAX_EXPRESSION_BINDINGS = 10000
+
+
+class ExpressionEvaluate(BaseModel):
+    """
+    A formula plus one set of variable values per result, e.g.
+    {"expression": "(a + b) ^ c / d", "bindings": [{"a": 1, "b": 2, "c": 2, "d": 3}]}
+    """
+    expression: str = Field(..., min_length=1, max_length=1000)
+    bindings: List[Dict[str, float]] = Field(default_factory=lambda: [{}])
+
+    @validator("bindings")
+    def limit_bindings(cls, v):
+        if not v:
+            raise ValueError("At least one binding is required")
+        if len(v) > MAX_EXPRESSION_BINDINGS:
+            raise ValueError(f"At most {MAX_EXPRESSION_BINDINGS} bindings per request")
+        return v
+
+
+class ExpressionResult(BaseModel):
+    expression: str
+    variables: List[str]
+    results: List[float]
+
+
 # ---------- Auth Schemas ----------
 class UserLogin(BaseModel):
     username: str
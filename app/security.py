@@ -1,30 +1,53 @@
 # app/security.py
-from passlib.context import CryptContext
+"""
+Password hashing and JWT helpers.
+
+passlib and python-jose (which pulls in `cryptography`) account for about
+a tenth of the app's import time, so they are imported on first use
+rather than at module import. load_backends() imports both up front, for
+a prefork master that wants them shared with its workers.
+"""
 import os
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
-from jose import jwt, JWTError
 
-# Use PBKDF2-SHA256 instead of bcrypt to avoid backend issues and 72-byte limits.
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto",
-)
+@lru_cache(maxsize=None)
+def pwd_context():
+    from passlib.context import CryptContext
+
+    # Use PBKDF2-SHA256 instead of bcrypt to avoid backend issues and 72-byte limits.
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+    )
+
+
+def _jwt():
+    from jose import jwt
+
+    return jwt
+
+
+def load_backends() -> None:
+    """Import the hashing and JWT libraries now instead of on first use."""
+    pwd_context()
+    _jwt()
 
 
 def hash_password(password: str) -> str:
     """
     Hash a plain-text password using a strong, one-way hash.
     """
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify that a plain-text password matches the stored hash.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 # --- JWT helpers ---
@@ -37,13 +60,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _jwt().encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError as exc:
-        raise
+    """Decode and verify a token; raises jose.JWTError if it is invalid."""
+    return _jwt().decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -0,0 +1,76 @@
+# app/settings.py
+"""
+Process settings, read from the environment by Settings.from_env().
+
+create_app() takes a Settings so tests and tools can build an app against
+another database or log directory without touching os.environ.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional
+
+from app.rate_limit import rate_limit_enabled
+
+
+def default_database_url() -> str:
+    # Use DATABASE_URL if provided (Docker / CI),
+    # otherwise default to a local SQLite DB for development & tests.
+    return os.getenv("DATABASE_URL") or "sqlite:///./app.db"
+
+
+def default_read_database_url() -> Optional[str]:
+    # Optional read replica for the read-only endpoints (app.read_replica)
+    return os.getenv("DATABASE_READ_URL") or None
+
+
+def parse_ids(value: str) -> FrozenSet[int]:
+    """"1, 7" -> frozenset({1, 7})"""
+    return frozenset(int(part) for part in value.split(",") if part.strip())
+
+
+def parse_shards(value: str) -> Dict[str, str]:
+    """"s0=url,s1=url" -> {"s0": url, "s1": url}; bare URLs are named shard0, shard1, ..."""
+    shards: Dict[str, str] = {}
+    for index, part in enumerate(p.strip() for p in value.split(",") if p.strip()):
+        name, sep, url = part.partition("=")
+        if not sep or "://" in name:
+            name, url = f"shard{index}", part
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: str = "sqlite:///./app.db"
+    database_read_url: Optional[str] = None
+    database_shards: Dict[str, str] = field(default_factory=dict)  # name -> URL, see app.sharding
+    log_dir: str = "logs"
+    rate_limit: bool = True
+    compression_minimum_size: int = 500
+    schema_check: str = "create"  # see app.migrations
+    query_debug: bool = False  # Server-Timing + N+1 warnings, see app.query_stats
+    profiling: bool = False  # admin profiling endpoints, see app.profiling
+    profiling_admin_ids: FrozenSet[int] = frozenset()
+    idempotency: bool = True  # Idempotency-Key on create endpoints, see app.idempotency
+    write_behind: bool = False  # Prefer: respond-async creates, see app.write_behind
+    write_behind_durability: str = "memory"
+    write_behind_spool_dir: str = "spool"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=default_database_url(),
+            database_read_url=default_read_database_url(),
+            database_shards=parse_shards(os.getenv("DATABASE_SHARDS", "")),
+            log_dir=os.getenv("LOG_DIR", "logs"),
+            rate_limit=rate_limit_enabled(),
+            compression_minimum_size=int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500")),
+            schema_check=os.getenv("SCHEMA_CHECK", "create"),
+            query_debug=os.getenv("QUERY_DEBUG", "false").lower() in ("1", "true", "yes"),
+            profiling=os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes"),
+            profiling_admin_ids=parse_ids(os.getenv("PROFILING_ADMIN_IDS", "")),
+            idempotency=os.getenv("IDEMPOTENCY_ENABLED", "true").lower() in ("1", "true", "yes"),
+            write_behind=os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes"),
+            write_behind_durability=os.getenv("WRITE_BEHIND_DURABILITY", "memory"),
+            write_behind_spool_dir=os.getenv("WRITE_BEHIND_SPOOL_DIR", "spool"),
+        )
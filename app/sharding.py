@@ -0,0 +1,326 @@
+# app/sharding.py
+"""
+Horizontal sharding of `calculations` by user_id.
+
+DATABASE_SHARDS="s0=postgresql://.../calc0,s1=postgresql://.../calc1" maps
+shard names to database URLs. Users and everything else stay on
+DATABASE_URL (the primary); a user's calculations live on one shard, picked
+by a consistent-hash ring over the shard names, so adding a shard moves only
+about 1/N of the users. Name shards rather than relying on their position:
+the ring hashes names, and renaming a shard moves its users.
+
+The primary also holds a small `shard_directory` table of exceptions to the
+ring: users pinned to another shard, and users being moved (writes for them
+get 503 + Retry-After until the move finishes; reads keep working).
+
+Calculation ids stay unique across shards, so a move can keep them: shard i
+(in DATABASE_SHARDS order) hands out ids from i * ID_BLOCK up.
+
+create_app() keeps the app's Shards (names, ring and engines) on
+app.state.shards, or None when DATABASE_SHARDS is empty; get_shard_db reads
+it from the request.
+
+Adding a shard, online:
+
+    python -m app.sharding pin --to "s0=...,s1=...,s2=..."   # pin users the new ring would move
+    # deploy DATABASE_SHARDS="s0=...,s1=...,s2=..." to every worker
+    python -m app.sharding prepare                           # tables on the new shard
+    python -m app.sharding rebalance                         # move pinned users to their ring shard
+
+    python -m app.sharding where 42                          # which shard holds user 42
+    python -m app.sharding move 42 s2                        # move one user by hand
+"""
+import argparse
+import bisect
+import hashlib
+import time
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import Boolean, Column, Index, Integer, MetaData, String, Table, delete, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user
+from app.db import Database, get_db
+from app.models import Calculation, CalculationType, User
+from app.settings import Settings, parse_shards
+
+VNODES = 64
+ID_BLOCK = 100_000_000  # ids per shard; Integer keys leave room for 21 shards
+MOVE_GRACE_SECONDS = 2.0
+COPY_BATCH = 5_000
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_directory_metadata = MetaData()
+directory = Table(
+    "shard_directory",
+    _directory_metadata,
+    Column("user_id", Integer, primary_key=True, autoincrement=False),
+    Column("shard", String(64), nullable=False),
+    Column("moving", Boolean, nullable=False, default=False),
+)
+
+
+def _shard_table() -> Table:
+    # The calculations table without its FK: users are not on the shards.
+    columns = [
+        Column(
+            c.name, c.type, primary_key=c.primary_key, nullable=c.nullable,
+            default=c.default, server_default=c.server_default, index=c.index,
+        )
+        for c in Calculation.__table__.columns
+    ]
+    table = Table("calculations", MetaData(), *columns)
+    Index("ix_calculations_user_id", table.c.user_id)
+    return table
+
+
+shard_calculations = _shard_table()
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing: each shard owns VNODES points on a 64-bit ring."""
+
+    def __init__(self, names: Sequence[str], vnodes: int = VNODES):
+        if not names:
+            raise ValueError("a hash ring needs at least one shard")
+        points = sorted((_hash(f"{name}#{i}"), name) for name in names for i in range(vnodes))
+        self._keys = [key for key, _ in points]
+        self._names = [name for _, name in points]
+
+    def shard_for(self, user_id: int) -> str:
+        index = bisect.bisect(self._keys, _hash(f"user:{user_id}")) % len(self._keys)
+        return self._names[index]
+
+
+class Placement(NamedTuple):
+    shard: str
+    moving: bool = False
+    pinned: bool = False
+
+
+class Shards:
+    """One app's calculation shards: names -> URLs, the ring over them, and their engines."""
+
+    def __init__(self, urls: Mapping[str, str], database: Database):
+        self.urls = dict(urls)
+        self.ring = HashRing(list(self.urls))
+        self.database = database
+
+    def ring_shard(self, user_id: int) -> str:
+        return self.ring.shard_for(user_id)
+
+    def engine_for(self, name: str) -> Engine:
+        if name not in self.urls:
+            raise KeyError(f"unknown shard {name!r}; configured: {', '.join(self.urls)}")
+        return self.database.get_shard_engine(name, self.urls[name])
+
+    def placement(self, db: Session, user_id: int) -> Placement:
+        """Where a user's calculations are: the directory entry, else the ring."""
+        row = db.execute(select(directory.c.shard, directory.c.moving).where(directory.c.user_id == user_id)).first()
+        if row is not None:
+            return Placement(row.shard, row.moving, True)
+        return Placement(self.ring_shard(user_id))
+
+    def placements(self, db: Session, user_ids: Iterable[int]) -> Dict[int, Placement]:
+        """placement() for many users, in one query."""
+        user_ids = set(user_ids)
+        rows = db.execute(
+            select(directory.c.user_id, directory.c.shard, directory.c.moving).where(directory.c.user_id.in_(user_ids))
+        ).all()
+        found = {row.user_id: Placement(row.shard, row.moving, True) for row in rows}
+        return {user_id: found.get(user_id) or Placement(self.ring_shard(user_id)) for user_id in user_ids}
+
+    def prepare(self) -> None:
+        """Create the directory on the primary and the calculations table on every shard."""
+        _directory_metadata.create_all(self.database.get_engine(), checkfirst=True)
+        for index, name in enumerate(self.urls):
+            prepare_shard(self.engine_for(name), index)
+
+    # ---------- Rebalancing ----------
+
+    def move_user(self, user_id: int, target: str, grace: float = MOVE_GRACE_SECONDS) -> int:
+        """
+        Move one user's calculations to `target` while the app keeps serving;
+        returns the number of rows moved.
+
+        1. mark the user as moving (new writes get 503), then wait `grace`
+           seconds for writes already in flight to commit;
+        2. copy the rows, ids included, to the target in one transaction;
+        3. point the directory at the target (or drop the entry if the ring
+           already says so): reads and writes now go there;
+        4. delete the rows from the source.
+        """
+        primary = self.database.get_engine()
+        with Session(primary) as db:
+            source = self.placement(db, user_id).shard
+        if source == target:
+            return 0
+        source_engine, target_engine = self.engine_for(source), self.engine_for(target)
+
+        _set_directory(primary, user_id, source, moving=True)
+        try:
+            time.sleep(grace)
+            moved = 0
+            with source_engine.connect() as src, target_engine.begin() as dst:
+                rows = src.execute(
+                    select(shard_calculations)
+                    .where(shard_calculations.c.user_id == user_id)
+                    .order_by(shard_calculations.c.id)
+                ).mappings()
+                while True:
+                    batch = [dict(row) for row in rows.fetchmany(COPY_BATCH)]
+                    if not batch:
+                        break
+                    ids = [row["id"] for row in batch]
+                    taken = dst.execute(
+                        select(shard_calculations.c.id).where(shard_calculations.c.id.in_(ids))
+                    ).scalars().all()
+                    if taken:
+                        raise RuntimeError(f"ids {taken[:5]} already exist on shard {target!r}; nothing was moved")
+                    dst.execute(insert(shard_calculations), batch)
+                    moved += len(batch)
+        except BaseException:
+            _set_directory(primary, user_id, None if source == self.ring_shard(user_id) else source)
+            raise
+
+        _set_directory(primary, user_id, None if target == self.ring_shard(user_id) else target)
+        with source_engine.begin() as src:
+            src.execute(delete(shard_calculations).where(shard_calculations.c.user_id == user_id))
+        return moved
+
+    def plan(self, new_shards: Sequence[str]) -> Dict[int, tuple]:
+        """{user_id: (current shard, shard under the new ring)} for users that would move."""
+        new_ring = HashRing(list(new_shards))
+        moves = {}
+        with Session(self.database.get_engine()) as db:
+            for user_id in db.execute(select(User.id)).scalars():
+                current = self.placement(db, user_id).shard
+                future = new_ring.shard_for(user_id)
+                if current != future:
+                    moves[user_id] = (current, future)
+        return moves
+
+    def pin(self, new_shards: Sequence[str]) -> int:
+        """Pin every user the new ring would move to their current shard."""
+        moves = self.plan(new_shards)
+        with self.database.get_engine().begin() as conn:
+            for user_id, (current, _) in moves.items():
+                conn.execute(delete(directory).where(directory.c.user_id == user_id))
+                conn.execute(insert(directory).values(user_id=user_id, shard=current, moving=False))
+        return len(moves)
+
+    def rebalance(self, grace: float = MOVE_GRACE_SECONDS, log=print) -> int:
+        """Move every pinned user to their ring shard; returns the users moved."""
+        primary = self.database.get_engine()
+        with primary.connect() as conn:
+            pinned: List[tuple] = conn.execute(select(directory.c.user_id, directory.c.shard)).all()
+        count = 0
+        for user_id, shard in pinned:
+            target = self.ring_shard(user_id)
+            if shard == target:
+                _set_directory(primary, user_id, None)
+                continue
+            rows = self.move_user(user_id, target, grace)
+            log(f"user {user_id}: {shard} -> {target} ({rows} rows)")
+            count += 1
+        return count
+
+
+def for_app(app) -> Optional[Shards]:
+    """The app's Shards, or None when it is not sharded."""
+    return getattr(app.state, "shards", None)
+
+
+def prepare_shard(engine: Engine, index: int) -> None:
+    shard_calculations.metadata.create_all(engine, checkfirst=True)
+    start = index * ID_BLOCK
+    if start == 0:
+        return
+    with engine.begin() as conn:
+        if (conn.execute(select(func.max(shard_calculations.c.id))).scalar() or 0) >= start:
+            return
+        # A user-less placeholder row at the block start: on SQLite new ids
+        # continue from max(id); on Postgres the sequence is moved as well.
+        conn.execute(insert(shard_calculations).values(id=start, a=0, b=0, type=CalculationType.ADD, result=0, user_id=None))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('calculations', 'id'), :start)"), {"start": start})
+
+
+def get_shard_db(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> Iterator[Session]:
+    """A session on the shard holding the user's calculations (`db` when unsharded)."""
+    shards = for_app(request.app)
+    if shards is None:
+        yield db
+        return
+    where = shards.placement(db, current_user.id)
+    if where.moving and request.method not in SAFE_METHODS:
+        raise HTTPException(
+            status_code=503,
+            detail="Your calculations are being moved; try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    session = shards.database.session(shards.engine_for(where.shard))
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _set_directory(primary: Engine, user_id: int, shard: Optional[str], moving: bool = False) -> None:
+    with primary.begin() as conn:
+        conn.execute(delete(directory).where(directory.c.user_id == user_id))
+        if shard is not None:
+            conn.execute(insert(directory).values(user_id=user_id, shard=shard, moving=moving))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.sharding", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("prepare", help="create the directory and the shard tables")
+    pin_parser = sub.add_parser("pin", help="pin users the new shard list would move")
+    pin_parser.add_argument("--to", required=True, help="the new DATABASE_SHARDS value")
+    rebalance_parser = sub.add_parser("rebalance", help="move pinned users to their ring shard")
+    rebalance_parser.add_argument("--grace", type=float, default=MOVE_GRACE_SECONDS)
+    move_parser = sub.add_parser("move", help="move one user's calculations")
+    move_parser.add_argument("user_id", type=int)
+    move_parser.add_argument("shard")
+    move_parser.add_argument("--grace", type=float, default=MOVE_GRACE_SECONDS)
+    where_parser = sub.add_parser("where", help="show a user's shard")
+    where_parser.add_argument("user_id", type=int)
+    args = parser.parse_args(argv)
+
+    settings = Settings.from_env()
+    if not settings.database_shards:
+        parser.error("DATABASE_SHARDS is not set")
+    shards = Shards(settings.database_shards, Database(settings.database_url))
+    primary = shards.database.get_engine()
+    _directory_metadata.create_all(primary, checkfirst=True)
+
+    if args.command == "prepare":
+        shards.prepare()
+        print(f"prepared {len(shards.urls)} shards")
+    elif args.command == "pin":
+        print(f"pinned {shards.pin(list(parse_shards(args.to)))} users to their current shard")
+    elif args.command == "rebalance":
+        print(f"moved {shards.rebalance(args.grace)} users")
+    elif args.command == "move":
+        print(f"moved {shards.move_user(args.user_id, args.shard, args.grace)} rows")
+    else:
+        with Session(primary) as db:
+            print(shards.placement(db, args.user_id))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
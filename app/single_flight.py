@@ -0,0 +1,108 @@
+# app/single_flight.py
+"""
+Request coalescing ("single-flight").
+
+    group = SingleFlight()
+    group.do(("summary", user_id), lambda: expensive(user_id), timeout=10)
+
+While a call for a key is running, further calls with the same key do not
+start their own; they wait for the running one and all receive its result
+(or its exception). Nothing is cached: once the call finishes, the next
+caller for that key starts a fresh one.
+
+Sync routes run in Starlette's thread pool, so this is thread-based.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Counters:
+    - executions: calls that actually ran
+    - coalesced:  callers that shared another caller's result
+    - timeouts:   callers that gave up waiting and ran the call themselves
+    """
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        self.default_timeout = default_timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run fn once for all concurrent callers with this key. A follower
+        waits at most `timeout` seconds for the leader; after that it runs
+        fn itself, so one stuck call cannot hang every later request.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+
+        if leader:
+            return self._run(key, call, fn)
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.timeouts += 1
+            return self._execute(fn)
+        with self._lock:
+            self.coalesced += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _execute(self, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.executions += 1
+        return fn()
+
+    def _run(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = self._execute(fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # Later callers start a new call; waiters already hold this one.
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.executions = self.coalesced = self.timeouts = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+            }
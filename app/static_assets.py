@@ -0,0 +1,190 @@
+# app/static_assets.py
+"""
+Fingerprinted, precompressed static assets.
+
+Build step (run once per deploy, e.g. in the Dockerfile):
+
+    python -m app.static_assets
+
+For every file in static/ this writes static/dist/<name>.<hash>.<ext> plus
+.gz (and .br when brotli is installed) siblings, rewrites /static/<name>
+references to the hashed URLs, and records everything in
+static/dist/manifest.json. Hashed files never change, so they are served
+with `Cache-Control: immutable`; the HTML entry pages (/login, ...) keep
+their URLs and are revalidated with an ETag, so repeat loads are a 304.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from app.compression import negotiate_encoding
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+STATIC_DIR = "static"
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+TEXT_SUFFIXES = {".html", ".css", ".js", ".json", ".svg", ".txt"}
+_REFERENCE_RE = re.compile(r"/static/([\w\-./]+)")
+_HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+
+# Precompressed sibling suffix for each content-coding.
+_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def build_assets(source: str = STATIC_DIR, output: Optional[str] = None) -> Dict[str, str]:
+    """
+    Fingerprint and precompress every file in `source`.
+    Returns the manifest: {"login.html": "login.<hash>.html", ...}.
+    """
+    source_dir = Path(source)
+    out_dir = Path(output) if output else source_dir / DIST_DIRNAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    files = {
+        p.relative_to(source_dir).as_posix(): p
+        for p in sorted(source_dir.rglob("*"))
+        if p.is_file() and out_dir not in p.parents
+    }
+    manifest: Dict[str, str] = {}
+    contents: Dict[str, bytes] = {}
+
+    def resolve(name: str, stack=()) -> str:
+        if name in manifest:
+            return manifest[name]
+        if name in stack:
+            raise ValueError(f"Circular static reference: {' -> '.join(stack + (name,))}")
+        data = files[name].read_bytes()
+        if files[name].suffix in TEXT_SUFFIXES:
+            # Hash after rewriting, so a page changes when an asset it links to changes.
+            def replace(match):
+                ref = match.group(1)
+                if ref not in files:
+                    return match.group(0)
+                return f"/static/{DIST_DIRNAME}/{resolve(ref, stack + (name,))}"
+
+            data = _REFERENCE_RE.sub(replace, data.decode("utf-8")).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        path = Path(name)
+        hashed = path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix()
+        manifest[name] = hashed
+        contents[hashed] = data
+        return hashed
+
+    for name in files:
+        resolve(name)
+
+    for hashed, data in contents.items():
+        target = out_dir / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        target.with_name(target.name + ".gz").write_bytes(gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            target.with_name(target.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def load_manifest(directory: str = STATIC_DIR) -> Dict[str, str]:
+    """Read the build manifest; empty if the build step has not run."""
+    path = Path(directory) / DIST_DIRNAME / MANIFEST_NAME
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves a .br/.gz sibling when the client accepts it,
+    and marks fingerprinted files as immutable.
+    """
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = os.fspath(full_path)
+        headers = {"Vary": "Accept-Encoding"}
+        if _HASHED_NAME_RE.search(full_path):
+            headers["Cache-Control"] = IMMUTABLE
+        else:
+            headers["Cache-Control"] = REVALIDATE
+
+        encoding = self._pick_variant(full_path, request_headers.get("accept-encoding", ""))
+        if encoding:
+            variant = full_path + _SUFFIXES[encoding]
+            headers["Content-Encoding"] = encoding
+            response = FileResponse(
+                variant,
+                status_code=status_code,
+                headers=headers,
+                # Media type comes from the original name, not the .gz/.br one.
+                media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                stat_result=os.stat(variant),
+            )
+            # Distinct validator per representation.
+            response.headers["etag"] = response.headers["etag"][:-1] + f'-{encoding}"'
+        else:
+            response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    @staticmethod
+    def _pick_variant(full_path: str, accept_encoding: str) -> Optional[str]:
+        available = tuple(enc for enc, suffix in _SUFFIXES.items() if os.path.isfile(full_path + suffix))
+        if not available:
+            return None
+        return negotiate_encoding(accept_encoding, available)
+
+
+static_files = PrecompressedStaticFiles(directory=STATIC_DIR)
+
+
+def page_response(name: str, request: Request) -> Response:
+    """
+    Serve an HTML entry page: the built (hashed-link) copy when the
+    manifest exists, otherwise the source file. Always revalidated.
+    """
+    manifest = _manifest()
+    if name in manifest:
+        full_path = os.path.join(STATIC_DIR, DIST_DIRNAME, manifest[name])
+    else:
+        full_path = os.path.join(STATIC_DIR, name)
+    response = static_files.file_response(full_path, os.stat(full_path), request.scope)
+    # The page URL is stable, so it must never be cached as immutable.
+    response.headers["Cache-Control"] = REVALIDATE
+    return response
+
+
+@lru_cache(maxsize=None)
+def _manifest() -> Dict[str, str]:
+    return load_manifest()
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    for source_name, hashed_name in sorted(built.items()):
+        print(f"{source_name} -> {DIST_DIRNAME}/{hashed_name}")
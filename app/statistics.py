@@ -1,20 +1,54 @@
 # app/statistics.py
-from fastapi import APIRouter, Depends
+import os
+
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Tuple
+
+from app.auth import get_current_user
+from app.models import User
+from app.profiling import ProfiledRoute
+from app.queries import statistics_rows, recent_statistics_rows
+from app import read_replica
+from app.read_replica import get_read_db, read_route
+from app.single_flight import SingleFlight
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# Concurrent identical requests (e.g. several dashboard tabs) share one
+# query. Waiters give up after this many seconds and query themselves.
+COALESCE_TIMEOUT = float(os.getenv("STATISTICS_COALESCE_TIMEOUT", "10"))
+
 
-from app.db import get_db
-from app.models import Calculation, User
-from app.calculations import get_current_user
+def build_flight() -> SingleFlight:
+    return SingleFlight(default_timeout=COALESCE_TIMEOUT)
 
-router = APIRouter()
+
+def for_app(app) -> SingleFlight:
+    """The app's statistics SingleFlight (see create_app): apps never share results."""
+    return app.state.statistics_flight
+
+
+def coalesced(
+    flight: SingleFlight, key: Tuple, db: Session, user_id: int, compute: Callable[[], Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Share `compute` with identical requests in flight on `flight`. The key
+    includes where `db` reads from, so a primary read never takes a
+    replica result. Users who just wrote are not coalesced at all: a query
+    that started before their commit would hide the write they expect to see.
+    """
+    if read_replica.recent_writers.is_recent(user_id):
+        return compute()
+    return flight.do(key + (read_route(db),), compute)
 
 
 @router.get("/statistics/summary")
 def get_statistics_summary(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """
     Get comprehensive usage statistics for the current user.
@@ -29,10 +63,13 @@ def get_statistics_summary(
         - min_result: Minimum result value
         - max_result: Maximum result value
     """
-    # Get all calculations for the user
-    calculations = db.query(Calculation).filter(
-        Calculation.user_id == current_user.id
-    ).all()
+    user_id = current_user.id
+    return coalesced(for_app(request.app), ("summary", user_id), db, user_id, lambda: summarize(db, user_id))
+
+
+def summarize(db: Session, user_id: int) -> Dict[str, Any]:
+    # Get all calculations for the user (only the columns we aggregate)
+    calculations = statistics_rows(db, user_id)
     
     if not calculations:
         return {
@@ -81,9 +118,10 @@ def get_statistics_summary(
 
 @router.get("/statistics/recent")
 def get_recent_statistics(
+    request: Request,
     limit: int = 10,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """
     Get statistics for the most recent N calculations.
@@ -96,10 +134,14 @@ def get_recent_statistics(
         - average_result: Average result of recent calculations
         - operations_used: List of operation types used
     """
+    user_id = current_user.id
+    flight = for_app(request.app)
+    return coalesced(flight, ("recent", user_id, limit), db, user_id, lambda: summarize_recent(db, user_id, limit))
+
+
+def summarize_recent(db: Session, user_id: int, limit: int) -> Dict[str, Any]:
     # Get recent calculations (ordered by ID descending)
-    recent_calcs = db.query(Calculation).filter(
-        Calculation.user_id == current_user.id
-    ).order_by(Calculation.id.desc()).limit(limit).all()
+    recent_calcs = recent_statistics_rows(db, user_id, limit)
     
     if not recent_calcs:
         return {
@@ -119,3 +161,9 @@ def get_recent_statistics(
         "average_result": round(avg_result, 2),
         "operations_used": operations_used
     }
+
+
+@router.get("/statistics/coalescing")
+def statistics_coalescing_stats(request: Request, current_user: User = Depends(get_current_user)) -> Dict[str, int]:
+    """How many statistics requests ran a query vs. shared one already in flight."""
+    return for_app(request.app).stats()
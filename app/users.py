@@ -1,43 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from app.auth import get_current_user
 from app.db import get_db
 from app.models import User
+from app.profiling import ProfiledRoute
 from app.schemas import UserCreate, UserRead, UserLogin, Token, UserUpdate, PasswordChange
 from app.security import hash_password, verify_password, create_access_token
 
-router = APIRouter()
-
-def get_current_user(db: Session, request: Request):
-    """Extract user from JWT token in Authorization header."""
-    from app.security import decode_access_token
-    from jose import JWTError
-    
-    auth = request.headers.get("authorization")
-    if not auth or not auth.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Missing token")
-    
-    token = auth.split(" ", 1)[1]
-    try:
-        payload = decode_access_token(token)
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    user_id = int(payload.get("sub"))
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+router = APIRouter(route_class=ProfiledRoute)
 
 # Get current user info endpoint
 @router.get("/users/me", response_model=UserRead)
-def get_me(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(db, request)
+def get_me(user: User = Depends(get_current_user)):
     return user
 
 # Profile update endpoint
 @router.put("/users/profile", response_model=UserRead)
-def update_profile(update: UserUpdate, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(db, request)
+def update_profile(update: UserUpdate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     if update.username:
         # Check for username uniqueness
         if db.query(User).filter(User.username == update.username, User.id != user.id).first():
@@ -53,8 +32,7 @@ def update_profile(update: UserUpdate, request: Request, db: Session = Depends(g
 
 # Password change endpoint
 @router.post("/users/change-password", status_code=status.HTTP_204_NO_CONTENT)
-def change_password(payload: PasswordChange, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(db, request)
+def change_password(payload: PasswordChange, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     if not verify_password(payload.old_password, user.password_hash):
         raise HTTPException(status_code=400, detail="Old password incorrect")
     user.password_hash = hash_password(payload.new_password)
@@ -0,0 +1,452 @@
+# app/write_behind.py
+"""
+Write-behind buffer for POST /api/calculations (opt-in).
+
+With WRITE_BEHIND_ENABLED=1, a request sent with `Prefer: respond-async`
+gets `202 Accepted` once its result is computed. The response has a
+provisional id, not the row id. The row waits in an in-process buffer, and
+a background thread inserts buffered rows in batches: WRITE_BEHIND_BATCH
+rows or every WRITE_BEHIND_INTERVAL seconds, whichever comes first. Each
+batch is one executemany INSERT per shard. Shards are looked up when a
+batch is flushed, not when a row is queued, so a row follows its user to a
+new shard. Rows of a user being moved (app.sharding) wait until the move
+is done. A queued row shows up in browse once its batch is flushed.
+Requests without the header behave as before.
+
+Durability (WRITE_BEHIND_DURABILITY):
+- memory: rows are kept only in memory; a crash loses what is buffered
+- spool:  each row is also appended to the worker's spool file before the
+          202 (survives a process crash, not a power loss)
+- fsync:  as spool, and the file is fsync'd before the 202
+
+Each worker has its own spool file in WRITE_BEHIND_SPOOL_DIR and holds an
+flock on it. At startup, a worker inserts the unflushed rows from every
+spool file whose owner has exited. Delivery is at-least-once: if a worker
+crashes between committing a batch and recording it in the spool, that
+batch is inserted again.
+
+Backpressure: once WRITE_BEHIND_CAPACITY rows are waiting, async requests
+get 503 + Retry-After until the flusher catches up. If the database is
+down, rows stay buffered and the flush is retried. Counters are at
+GET /api/write-behind.
+
+create_app() keeps the app's buffer on app.state.write_behind (None when
+disabled), bound to that app's database and shards by build_buffer().
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+from decimal import Decimal
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.auth import get_current_user
+from app.db import Database
+from app.models import Calculation, CalculationType, User
+from app.profiling import ProfiledRoute
+from app.responses import ORJSONResponse
+from app.schemas import CalculationQueued
+from app.settings import Settings
+from app.sharding import Shards
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger("fastapi_calculator")
+
+BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "500"))
+INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "0.2"))
+CAPACITY = int(os.getenv("WRITE_BEHIND_CAPACITY", "10000"))
+DURABILITY_MODES = ("memory", "spool", "fsync")
+RETRY_DELAY = 1.0  # seconds between attempts while the database is failing
+SPOOL_PATTERN = "calculations.*.spool"
+
+# (sequence number, row values)
+Entry = Tuple[int, Dict[str, Any]]
+# user_id -> (shard name, or None for the primary; whether the user is being moved)
+Locations = Dict[int, Tuple[Optional[str], bool]]
+
+
+class BufferFull(Exception):
+    """CAPACITY rows are already waiting to be flushed."""
+
+
+def respond_async(prefer: Optional[str]) -> bool:
+    """Whether a Prefer header (RFC 7240) asks for respond-async."""
+    if not prefer:
+        return False
+    return any(part.split(";")[0].strip().lower() == "respond-async" for part in prefer.split(","))
+
+
+def encode_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = dict(row, type=row["type"].value)
+    if row["result_exact"] is not None:
+        encoded["result_exact"] = str(row["result_exact"])
+    return encoded
+
+
+def decode_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    decoded = dict(row, type=CalculationType(row["type"]))
+    if row["result_exact"] is not None:
+        decoded["result_exact"] = Decimal(row["result_exact"])
+    return decoded
+
+
+def unsharded(user_ids: Iterable[int]) -> Locations:
+    """Every user's calculations go to the primary."""
+    return {user_id: (None, False) for user_id in user_ids}
+
+
+def locate(db: Database, shards: Optional[Shards], user_ids: Iterable[int]) -> Locations:
+    """Where each user's calculations go right now."""
+    user_ids = set(user_ids)
+    if shards is None:
+        return unsharded(user_ids)
+    with db.session() as session:
+        return {user_id: (where.shard, where.moving) for user_id, where in shards.placements(session, user_ids).items()}
+
+
+def group_by_shard(
+    entries: Sequence[Entry], locations: Locations, hold_moving: bool = True
+) -> Dict[Optional[str], List[Entry]]:
+    """Entries per destination, in queue order. With hold_moving, rows of users being moved are left out."""
+    groups: Dict[Optional[str], List[Entry]] = {}
+    for entry in entries:
+        shard, moving = locations[entry[1]["user_id"]]
+        if not (moving and hold_moving):
+            groups.setdefault(shard, []).append(entry)
+    return groups
+
+
+def insert_rows(db: Database, shards: Optional[Shards], shard: Optional[str], rows: Sequence[Dict[str, Any]]) -> int:
+    """
+    Insert rows on the primary or a shard in one transaction; returns the
+    rows written. If the batch violates a constraint (say, a user deleted
+    since), rows are retried one by one and the failing ones dropped.
+    """
+    engine = shards.engine_for(shard) if shard else db.get_engine()
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(Calculation.__table__), list(rows))
+        return len(rows)
+    except IntegrityError:
+        written = 0
+        for row in rows:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(Calculation.__table__), row)
+                written += 1
+            except IntegrityError as e:
+                logger.error("Write-behind dropped a calculation for user %s: %s", row.get("user_id"), e.orig)
+        return written
+
+
+class Spool:
+    """A worker's append-only log of accepted rows and flush checkpoints."""
+
+    def __init__(self, directory: str, fsync: bool):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"calculations.{os.getpid()}.spool")
+        self.fsync = fsync
+        self._file = open(self.path, "ab")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record).encode() + b"\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, seq: int, row: Dict[str, Any]) -> None:
+        self._write({"seq": seq, "row": encode_row(row)})
+
+    def checkpoint(self, seqs: Sequence[int], empty: bool) -> None:
+        """Rows `seqs` are in the database; with nothing left, start over."""
+        if empty:
+            self._file.truncate(0)
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        else:
+            self._write({"done": list(seqs)})
+
+    def close(self, remove: bool) -> None:
+        self._file.close()
+        if remove:
+            os.remove(self.path)
+
+
+def read_spool(path: str) -> List[Entry]:
+    """The rows in a spool file that were never checkpointed as flushed."""
+    records, done = [], set()
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # torn last line: that row never got its 202
+            if "done" in record:
+                done.update(record["done"])
+            else:
+                records.append(record)
+    return [(r["seq"], decode_row(r["row"])) for r in records if r["seq"] not in done]
+
+
+class WriteBehindBuffer:
+    """
+    Counters:
+    - accepted: rows queued (202 sent)
+    - rejected: async requests turned away because the buffer was full
+    - flushed:  rows inserted; batches: INSERT batches committed
+    - failures: flush attempts that raised (the rows stay queued)
+    - dropped:  rows that violated a constraint and were discarded
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[Optional[str], Sequence[Dict[str, Any]]], int],
+        batch: int = BATCH,
+        interval: float = INTERVAL,
+        capacity: int = CAPACITY,
+        durability: str = "memory",
+        spool_dir: str = "spool",
+        locator: Callable[[Iterable[int]], Locations] = unsharded,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"WRITE_BEHIND_DURABILITY must be one of {', '.join(DURABILITY_MODES)}")
+        self.batch = batch
+        self.interval = interval
+        self.capacity = capacity
+        self.durability = durability
+        self.spool_dir = spool_dir
+        self.writer = writer
+        self.locator = locator
+        self._cond = threading.Condition()
+        self._pending: Deque[Entry] = deque()
+        self._seq = 0
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._spool: Optional[Spool] = None
+        self._closing = False
+        self.accepted = self.rejected = self.flushed = self.batches = self.failures = self.dropped = 0
+        self.last_flush_ms: Optional[float] = None
+
+    def _start(self) -> None:
+        # Called with the lock held. A forked worker starts with an empty
+        # buffer of its own: the parent's rows are the parent's to flush.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._pending.clear()
+            self._thread = None
+            self._spool = None
+        if self._spool is None and self.durability != "memory":
+            self._spool = Spool(self.spool_dir, fsync=self.durability == "fsync")
+        if self._thread is None or not self._thread.is_alive():
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def submit(self, row: Dict[str, Any]) -> str:
+        """Queue a row for insertion; returns its provisional id."""
+        with self._cond:
+            self._start()
+            if len(self._pending) >= self.capacity:
+                self.rejected += 1
+                raise BufferFull()
+            self._seq += 1
+            if self._spool is not None:
+                self._spool.append(self._seq, row)
+            self._pending.append((self._seq, row))
+            self.accepted += 1
+            if len(self._pending) >= self.batch:
+                self._cond.notify_all()
+            return f"{self._pid}-{self._seq}"
+
+    def _next_batch(self) -> List[Entry]:
+        with self._cond:
+            deadline = time.monotonic() + self.interval
+            while len(self._pending) < self.batch and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            # Peek, not pop: rows leave the buffer only once they are committed.
+            return [self._pending[i] for i in range(min(self.batch, len(self._pending)))]
+
+    def _committed(self, group: List[Entry], written: int, seconds: float) -> None:
+        # Each shard's group leaves the buffer as soon as it commits, so a
+        # failing shard never makes another shard's rows be inserted twice.
+        seqs = {seq for seq, _ in group}
+        with self._cond:
+            self._pending = deque(entry for entry in self._pending if entry[0] not in seqs)
+            self.flushed += written
+            self.dropped += len(group) - written
+            self.batches += 1
+            self.last_flush_ms = seconds * 1000
+            if self._spool is not None:
+                self._spool.checkpoint(sorted(seqs), empty=not self._pending)
+            self._cond.notify_all()
+
+    def _flush_batch(self, entries: List[Entry]) -> bool:
+        """Write what can be written; False if some rows must wait and be retried."""
+        try:
+            locations = self.locator(row["user_id"] for _, row in entries)
+        except Exception:
+            logger.exception("Write-behind could not look up shards; retrying")
+            with self._cond:
+                self.failures += 1
+            return False
+        groups = group_by_shard(entries, locations)
+        complete = sum(len(group) for group in groups.values()) == len(entries)
+        for shard, group in groups.items():
+            start = time.perf_counter()
+            try:
+                written = self.writer(shard, [row for _, row in group])
+            except Exception:
+                logger.exception("Write-behind flush of %d rows to %s failed; retrying", len(group), shard or "primary")
+                with self._cond:
+                    self.failures += 1
+                complete = False
+                continue
+            self._committed(group, written, time.perf_counter() - start)
+        return complete
+
+    def _run(self) -> None:
+        while True:
+            entries = self._next_batch()
+            if not entries:
+                if self._closing:
+                    return
+                continue
+            if not self._flush_batch(entries):
+                with self._cond:
+                    if self._closing:
+                        return
+                    self._cond.wait(RETRY_DELAY)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is in the database."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._pid != os.getpid():
+                return True
+            self._cond.notify_all()
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: float = 10.0) -> bool:
+        """Flush and stop the thread; True if nothing was left behind."""
+        with self._cond:
+            if self._pid != os.getpid() or self._thread is None:
+                return True
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        thread.join(timeout)
+        with self._cond:
+            drained = not self._pending
+            if self._spool is not None:
+                self._spool.close(remove=drained)  # a non-empty spool is replayed at next start
+                self._spool = None
+            self._thread = None
+            if not drained:
+                logger.error("Write-behind stopped with %d rows unflushed", len(self._pending))
+            return drained
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending) if self._pid == os.getpid() else 0
+            return {
+                "durability": self.durability,
+                "pending": pending,
+                "capacity": self.capacity,
+                "batch": self.batch,
+                "interval": self.interval,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "last_flush_ms": self.last_flush_ms,
+            }
+
+
+def recover(spool_dir: str, writer, locator=unsharded) -> int:
+    """Insert the unflushed rows of spool files whose worker has exited; returns the rows."""
+    recovered = 0
+    for path in sorted(glob.glob(os.path.join(spool_dir, SPOOL_PATTERN))):
+        with open(path, "ab") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a live worker's spool
+            entries = read_spool(path)
+            locations = locator(row["user_id"] for _, row in entries)
+            for shard, group in group_by_shard(entries, locations, hold_moving=False).items():
+                recovered += writer(shard, [row for _, row in group])
+            os.remove(path)
+        if entries:
+            logger.warning("Write-behind recovered %d rows from %s", len(entries), path)
+    return recovered
+
+
+def build_buffer(settings: Settings, db: Database, shards: Optional[Shards]) -> WriteBehindBuffer:
+    """A buffer that writes to `db` (or `shards`), configured from settings."""
+    return WriteBehindBuffer(
+        partial(insert_rows, db, shards),
+        durability=settings.write_behind_durability,
+        spool_dir=settings.write_behind_spool_dir,
+        locator=partial(locate, db, shards),
+    )
+
+
+def for_app(app) -> Optional[WriteBehindBuffer]:
+    """The app's write-behind buffer, or None when it is disabled."""
+    return getattr(app.state, "write_behind", None)
+
+
+def queued_response(buffer: WriteBehindBuffer, row: Dict[str, Any]) -> ORJSONResponse:
+    """Queue `row` and build the 202 reply; 503 if the buffer is full."""
+    try:
+        provisional_id = buffer.submit(row)
+    except BufferFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Write buffer is full; retry shortly or send the request without Prefer: respond-async",
+            headers={"Retry-After": "1"},
+        )
+    body = CalculationQueued(provisional_id=provisional_id, **row)
+    return ORJSONResponse(
+        jsonable_encoder(body),
+        status_code=202,
+        headers={"Preference-Applied": "respond-async"},
+    )
+
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.get("/write-behind")
+def write_behind_stats(request: Request, current_user: User = Depends(get_current_user)):
+    """Counters of this worker's write-behind buffer."""
+    buffer = for_app(request.app)
+    if buffer is None:
+        raise HTTPException(status_code=404, detail="Write-behind is not enabled")
+    return buffer.stats()
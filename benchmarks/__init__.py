@@ -0,0 +1,2 @@
+# benchmark scripts; run them from the repo root, e.g.
+#   python -m benchmarks.bench_compression
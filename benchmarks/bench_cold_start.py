@@ -0,0 +1,107 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold-start cost: import time broken down by package, and wall time from
+spawning the server to its first 200 response.
+
+    python -m benchmarks.bench_cold_start --runs 5
+    python -m benchmarks.bench_cold_start --top 25 --path /docs
+
+Each run uses a fresh interpreter, so nothing is cached in-process; the OS
+page cache is warm after the first run, as it is for autoscaled replicas
+of the same image.
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_breakdown(module: str = "app.main"):
+    """(total seconds, {top-level package: self seconds}) for importing `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, RATE_LIMIT_ENABLED="false"),
+        check=True,
+    )
+    per_package = defaultdict(float)
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        per_package[name.split(".")[0]] += int(self_us) / 1e6
+        if len(indent) == 1:  # imported directly by `import module`
+            total += int(cumulative_us) / 1e6
+    return total, per_package
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_response(path: str) -> float:
+    port = free_port()
+    env = dict(os.environ, RATE_LIMIT_ENABLED="false")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--no-access-log"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + 60
+        while time.perf_counter() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{path}", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError("server did not answer with 200 in 60s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the import breakdown")
+    parser.add_argument("--path", default="/")
+    args = parser.parse_args()
+
+    totals, packages = [], defaultdict(list)
+    for _ in range(args.runs):
+        total, per_package = import_breakdown()
+        totals.append(total)
+        for name, seconds in per_package.items():
+            packages[name].append(seconds)
+
+    print(f"import app.main: median {statistics.median(totals) * 1000:.0f} ms over {args.runs} runs")
+    print(f"{'package':<28}{'self ms':>10}")
+    ranked = sorted(packages.items(), key=lambda item: -statistics.median(item[1]))
+    for name, samples in ranked[: args.top]:
+        print(f"{name:<28}{statistics.median(samples) * 1000:>10.1f}")
+
+    ready = [time_to_first_response(args.path) for _ in range(args.runs)]
+    print(f"\nspawn -> first 200 on {args.path}: median {statistics.median(ready) * 1000:.0f} ms, "
+          f"min {min(ready) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
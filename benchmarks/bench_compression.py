@@ -0,0 +1,74 @@
+# benchmarks/bench_compression.py
+"""
+Bytes on the wire and CPU per response for each content-coding.
+
+Payloads mirror what the app actually serves: a browse_calculations JSON
+list, a statistics summary and the calculations.html page.
+
+    python -m benchmarks.bench_compression --rows 2000 --repeat 50
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from app.compression import available_encodings, get_encoder
+
+
+def make_payloads(rows: int):
+    rnd = random.Random(42)
+    types = ["add", "subtract", "multiply", "divide", "power", "modulus", "percent_of", "nth_root", "log_base"]
+    browse = [
+        {
+            "a": round(rnd.uniform(-1000, 1000), 3),
+            "type": rnd.choice(types),
+            "b": round(rnd.uniform(1, 100), 3),
+            "id": i,
+            "result": rnd.uniform(-1e6, 1e6),
+            "user_id": 1,
+        }
+        for i in range(1, rows + 1)
+    ]
+    summary = {
+        "total_calculations": rows,
+        "average_operand_a": 1.23,
+        "average_operand_b": 45.6,
+        "average_result": 789.01,
+        "most_used_operation": "add",
+        "operations_breakdown": {t: rows // len(types) for t in types},
+        "min_result": -999999.0,
+        "max_result": 999999.0,
+    }
+    page = Path("static/calculations.html").read_bytes()
+    return {
+        f"browse ({rows} rows)": json.dumps(browse).encode(),
+        "statistics summary": json.dumps(summary).encode(),
+        "calculations.html": page,
+    }
+
+
+def bench(payload: bytes, encoding: str, repeat: int):
+    start = time.process_time()
+    for _ in range(repeat):
+        out = get_encoder(encoding).finish(payload)
+    cpu_ms = (time.process_time() - start) / repeat * 1000
+    return len(out), cpu_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'payload':<24}{'encoding':<10}{'bytes':>10}{'ratio':>8}{'cpu ms':>10}")
+    for name, payload in make_payloads(args.rows).items():
+        print(f"{name:<24}{'identity':<10}{len(payload):>10}{1.0:>8.2f}{0.0:>10.3f}")
+        for encoding in available_encodings():
+            size, cpu_ms = bench(payload, encoding, args.repeat)
+            print(f"{'':<24}{encoding:<10}{size:>10}{len(payload) / size:>8.2f}{cpu_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
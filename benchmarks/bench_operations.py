@@ -0,0 +1,186 @@
+# benchmarks/bench_operations.py
+"""
+Microbenchmarks for the compute layer, pyperf-style: every case is
+calibrated to a loop count whose sample takes about --sample-ms, then timed
+for several samples in a fresh order each round. Mean ± stdev per call is
+reported.
+
+Groups:
+- operations: every function in app/operations.py, including edge inputs
+  (negative odd roots, large powers, bases next to 1 and tiny bases)
+- factory:    CalculationFactory.get_operation(t).compute(a, b) for every
+  CalculationType (dispatch + guard + compute), and dispatch alone
+- schemas:    CalculationCreate validation, on its own
+
+    python -m benchmarks.bench_operations --save baseline.json
+    # ...change dispatch or validation...
+    python -m benchmarks.bench_operations --compare baseline.json
+
+With --compare, each case shows its delta against the baseline. A
+delta is flagged only when it is over 5% and larger than the combined noise
+(2 stdev).
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app import operations
+from app.calculation_factory import CalculationFactory
+from app.models import CalculationType
+from app.schemas import CalculationCreate
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def operation_cases() -> List[Case]:
+    ops = operations
+    return [
+        ("add", lambda: ops.add(1.5, 2.25)),
+        ("subtract", lambda: ops.subtract(1.5, 2.25)),
+        ("multiply", lambda: ops.multiply(1.5, 2.25)),
+        ("divide", lambda: ops.divide(1.5, 2.25)),
+        ("power(2.5, 3)", lambda: ops.power(2.5, 3.0)),
+        ("power(2, 1000) large int", lambda: ops.power(2, 1000)),
+        ("power(1.0001, 1e6) large exponent", lambda: ops.power(1.0001, 1e6)),
+        ("modulus", lambda: ops.modulus(17.5, 4.0)),
+        ("modulus(-7, 3) negative", lambda: ops.modulus(-7.0, 3.0)),
+        ("percent_of", lambda: ops.percent_of(250.0, 15.0)),
+        ("nth_root(27, 3)", lambda: ops.nth_root(27.0, 3.0)),
+        ("nth_root(-27, 3) negative odd root", lambda: ops.nth_root(-27.0, 3.0)),
+        ("nth_root(2, 0.5) fractional index", lambda: ops.nth_root(2.0, 0.5)),
+        ("log_base(8, 2)", lambda: ops.log_base(8.0, 2.0)),
+        ("log_base(1e300, 1+1e-12) base next to 1", lambda: ops.log_base(1e300, 1 + 1e-12)),
+        ("log_base(10, 1e-300) tiny base", lambda: ops.log_base(10.0, 1e-300)),
+    ]
+
+
+_FACTORY_INPUTS = {
+    CalculationType.ADD: (1.5, 2.25),
+    CalculationType.SUBTRACT: (1.5, 2.25),
+    CalculationType.MULTIPLY: (1.5, 2.25),
+    CalculationType.DIVIDE: (1.5, 2.25),
+    CalculationType.POWER: (2.5, 3.0),
+    CalculationType.MODULUS: (17.5, 4.0),
+    CalculationType.PERCENT_OF: (250.0, 15.0),
+    CalculationType.NTH_ROOT: (-27.0, 3.0),
+    CalculationType.LOG_BASE: (10.0, 1e-300),
+}
+
+
+def factory_cases() -> List[Case]:
+    cases = []
+    for calc_type, (a, b) in _FACTORY_INPUTS.items():
+        cases.append((f"compute {calc_type.value}", lambda t=calc_type, a=a, b=b: CalculationFactory.get_operation(t).compute(a, b)))
+    cases.append(("dispatch only (get_operation)", lambda: CalculationFactory.get_operation(CalculationType.LOG_BASE)))
+    op = CalculationFactory.get_operation(CalculationType.POWER)
+    cases.append(("prefetched power compute", lambda: op.compute(2.5, 3.0)))
+    cases.append(("power near the guard limit", lambda: op.compute(10.0, 300.0)))
+    return cases
+
+
+def schema_cases() -> List[Case]:
+    simple = {"a": 1.5, "b": 2.25, "type": "add"}
+    exact = {"a": 1.5, "b": 2.25, "type": "divide", "precision": "decimal", "digits": 50}
+    strings = {"a": "1.5", "b": "2.25", "type": "power"}
+
+    def invalid():
+        try:
+            CalculationCreate(a=1, b=0, type="divide")
+        except ValueError:
+            pass
+
+    return [
+        ("CalculationCreate(add)", lambda: CalculationCreate(**simple)),
+        ("CalculationCreate(decimal, digits)", lambda: CalculationCreate(**exact)),
+        ("CalculationCreate(numeric strings)", lambda: CalculationCreate(**strings)),
+        ("CalculationCreate(divide by zero) error", invalid),
+    ]
+
+
+GROUPS = {"operations": operation_cases, "factory": factory_cases, "schemas": schema_cases}
+
+
+def calibrate(fn: Callable[[], object], sample_seconds: float) -> int:
+    """Loop count that makes one sample last about `sample_seconds`."""
+    loops = 1
+    while True:
+        elapsed = sample(fn, loops) * loops
+        if elapsed >= sample_seconds / 4:
+            return max(1, int(loops * sample_seconds / elapsed))
+        loops *= 4
+
+
+def sample(fn: Callable[[], object], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return (time.perf_counter() - start) / loops
+
+
+def run(groups: List[str], samples: int, sample_ms: float, seed: int) -> Dict[str, dict]:
+    cases = [(f"{group}/{name}", fn) for group in groups for name, fn in GROUPS[group]()]
+    loops = {name: calibrate(fn, sample_ms / 1000) for name, fn in cases}
+    timings: Dict[str, List[float]] = {name: [] for name, _ in cases}
+    rnd = random.Random(seed)
+    for _ in range(samples):
+        rnd.shuffle(cases)  # spread drift (thermal, other load) across cases
+        for name, fn in cases:
+            timings[name].append(sample(fn, loops[name]))
+    return {
+        name: {
+            "mean_ns": statistics.mean(values) * 1e9,
+            "stdev_ns": statistics.stdev(values) * 1e9 if len(values) > 1 else 0.0,
+            "median_ns": statistics.median(values) * 1e9,
+            "loops": loops[name],
+            "samples": len(values),
+        }
+        for name, values in sorted(timings.items())
+    }
+
+
+def significant(base: dict, new: dict) -> bool:
+    delta = new["mean_ns"] - base["mean_ns"]
+    noise = 2 * math.hypot(base["stdev_ns"], new["stdev_ns"])
+    return abs(delta) > noise and abs(delta) > 0.05 * base["mean_ns"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--group", choices=sorted(GROUPS), action="append", help="default: all groups")
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--sample-ms", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args()
+
+    results = run(args.group or list(GROUPS), args.samples, args.sample_ms, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    print(f"{'case':<58}{'mean':>12}{'± stdev':>10}" + (f"{'delta':>10}" if baseline else ""))
+    for name, r in results.items():
+        line = f"{name:<58}{r['mean_ns']:>10.1f}ns{r['stdev_ns']:>8.1f}ns"
+        if baseline and name in baseline:
+            base = baseline[name]
+            change = (r["mean_ns"] - base["mean_ns"]) / base["mean_ns"] * 100
+            line += f"{change:>+9.1f}%" + (" *" if significant(base, r) else "")
+        print(line)
+    if baseline:
+        print("\n* = beyond 5% and 2 stdev of combined noise")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results}, f, indent=2)
+        print(f"\nwrote {args.save}")
+
+
+if __name__ == "__main__":
+    main()
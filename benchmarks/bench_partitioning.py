@@ -0,0 +1,117 @@
+# benchmarks/bench_partitioning.py
+"""
+Per-user browse and summary queries on a plain vs. a hash-partitioned
+calculations table (Postgres; see app/partitioning.py).
+
+Seeds DATABASE (default: 50,000 users x 1,000 = 50M calculations, into a
+fresh database: the plain table from create_all), copies the rows into
+calculations_hashed, partitioned the way migration 3f8a6c2e9b17 does it,
+gives both tables the same (user_id, id) index, and then times each query
+for random users on both tables.
+
+    python -m benchmarks.bench_partitioning --database-url postgresql://.../bench
+    python -m benchmarks.bench_partitioning --database-url ... --skip-seed   # reuse the tables
+
+Seeding and copying 50M rows takes a while; --users/--per-user scale it down.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.queries import BROWSE_FIELDS, STATS_FIELDS
+from benchmarks.seed import seed_database
+
+PLAIN = "calculations"
+HASHED = "calculations_hashed"
+PARTITIONS = 16
+
+QUERIES = {
+    "browse": f"SELECT {', '.join(BROWSE_FIELDS)} FROM {{table}} WHERE user_id = :user_id",
+    "summary": f"SELECT {', '.join(STATS_FIELDS)} FROM {{table}} WHERE user_id = :user_id",
+}
+
+
+def build_hashed(conn) -> None:
+    conn.execute(text(f"DROP TABLE IF EXISTS {HASHED}"))
+    conn.execute(text(
+        f"CREATE TABLE {HASHED} (LIKE {PLAIN} INCLUDING DEFAULTS EXCLUDING CONSTRAINTS) PARTITION BY HASH (user_id)"
+    ))
+    for remainder in range(PARTITIONS):
+        conn.execute(text(
+            f"CREATE TABLE {HASHED}_r{remainder} PARTITION OF {HASHED} "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        ))
+    conn.execute(text(f"INSERT INTO {HASHED} SELECT * FROM {PLAIN}"))
+    conn.execute(text(f"CREATE INDEX ix_{HASHED}_user_id_id ON {HASHED} (user_id, id)"))
+
+
+def prepare(engine, users: int, per_user: int, skip_seed: bool) -> None:
+    if not skip_seed:
+        start = time.perf_counter()
+        seed_database(engine, users, per_user)
+        print(f"seeded {users * per_user:,} rows in {time.perf_counter() - start:.0f}s")
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{PLAIN}_user_id_id ON {PLAIN} (user_id, id)"))
+            start = time.perf_counter()
+            build_hashed(conn)
+            print(f"built {HASHED} in {time.perf_counter() - start:.0f}s")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM ANALYZE {PLAIN}"))
+        conn.execute(text(f"VACUUM ANALYZE {HASHED}"))
+
+
+def partitions_scanned(conn, sql: str, user_id: int) -> int:
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), {"user_id": user_id}).scalar()
+
+    def walk(node):
+        own = 1 if "Relation Name" in node else 0
+        return own + sum(walk(child) for child in node.get("Plans", []))
+
+    return walk(plan[0]["Plan"])
+
+
+def time_query(conn, sql: str, user_ids) -> list:
+    timings = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        conn.execute(text(sql), {"user_id": user_id}).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="a Postgres database to fill")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--per-user", type=int, default=1_000)
+    parser.add_argument("--samples", type=int, default=500, help="random users timed per query and table")
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        parser.error("table partitioning needs Postgres")
+    prepare(engine, args.users, args.per_user, args.skip_seed)
+
+    with engine.connect() as conn:
+        user_ids = conn.execute(text(f"SELECT id FROM users ORDER BY random() LIMIT {args.samples}")).scalars().all()
+        rows = conn.execute(text(f"SELECT count(*) FROM {PLAIN}")).scalar()
+        print(f"rows: {rows:,}  samples: {len(user_ids)}")
+        print(f"{'query':<9}{'table':<22}{'scanned':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for name, template in QUERIES.items():
+            for table in (PLAIN, HASHED):
+                sql = template.format(table=table)
+                time_query(conn, sql, random.sample(user_ids, min(20, len(user_ids))))  # warm up
+                timings = sorted(time_query(conn, sql, user_ids))
+                p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+                print(
+                    f"{name:<9}{table:<22}{partitions_scanned(conn, sql, user_ids[0]):>9}"
+                    f"{statistics.median(timings):>9.2f}{p95:>9.2f}{timings[-1]:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
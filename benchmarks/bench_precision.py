@@ -0,0 +1,49 @@
+# benchmarks/bench_precision.py
+"""
+Throughput of each compute mode over a mixed workload of operations.
+
+    python -m benchmarks.bench_precision --ops 20000 --digits 28
+"""
+import argparse
+import random
+import time
+
+from app.models import CalculationType
+from app.precision import PrecisionMode, compute
+
+
+def make_workload(ops: int):
+    rnd = random.Random(42)
+    work = []
+    for _ in range(ops):
+        calc_type = rnd.choice(list(CalculationType))
+        a = round(rnd.uniform(1, 1000), 3)
+        b = round(rnd.uniform(1, 10), 3)
+        if calc_type in (CalculationType.POWER, CalculationType.NTH_ROOT):
+            b = rnd.randint(2, 5)
+        work.append((calc_type, a, b))
+    return work
+
+
+def bench(work, mode: PrecisionMode, digits: int) -> float:
+    start = time.perf_counter()
+    for calc_type, a, b in work:
+        compute(calc_type, a, b, mode, digits)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--digits", type=int, default=28)
+    args = parser.parse_args()
+
+    work = make_workload(args.ops)
+    print(f"{'mode':<10}{'ops/s':>12}{'us/op':>10}")
+    for mode in PrecisionMode:
+        elapsed = bench(work, mode, args.digits)
+        print(f"{mode.value:<10}{args.ops / elapsed:>12.0f}{elapsed / args.ops * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_rate_limit.py
+"""
+Load test: does one abusive tenant get its fair share and no more?
+
+One "greedy" client sends requests as fast as it can while several polite
+clients send at a steady pace, all through RateLimitMiddleware with a
+per-user bucket. Prints requests sent/accepted per client; the greedy one
+should be held to the configured rate while every polite one is served in
+full.
+
+    python -m benchmarks.bench_rate_limit --seconds 5 --limit 20/second
+    python -m benchmarks.bench_rate_limit --store sqlite:///./ratelimit-bench.db
+"""
+import argparse
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.rate_limit import MemoryStore, RateLimitMiddleware, Rule, SQLStore, parse_limit
+from app.security import create_access_token
+
+
+def make_app(limit, store):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, store=store, rules=[Rule(None, "/api/", limit)])
+
+    @app.get("/api/work")
+    def work():
+        time.sleep(0.001)  # stand-in for a DB round trip
+        return {"ok": True}
+
+    return app
+
+
+def run_client(app, user_id, seconds, interval, counts):
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    sent = accepted = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sent += 1
+        if client.get("/api/work", headers=headers).status_code == 200:
+            accepted += 1
+        if interval:
+            time.sleep(interval)
+    counts[user_id] = (sent, accepted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--limit", default="20/second")
+    parser.add_argument("--polite", type=int, default=4, help="number of well-behaved clients")
+    parser.add_argument("--store", default=None, help="SQL URL for a shared store (default: in-memory)")
+    args = parser.parse_args()
+
+    limit = parse_limit("bench", args.limit)
+    store = SQLStore.from_url(args.store) if args.store else MemoryStore()
+    app = make_app(limit, store)
+
+    # Polite clients send at half the allowed rate; client 0 does not wait at all.
+    polite_interval = 2 / limit.rate
+    counts = {}
+    threads = [threading.Thread(target=run_client, args=(app, 0, args.seconds, 0, counts))]
+    threads += [
+        threading.Thread(target=run_client, args=(app, i, args.seconds, polite_interval, counts))
+        for i in range(1, args.polite + 1)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    allowed = limit.burst + limit.rate * args.seconds
+    print(f"limit {limit.burst} per {limit.period:g}s, {args.seconds:g}s run, at most {allowed:.0f} accepted per client")
+    print(f"{'client':<10}{'sent':>8}{'accepted':>10}{'accepted/s':>12}")
+    for user_id in sorted(counts):
+        sent, accepted = counts[user_id]
+        name = "greedy" if user_id == 0 else f"polite-{user_id}"
+        print(f"{name:<10}{sent:>8}{accepted:>10}{accepted / args.seconds:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
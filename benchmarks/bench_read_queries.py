@@ -0,0 +1,82 @@
+# benchmarks/bench_read_queries.py
+"""
+Allocation cost of full ORM entity loads vs. column-projected rows for the
+read endpoints (browse, statistics summary, statistics recent).
+
+    python -m benchmarks.bench_read_queries --rows 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import Calculation
+from app.queries import calculation_rows, recent_statistics_rows, statistics_rows
+from benchmarks.bench_serialization import seed
+
+
+def entity_browse(db, user_id):
+    return db.query(Calculation).filter(Calculation.user_id == user_id).all()
+
+
+def entity_recent(db, user_id):
+    return (
+        db.query(Calculation)
+        .filter(Calculation.user_id == user_id)
+        .order_by(Calculation.id.desc())
+        .limit(10)
+        .all()
+    )
+
+
+CASES = [
+    ("browse", entity_browse, calculation_rows),
+    ("summary", entity_browse, statistics_rows),
+    ("recent", entity_recent, lambda db, user_id: recent_statistics_rows(db, user_id, 10)),
+]
+
+
+def measure(fn, db, user_id):
+    db.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(db, user_id)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        user_id = seed(db, args.rows)
+
+        print(f"rows: {args.rows}")
+        print(f"{'endpoint':<10}{'entities peak':>16}{'rows peak':>14}{'saved':>8}{'entities ms':>14}{'rows ms':>10}")
+        for name, entity_fn, row_fn in CASES:
+            entity_peak, entity_s = measure(entity_fn, db, user_id)
+            row_peak, row_s = measure(row_fn, db, user_id)
+            saved = 1 - row_peak / entity_peak
+            print(
+                f"{name:<10}{entity_peak / 1024:>13.0f} KB{row_peak / 1024:>11.0f} KB{saved:>8.0%}"
+                f"{entity_s * 1000:>14.1f}{row_s * 1000:>10.1f}"
+            )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_serialization.py
+"""
+browse_calculations serialization: ORM + CalculationRead validation +
+stdlib json (the old path) vs. SQL tuples encoded straight to bytes.
+
+    python -m benchmarks.bench_serialization --rows 50000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import Calculation, CalculationType, User
+from app.queries import BROWSE_FIELDS, calculation_rows
+from app.responses import render_rows
+from app.schemas import CalculationRead
+
+
+def seed(session, rows: int) -> int:
+    user = User(username="bench", email="bench@example.com", password_hash="x")
+    session.add(user)
+    session.commit()
+    rnd = random.Random(1)
+    types = [t for t in CalculationType if t != CalculationType.DIVIDE]
+    session.execute(
+        insert(Calculation),
+        [
+            {"a": rnd.uniform(1, 1000), "b": rnd.uniform(1, 10), "type": rnd.choice(types), "result": rnd.random(), "user_id": user.id}
+            for _ in range(rows)
+        ],
+    )
+    session.commit()
+    return user.id
+
+
+def old_path(session, user_id: int) -> bytes:
+    items = session.query(Calculation).filter(Calculation.user_id == user_id).all()
+    if hasattr(CalculationRead, "model_validate"):  # pydantic 2
+        models = [CalculationRead.model_validate(item, from_attributes=True) for item in items]
+    else:
+        models = [CalculationRead.from_orm(item) for item in items]
+    return json.dumps(jsonable_encoder(models)).encode("utf-8")
+
+
+def fast_path(session, user_id: int) -> bytes:
+    return render_rows(BROWSE_FIELDS, calculation_rows(session, user_id))
+
+
+def timed(fn, session, user_id, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        body = fn(session, user_id)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        user_id = seed(session, args.rows)
+
+        old_s, old_body = timed(old_path, session, user_id, args.repeat)
+        new_s, new_body = timed(fast_path, session, user_id, args.repeat)
+        assert json.loads(old_body) == json.loads(new_body)
+
+        print(f"rows: {args.rows}")
+        print(f"orm + pydantic + json : {old_s * 1000:9.1f} ms  {len(old_body):>10} bytes")
+        print(f"tuples + orjson       : {new_s * 1000:9.1f} ms  {len(new_body):>10} bytes")
+        print(f"speedup               : {old_s / new_s:9.1f}x")
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
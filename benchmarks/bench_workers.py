@@ -0,0 +1,126 @@
+# benchmarks/bench_workers.py
+"""
+Throughput vs. number of server worker processes.
+
+For each worker count this starts the app under the production profile
+(gunicorn.conf.py), drives it with several load-generator processes for a
+fixed time, and reports requests/s and latency percentiles. The load
+generators run in their own processes so the client side does not become
+the bottleneck before the server does.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --seconds 10
+    python -m benchmarks.bench_workers --server uvicorn     # no gunicorn installed
+    python -m benchmarks.bench_workers --path "/add?a=1&b=2"
+
+Scaling stops at the number of CPU cores (and earlier with SQLite, where
+writers serialize); run against Postgres for DB-bound paths.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(server: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}", RATE_LIMIT_ENABLED="false")
+    if server == "gunicorn":
+        cmd = ["gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "", "app.main:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--no-access-log"]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{server} did not start")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+async def _load(url: str, seconds: float, concurrency: int):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def user(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                resp = await client.get(url)
+                if resp.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def load_process(args):
+    return asyncio.run(_load(*args))
+
+
+def run(url: str, seconds: float, clients: int, concurrency: int):
+    with multiprocessing.Pool(clients) as pool:
+        parts = pool.map(load_process, [(url, seconds, concurrency)] * clients)
+    latencies = sorted(lat for part, _ in parts for lat in part)
+    errors = sum(err for _, err in parts)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=max(1, multiprocessing.cpu_count() // 2), help="load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per load-generator process")
+    parser.add_argument("--path", default="/")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        proc = start_server(args.server, workers, port)
+        try:
+            latencies, errors = run(f"http://127.0.0.1:{port}{args.path}", args.seconds, args.clients, args.concurrency)
+        finally:
+            stop_server(proc)
+        rps = len(latencies) / args.seconds
+        baseline = baseline or rps
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f"{workers:>8}{rps:>10.0f}{p50:>10.2f}{p99:>10.2f}{errors:>8}   x{rps / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
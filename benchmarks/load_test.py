@@ -0,0 +1,301 @@
+# benchmarks/load_test.py
+"""
+Load test for the whole API.
+
+Seeds a fresh database (benchmarks.seed), boots the app against it with
+uvicorn or gunicorn, then runs virtual users that log in once and pick
+requests from a weighted mix of real traffic: logins, creates, browse,
+statistics and the GET arithmetic routes. Reports requests/s, p50/p95/p99
+and error rate per endpoint, and writes them to a JSON file.
+
+    python -m benchmarks.load_test run --users 50 --per-user 200 --seconds 30 --out before.json
+    python -m benchmarks.load_test run --server gunicorn --workers 4 --out after.json
+    python -m benchmarks.load_test compare before.json after.json --threshold 0.10
+
+`compare` exits with status 1 if any endpoint's throughput dropped, or its
+p95/p99 latency or error rate rose, by more than the threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.seed import PASSWORD, seed_database
+
+# (name, weight); names are also the report keys
+MIX = [
+    ("login", 2),
+    ("create", 20),
+    ("browse", 15),
+    ("read", 10),
+    ("statistics_summary", 10),
+    ("statistics_recent", 10),
+    ("arithmetic", 33),
+]
+
+_TYPES = ["add", "subtract", "multiply", "divide", "power", "modulus", "percent_of", "nth_root", "log_base"]
+_ARITHMETIC = ["add", "subtract", "multiply", "divide"]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_url: str, port: int, server: str, workers: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        RATE_LIMIT_ENABLED="false",
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}",
+    )
+    if server == "gunicorn":
+        cmd = ["gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "", "app.main:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--no-access-log"]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self, seconds: float) -> Dict[str, dict]:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            endpoints[name] = {
+                "requests": len(values),
+                "errors": self.errors[name],
+                "error_rate": self.errors[name] / len(values),
+                "rps": len(values) / seconds,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+        return endpoints
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, name: str, recorder: Recorder, rnd: random.Random):
+        self.client = client
+        self.name = name
+        self.recorder = recorder
+        self.rnd = rnd
+        self.headers: Dict[str, str] = {}
+        self.calc_ids: List[int] = []
+
+    async def timed(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(endpoint, time.perf_counter() - start, False)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - start, resp.status_code < 400)
+        return resp
+
+    async def login(self) -> None:
+        resp = await self.timed("login", "POST", "/api/users/login", json={"username": self.name, "password": PASSWORD})
+        if resp is not None and resp.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    async def step(self, action: str) -> None:
+        rnd = self.rnd
+        if action == "login":
+            await self.login()
+        elif action == "create":
+            payload = {"a": round(rnd.uniform(1, 1000), 2), "b": round(rnd.uniform(1, 10), 2), "type": rnd.choice(_TYPES)}
+            resp = await self.timed("create", "POST", "/api/calculations", json=payload)
+            if resp is not None and resp.status_code == 200:
+                self.calc_ids.append(resp.json()["id"])
+        elif action == "browse":
+            resp = await self.timed("browse", "GET", "/api/calculations")
+            if resp is not None and resp.status_code == 200 and not self.calc_ids:
+                self.calc_ids = [row["id"] for row in resp.json()[:50]]
+        elif action == "read":
+            if self.calc_ids:
+                await self.timed("read", "GET", f"/api/calculations/{rnd.choice(self.calc_ids)}")
+        elif action == "statistics_summary":
+            await self.timed("statistics_summary", "GET", "/api/statistics/summary")
+        elif action == "statistics_recent":
+            await self.timed("statistics_recent", "GET", f"/api/statistics/recent?limit={rnd.choice([5, 10, 50])}")
+        else:
+            op = rnd.choice(_ARITHMETIC)
+            await self.timed("arithmetic", "GET", f"/{op}", params={"a": rnd.randint(1, 100), "b": rnd.randint(1, 100)})
+
+    async def run(self, deadline: float) -> None:
+        await self.login()
+        names = [name for name, _ in MIX]
+        weights = [weight for _, weight in MIX]
+        while time.perf_counter() < deadline:
+            await self.step(self.rnd.choices(names, weights)[0])
+
+
+async def drive(base_url: str, usernames: List[str], vus: int, seconds: float, seed: int) -> Recorder:
+    recorder = Recorder()
+    rnd = random.Random(seed)
+    limits = httpx.Limits(max_connections=vus)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        users = [VirtualUser(client, rnd.choice(usernames), recorder, random.Random(rnd.random())) for _ in range(vus)]
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(user.run(deadline) for user in users))
+    return recorder
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        engine = create_engine(database_url)
+        start = time.perf_counter()
+        usernames = seed_database(engine, args.users, args.per_user, args.seed)
+        seed_seconds = time.perf_counter() - start
+        engine.dispose()
+
+        port = free_port()
+        proc = start_server(database_url, port, args.server, args.workers)
+        try:
+            recorder = asyncio.run(drive(f"http://127.0.0.1:{port}", usernames, args.vus, args.seconds, args.seed))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    endpoints = recorder.report(args.seconds)
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    total_errors = sum(e["errors"] for e in endpoints.values())
+    all_latencies = sorted(v for values in recorder.latencies.values() for v in values)
+    return {
+        "meta": {
+            "server": args.server,
+            "workers": args.workers,
+            "vus": args.vus,
+            "seconds": args.seconds,
+            "users": args.users,
+            "per_user": args.per_user,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 3),
+            "database": database_url.split(":", 1)[0],
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "total": {
+            "requests": total_requests,
+            "errors": total_errors,
+            "error_rate": total_errors / total_requests if total_requests else 0.0,
+            "rps": total_requests / args.seconds,
+            "p50_ms": percentile(all_latencies, 50) * 1000,
+            "p95_ms": percentile(all_latencies, 95) * 1000,
+            "p99_ms": percentile(all_latencies, 99) * 1000,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{'endpoint':<22}{'requests':>10}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, e in rows:
+        print(
+            f"{name:<22}{e['requests']:>10}{e['rps']:>9.1f}{e['p50_ms']:>9.2f}"
+            f"{e['p95_ms']:>9.2f}{e['p99_ms']:>9.2f}{e['error_rate'] * 100:>7.1f}%"
+        )
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Regressions of `current` against `baseline`, as readable lines."""
+    regressions = []
+    for name, base in sorted(baseline["endpoints"].items()):
+        new = current["endpoints"].get(name)
+        if new is None:
+            regressions.append(f"{name}: missing from the new run")
+            continue
+        if base["rps"] and new["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: rps {base['rps']:.1f} -> {new['rps']:.1f}")
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and new[key] > base[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {base[key]:.2f} -> {new[key]:.2f}")
+        if new["error_rate"] > base["error_rate"] + threshold / 10:
+            regressions.append(f"{name}: error rate {base['error_rate']:.2%} -> {new['error_rate']:.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="seed, boot and load the app")
+    run_parser.add_argument("--users", type=int, default=50, help="seeded users")
+    run_parser.add_argument("--per-user", type=int, default=200, help="seeded calculations per user")
+    run_parser.add_argument("--vus", type=int, default=32, help="concurrent virtual users")
+    run_parser.add_argument("--seconds", type=float, default=30)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn")
+    run_parser.add_argument("--workers", type=int, default=1)
+    run_parser.add_argument("--database-url", help="seed and serve this database instead of a temporary SQLite file")
+    run_parser.add_argument("--out", default="load_test.json")
+
+    compare_parser = sub.add_parser("compare", help="flag regressions between two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative change")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = run(args)
+        print_report(report)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"no regressions beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
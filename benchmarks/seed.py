@@ -0,0 +1,171 @@
+# benchmarks/seed.py
+"""
+Bulk seeder for benchmark databases: N users with M calculations each,
+scaling to millions of rows.
+
+- Every user gets the same password, hashed once (PBKDF2 is deliberately
+  slow; hashing per user would dominate seeding).
+- Rows are generated in chunks of --batch-size. Each chunk computes its
+  results one calculation type at a time: the operation is looked up once
+  and mapped over that type's operands, instead of dispatching per row.
+- Postgres loads each chunk with COPY ... FROM STDIN. Everything else,
+  SQLite included, uses executemany on the raw DBAPI cursor, all inside
+  one transaction.
+- The data depends only on --seed. Each user's rows come from their own
+  RNG, and users.created_at is a fixed epoch rather than now(), so two
+  runs produce the same database.
+
+    python -m benchmarks.seed --database-url sqlite:///./bench.db --users 100 --per-user 200
+    python -m benchmarks.seed --database-url postgresql://... --users 5000 --per-user 1000
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Sequence, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from app.calculation_factory import CalculationFactory
+from app.db import Base
+from app.models import Calculation, CalculationType, User
+from app.security import hash_password
+
+PASSWORD = "benchpass123"
+BATCH_SIZE = 10_000
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+_TYPES = list(CalculationType)
+_USER_COLUMNS = ("username", "email", "password_hash", "created_at")
+_CALCULATION_COLUMNS = ("a", "b", "type", "result", "precision_mode", "user_id")
+
+
+def username(index: int) -> str:
+    return f"bench_user_{index:06d}"
+
+
+def _operands(rnd: random.Random, calc_type: CalculationType) -> Tuple[float, float]:
+    # Keep every row valid for its operation.
+    if calc_type in (CalculationType.POWER, CalculationType.NTH_ROOT):
+        return round(rnd.uniform(1, 100), 3), float(rnd.randint(1, 4))
+    if calc_type == CalculationType.LOG_BASE:
+        return round(rnd.uniform(1, 1000), 3), float(rnd.choice([2, 3, 10]))
+    return round(rnd.uniform(-1000, 1000), 3), round(rnd.uniform(1, 100), 3)
+
+
+def compute_results(types: Sequence[CalculationType], a: Sequence[float], b: Sequence[float]) -> List[float]:
+    """Results for parallel columns, computed per type rather than per row."""
+    results: List[float] = [0.0] * len(types)
+    positions = {calc_type: [] for calc_type in _TYPES}
+    for i, calc_type in enumerate(types):
+        positions[calc_type].append(i)
+    for calc_type, indexes in positions.items():
+        if not indexes:
+            continue
+        compute = CalculationFactory.get_operation(calc_type).compute
+        for i, value in zip(indexes, map(compute, [a[i] for i in indexes], [b[i] for i in indexes])):
+            results[i] = value
+    return results
+
+
+def calculation_rows(rnd: random.Random, user_id: int, count: int) -> List[tuple]:
+    """`count` rows for one user, as tuples in _CALCULATION_COLUMNS order."""
+    types = [rnd.choice(_TYPES) for _ in range(count)]
+    a, b = [], []
+    for calc_type in types:
+        x, y = _operands(rnd, calc_type)
+        a.append(x)
+        b.append(y)
+    results = compute_results(types, a, b)
+    return [(a[i], b[i], types[i].name, results[i], "float", user_id) for i in range(count)]
+
+
+def _chunks(user_ids: Sequence[int], per_user: int, seed: int, batch_size: int) -> Iterator[List[tuple]]:
+    batch: List[tuple] = []
+    for index, user_id in enumerate(user_ids):
+        # An RNG per user keeps a user's rows independent of batch boundaries.
+        rnd = random.Random(seed * 1_000_003 + index)
+        batch.extend(calculation_rows(rnd, user_id, per_user))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy(cursor, table: str, columns: Sequence[str], rows: Sequence[tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _executemany(cursor, table: str, columns: Sequence[str], rows: Sequence[tuple], paramstyle: str) -> None:
+    marks = ", ".join(["%s" if paramstyle in ("format", "pyformat") else "?"] * len(columns))
+    cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})", rows)
+
+
+def seed_database(
+    engine: Engine,
+    users: int,
+    per_user: int,
+    seed: int = 42,
+    batch_size: int = BATCH_SIZE,
+) -> List[str]:
+    """Create the schema and insert the data; returns the usernames (password: PASSWORD)."""
+    Base.metadata.create_all(bind=engine)
+    use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+    paramstyle = engine.dialect.paramstyle
+    password_hash = hash_password(PASSWORD)
+    names = [username(i) for i in range(users)]
+    created_at = EPOCH.isoformat(" ")
+    user_rows = [(n, f"{n}@bench.example.com", password_hash, created_at) for n in names]
+
+    def load(cursor, table, columns, rows):
+        if use_copy:
+            _copy(cursor, table, columns, rows)
+        else:
+            _executemany(cursor, table, columns, rows, paramstyle)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        load(cursor, User.__tablename__, _USER_COLUMNS, user_rows)
+        cursor.execute(f"SELECT username, id FROM {User.__tablename__}")
+        ids = dict(cursor.fetchall())
+        for chunk in _chunks([ids[n] for n in names], per_user, seed, batch_size):
+            load(cursor, Calculation.__tablename__, _CALCULATION_COLUMNS, chunk)
+        raw.commit()
+    except BaseException:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--per-user", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="calculation rows per COPY/executemany")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    start = time.perf_counter()
+    seed_database(engine, args.users, args.per_user, args.seed, args.batch_size)
+    elapsed = time.perf_counter() - start
+    rows = args.users * args.per_user
+    print(
+        f"seeded {args.users} users x {args.per_user} calculations ({rows} rows) into {args.database_url} "
+        f"in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# gunicorn.conf.py
+"""
+Production server profile: Gunicorn managing Uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The worker class comes from the uvicorn-worker package; the
+uvicorn.workers module it replaces is deprecated.
+
+Sizing: WEB_CONCURRENCY workers if set, otherwise one per CPU (each
+Uvicorn worker runs its own event loop plus a thread pool for sync
+routes, so more workers than cores mostly adds contention).
+
+The app is imported once in the master (preload_app) and the workers are
+forked from it, so module code, compiled templates and static manifests
+are shared copy-on-write. gc.freeze() moves everything allocated so far
+out of the collector's reach, so a worker's GC pass does not write to
+(and thereby un-share) those pages.
+
+Graceful reload: `kill -HUP <master>` starts fresh workers and lets the
+old ones finish in-flight requests (up to graceful_timeout). Because the
+app is preloaded, picking up new code needs a restart of the master (or
+USR2 for a zero-downtime binary upgrade).
+"""
+import gc
+import multiprocessing
+import os
+
+
+def default_workers() -> int:
+    return max(1, int(os.getenv("WEB_CONCURRENCY", "0")) or multiprocessing.cpu_count())
+
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = default_workers()
+worker_class = "uvicorn_worker.UvicornWorker"
+
+preload_app = True
+
+# Recycle workers now and then so slow leaks cannot grow without bound;
+# the jitter keeps them from all restarting at the same moment.
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded, before any fork.
+    # Import what app.security otherwise loads on first use, so the
+    # workers share it instead of each importing their own copy.
+    from app.security import load_backends
+
+    load_backends()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    If the master touched the database while preloading, drop the engines
+    it built so this worker creates its own pools: the process default and
+    the preloaded app's (app.state.database: primary, replica and shards).
+    close=False leaves the parent's connections alone instead of closing
+    sockets another process owns. (Database.get_engine() also detects the
+    fork on its own.)
+    """
+    from app.db import dispose_engine
+
+    dispose_engine(close=False)
+    database = getattr(getattr(server.app.wsgi(), "state", None), "database", None)
+    if database is not None:
+        database.dispose(close=False)
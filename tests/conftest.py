@@ -1,13 +1,21 @@
 # tests/conftest.py
+import logging
 import os
+from contextlib import contextmanager
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from fastapi.testclient import TestClient
 
-from app.db import Base, get_db
-from app.main import app
+# The suite logs in and posts far more often than the production limits
+# allow; rate limiting has its own tests against a dedicated app.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from app.db import Base, Database, get_db
+from app.main import app, create_app
+from app.settings import Settings
 
 # Use Postgres in CI (TEST_DATABASE_URL is set there),
 # and SQLite locally by default.
@@ -49,11 +57,68 @@ def db_session():
 
 
 @pytest.fixture
-def client(db_session):
+def query_budget():
+    """
+    Fail if the block runs more SQL statements on the test engine than allowed:
+
+        with query_budget(3):
+            client.get("/api/calculations", headers=auth_headers)
+    """
+    from app.query_stats import capture
+
+    @contextmanager
+    def budget(max_queries: int):
+        with capture(engine) as stats:
+            yield stats
+        statements = "\n".join(f"  {n}x {sql}" for sql, n in stats.statements.most_common())
+        assert stats.count <= max_queries, (
+            f"{stats.count} queries, budget is {max_queries}:\n{statements}"
+        )
+
+    return budget
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Build an app with its own SQLite database and log directory under
+    tmp_path and rate limiting off; keyword arguments override Settings:
+
+        with TestClient(make_app(profiling=True)) as client:
+            ...
+    """
+
+    def make(**overrides):
+        fields = dict(
+            database_url=f"sqlite:///{tmp_path / 'app.db'}",
+            log_dir=str(tmp_path / "logs"),
+            rate_limit=False,
+        )
+        return create_app(Settings(**{**fields, **overrides}))
+
+    yield make
+    # drop the log handlers create_app attached for this test's log dirs
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if getattr(h, "baseFilename", "").startswith(str(tmp_path))]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def signup(client, name, password="securepass123"):
+    """Register and log in `name`; returns the Authorization headers."""
+    client.post("/api/users/register", json={"username": name, "email": f"{name}@example.com", "password": password})
+    token = client.post("/api/users/login", json={"username": name, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def client(db_session, tmp_path, monkeypatch):
     """
     FastAPI TestClient that uses the test database session
     by overriding the get_db dependency.
     """
+    # The lifespan still prepares app.state.database: keep it off ./app.db
+    monkeypatch.setattr(app.state, "database", Database(f"sqlite:///{tmp_path / 'app.db'}"))
 
     def override_get_db():
         try:
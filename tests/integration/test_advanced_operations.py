@@ -80,3 +80,25 @@ def test_log_base_validation_base_one(client, auth_headers):
     assert response.status_code == 400
     assert "cannot be 1" in response.json()["detail"].lower()
     assert "cannot be 1" in response.json()["detail"].lower()
+
+
+def test_power_huge_exponent_rejected(client, auth_headers):
+    for precision in ("float", "decimal", "rational"):
+        resp = client.post(
+            "/api/calculations",
+            headers=auth_headers,
+            json={"a": 10, "b": 10000000, "type": "power", "precision": precision},
+        )
+        assert resp.status_code == 400
+        assert "too large" in resp.json()["detail"]
+
+
+def test_power_negative_base_fractional_exponent_rejected(client, auth_headers):
+    resp = client.post("/api/calculations", headers=auth_headers, json={"a": -8, "b": 0.5, "type": "power"})
+    assert resp.status_code == 400
+
+
+def test_nth_root_negative_radicand_fractional_index_rejected(client, auth_headers):
+    resp = client.post("/api/calculations", headers=auth_headers, json={"a": -8, "b": 2.5, "type": "nth_root"})
+    assert resp.status_code == 400
+    assert "fractional root" in resp.json()["detail"]
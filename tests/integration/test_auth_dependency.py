@@ -0,0 +1,48 @@
+# tests/integration/test_auth_dependency.py
+import pytest
+
+import app.auth as auth_module
+
+
+@pytest.fixture
+def lookup_calls(monkeypatch):
+    """Record every (session, header) auth lookup made during a request."""
+    calls = []
+    original = auth_module.lookup_user
+
+    def counting_lookup(db, authorization):
+        calls.append(db)
+        return original(db, authorization)
+
+    monkeypatch.setattr(auth_module, "lookup_user", counting_lookup)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "method,path,body",
+    [
+        ("get", "/api/users/me", None),
+        ("put", "/api/users/profile", {}),
+        ("get", "/api/calculations", None),
+        ("post", "/api/calculations", {"a": 1, "b": 2, "type": "add"}),
+        ("get", "/api/statistics/summary", None),
+        ("get", "/api/statistics/recent", None),
+    ],
+)
+def test_exactly_one_auth_lookup_per_request(client, auth_headers, db_session, lookup_calls, method, path, body):
+    kwargs = {"headers": auth_headers}
+    if body is not None:
+        kwargs["json"] = body
+    resp = getattr(client, method)(path, **kwargs)
+
+    assert resp.status_code == 200
+    assert len(lookup_calls) == 1
+    # The lookup ran on the same session the route handler used
+    assert lookup_calls[0] is db_session
+
+
+def test_unauthenticated_request_rejected_once(client, lookup_calls):
+    resp = client.get("/api/users/me")
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "Missing token"
+    assert len(lookup_calls) == 1
@@ -117,3 +117,14 @@ def test_calculation_forbidden(client):
     # Delete -> 403
     resp = client.delete(f"/api/calculations/{calc_id}", headers=h2)
     assert resp.status_code == 403
+
+
+def test_browse_matches_read_representation(client, auth_headers):
+    created = client.post("/api/calculations", json={"a": 2, "b": 8, "type": "power"}, headers=auth_headers).json()
+
+    resp = client.get("/api/calculations", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    items = resp.json()
+    assert items == [created]
+    assert list(items[0]) == list(created)
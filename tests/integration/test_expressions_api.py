@@ -0,0 +1,95 @@
+# tests/integration/test_expressions_api.py
+
+
+def test_evaluate_expression_over_bindings(client, auth_headers):
+    resp = client.post(
+        "/api/expressions/evaluate",
+        headers=auth_headers,
+        json={
+            "expression": "(a + b) ^ c / d",
+            "bindings": [{"a": 1, "b": 2, "c": 2, "d": 3}, {"a": 2, "b": 2, "c": 0.5, "d": 4}],
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["variables"] == ["a", "b", "c", "d"]
+    assert data["results"] == [3.0, 0.5]
+
+
+def test_evaluate_constant_expression_defaults_to_one_binding(client, auth_headers):
+    resp = client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": "log_base(8, 2) * 10"})
+    assert resp.status_code == 200
+    assert resp.json()["results"] == [30.0]
+
+
+def test_evaluate_expression_does_not_persist(client, auth_headers):
+    client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": "1 + 1"})
+    assert client.get("/api/calculations", headers=auth_headers).json() == []
+
+
+def test_evaluate_expression_errors(client, auth_headers):
+    resp = client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": "1 +"})
+    assert resp.status_code == 400
+
+    resp = client.post(
+        "/api/expressions/evaluate",
+        headers=auth_headers,
+        json={"expression": "a / b", "bindings": [{"a": 1, "b": 1}, {"a": 1, "b": 0}]},
+    )
+    assert resp.status_code == 400
+    assert resp.json()["detail"].startswith("Binding 1")
+
+    resp = client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": "x + 1"})
+    assert resp.status_code == 400
+
+    resp = client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": "1", "bindings": []})
+    assert resp.status_code == 422
+
+
+def test_evaluate_expression_too_deep_is_a_client_error(client, auth_headers):
+    for text in ("(" * 300 + "1" + ")" * 300, "-" * 999 + "1"):
+        resp = client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": text})
+        assert resp.status_code == 400
+        assert "nested" in resp.json()["detail"]
+
+
+def test_evaluate_long_expression(client, auth_headers):
+    resp = client.post("/api/expressions/evaluate", headers=auth_headers, json={
+        "expression": "+".join(["a"] * 400), "bindings": [{"a": 2}],
+    })
+    assert resp.status_code == 200
+    assert resp.json()["results"] == [800]
+
+
+def test_evaluate_expression_requires_auth(client):
+    resp = client.post("/api/expressions/evaluate", json={"expression": "1 + 1"})
+    assert resp.status_code == 401
+
+
+def test_expression_cache_stats(client, auth_headers):
+    client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": "stat_x * stat_y"})
+    client.post("/api/expressions/evaluate", headers=auth_headers, json={
+        "expression": "stat_y * stat_x", "bindings": [{"stat_x": 2, "stat_y": 3}],
+    })
+    resp = client.get("/api/expressions/cache", headers=auth_headers)
+    assert resp.status_code == 200
+    stats = resp.json()
+    assert stats["normalized_hits"] >= 1
+    assert set(stats) == {"size", "maxsize", "hits", "normalized_hits", "misses", "evictions"}
+
+
+def test_evaluate_expression_huge_power_is_rejected(client, auth_headers):
+    resp = client.post("/api/expressions/evaluate", headers=auth_headers, json={"expression": "x ^ y", "bindings": [{"x": 10, "y": 1e7}]})
+    assert resp.status_code == 400
+    assert "too large" in resp.json()["detail"]
+
+
+def test_evaluate_expression_cpu_budget(client, auth_headers, monkeypatch):
+    monkeypatch.setattr("app.calculation_factory.CPU_BUDGET_SECONDS", 0.0)
+    resp = client.post(
+        "/api/expressions/evaluate",
+        headers=auth_headers,
+        json={"expression": "nth_root(x, 3) + log_base(x, 2)", "bindings": [{"x": i + 1} for i in range(10000)]},
+    )
+    assert resp.status_code == 400
+    assert "CPU budget" in resp.json()["detail"]
@@ -0,0 +1,111 @@
+# tests/integration/test_idempotency_api.py
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import calculations
+from tests.conftest import signup
+
+
+@pytest.fixture
+def idem_app(make_app):
+    app = make_app()
+    with TestClient(app) as client:
+        yield client, app
+
+
+PAYLOAD = {"a": 6, "b": 7, "type": "multiply"}
+
+
+def test_retry_returns_the_stored_response(idem_app):
+    client, app = idem_app
+    headers = {**signup(client, "retrier"), "Idempotency-Key": "order-1"}
+    first = client.post("/api/calculations", headers=headers, json=PAYLOAD)
+    second = client.post("/api/calculations", headers=headers, json=PAYLOAD)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len(client.get("/api/calculations", headers=headers).json()) == 1
+    assert app.state.idempotency_store.replays == 1
+
+
+def test_new_key_creates_a_new_row(idem_app):
+    client, _ = idem_app
+    headers = signup(client, "twice")
+    ids = {
+        client.post("/api/calculations", headers={**headers, "Idempotency-Key": key}, json=PAYLOAD).json()["id"]
+        for key in ("k1", "k2")
+    }
+    assert len(ids) == 2
+
+
+def test_keys_are_per_user(idem_app):
+    client, _ = idem_app
+    alice = client.post("/api/calculations", headers={**signup(client, "alice"), "Idempotency-Key": "same"}, json=PAYLOAD)
+    bob = client.post("/api/calculations", headers={**signup(client, "bob"), "Idempotency-Key": "same"}, json=PAYLOAD)
+    assert alice.json()["id"] != bob.json()["id"]
+    assert "idempotent-replayed" not in bob.headers
+
+
+def test_reusing_a_key_with_another_body_is_rejected(idem_app):
+    client, _ = idem_app
+    headers = {**signup(client, "reuser"), "Idempotency-Key": "k"}
+    client.post("/api/calculations", headers=headers, json=PAYLOAD)
+    resp = client.post("/api/calculations", headers=headers, json={**PAYLOAD, "a": 7})
+    assert resp.status_code == 422
+    assert len(client.get("/api/calculations", headers=headers).json()) == 1
+
+
+def test_expression_batches_are_not_recomputed(idem_app):
+    client, _ = idem_app
+    headers = {**signup(client, "batcher"), "Idempotency-Key": "batch-1"}
+    body = {"expression": "x * 2", "bindings": [{"x": 1}, {"x": 2}]}
+    first = client.post("/api/expressions/evaluate", headers=headers, json=body)
+    second = client.post("/api/expressions/evaluate", headers=headers, json=body)
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def test_concurrent_duplicates_wait_for_the_first(idem_app, monkeypatch):
+    client, _ = idem_app
+    headers = {**signup(client, "racer"), "Idempotency-Key": "race"}
+    original = calculations.compute
+    calls = []
+
+    def slow_compute(*args):
+        calls.append(args)
+        time.sleep(0.3)
+        return original(*args)
+
+    monkeypatch.setattr(calculations, "compute", slow_compute)
+    responses = []
+    threads = [
+        threading.Thread(target=lambda: responses.append(client.post("/api/calculations", headers=headers, json=PAYLOAD)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sorted(r.headers.get("idempotent-replayed", "") for r in responses) == ["", "true", "true"]
+
+
+def test_validation_errors_are_replayed_too(idem_app):
+    client, _ = idem_app
+    headers = {**signup(client, "invalid"), "Idempotency-Key": "bad"}
+    body = {"a": 1, "b": 0, "type": "divide"}
+    assert client.post("/api/calculations", headers=headers, json=body).status_code == 422
+    assert client.post("/api/calculations", headers=headers, json=body).headers["idempotent-replayed"] == "true"
+
+
+def test_without_a_key_nothing_changes(client, auth_headers):
+    first = client.post("/api/calculations", headers=auth_headers, json=PAYLOAD)
+    second = client.post("/api/calculations", headers=auth_headers, json=PAYLOAD)
+    assert first.json()["id"] != second.json()["id"]
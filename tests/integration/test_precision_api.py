@@ -0,0 +1,63 @@
+# tests/integration/test_precision_api.py
+from decimal import Decimal
+
+from app.models import Calculation
+
+
+def test_create_decimal_calculation(client, auth_headers, db_session):
+    resp = client.post(
+        "/api/calculations",
+        headers=auth_headers,
+        json={"a": 0.1, "b": 0.2, "type": "add", "precision": "decimal"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["precision_mode"] == "decimal"
+    assert data["result_exact"] == "0.3"
+    assert data["result"] == 0.3
+
+    stored = db_session.query(Calculation).filter(Calculation.id == data["id"]).first()
+    assert stored.result_exact == Decimal("0.3")
+
+
+def test_exact_result_survives_read_and_browse(client, auth_headers):
+    created = client.post(
+        "/api/calculations",
+        headers=auth_headers,
+        json={"a": 2, "b": 3, "type": "divide", "precision": "rational", "digits": 40},
+    ).json()
+    assert created["result_exact"] == "0." + "6" * 39 + "7"
+
+    read = client.get(f"/api/calculations/{created['id']}", headers=auth_headers).json()
+    assert read["result_exact"] == created["result_exact"]
+
+    browsed = client.get("/api/calculations", headers=auth_headers).json()
+    assert browsed == [read]
+
+
+def test_float_mode_is_default(client, auth_headers):
+    data = client.post("/api/calculations", headers=auth_headers, json={"a": 1, "b": 2, "type": "add"}).json()
+    assert data["precision_mode"] == "float"
+    assert data["result_exact"] is None
+
+
+def test_update_switches_mode(client, auth_headers):
+    calc_id = client.post("/api/calculations", headers=auth_headers, json={"a": 1, "b": 3, "type": "divide"}).json()["id"]
+    resp = client.put(
+        f"/api/calculations/{calc_id}",
+        headers=auth_headers,
+        json={"a": 1, "b": 3, "type": "divide", "precision": "decimal", "digits": 4},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["result_exact"] == "0.3333"
+
+
+def test_invalid_precision_requests(client, auth_headers):
+    resp = client.post("/api/calculations", headers=auth_headers, json={"a": 1, "b": 2, "type": "add", "precision": "bogus"})
+    assert resp.status_code == 422
+
+    resp = client.post("/api/calculations", headers=auth_headers, json={"a": 1, "b": 2, "type": "add", "precision": "decimal", "digits": 0})
+    assert resp.status_code == 422
+
+    resp = client.post("/api/calculations", headers=auth_headers, json={"a": 1, "b": 0, "type": "modulus", "precision": "decimal"})
+    assert resp.status_code == 400
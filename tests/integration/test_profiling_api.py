@@ -0,0 +1,70 @@
+# tests/integration/test_profiling_api.py
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.conftest import signup
+
+
+@pytest.fixture
+def profiling_client(make_app):
+    with TestClient(make_app(profiling=True, profiling_admin_ids=frozenset({1}))) as client:
+        yield client
+
+
+@pytest.fixture
+def admin_headers(profiling_client):
+    return signup(profiling_client, "admin")  # user id 1
+
+
+@pytest.fixture
+def user_headers(profiling_client, admin_headers):
+    return signup(profiling_client, "regular")  # user id 2
+
+
+def test_sampling_endpoint_returns_collapsed_stacks(profiling_client, admin_headers):
+    resp = profiling_client.post("/api/admin/profile?seconds=0.05&interval_ms=1", headers=admin_headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert int(resp.headers["x-profile-samples"]) > 0
+    line = resp.text.splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert ";" in stack and int(count) >= 1
+
+
+def test_sampling_endpoint_is_admin_only(profiling_client, user_headers):
+    assert profiling_client.post("/api/admin/profile?seconds=0.01").status_code == 401
+    assert profiling_client.post("/api/admin/profile?seconds=0.01", headers=user_headers).status_code == 403
+
+
+def test_sampling_duration_is_capped(profiling_client, admin_headers):
+    assert profiling_client.post("/api/admin/profile?seconds=600", headers=admin_headers).status_code == 422
+
+
+def test_profile_header_returns_cprofile_report(profiling_client, admin_headers):
+    headers = {**admin_headers, "X-Profile": "1"}
+    resp = profiling_client.post("/api/calculations", headers=headers, json={"a": 2, "b": 10, "type": "power"})
+    assert resp.status_code == 200
+    assert resp.headers["x-profile-status"] == "200"
+    assert "function calls" in resp.text
+    assert "add_calculation" in resp.text
+
+    # the request itself still went through
+    assert len(profiling_client.get("/api/calculations", headers=admin_headers).json()) == 1
+
+
+def test_profile_header_ignored_for_non_admins(profiling_client, user_headers):
+    headers = {**user_headers, "X-Profile": "1"}
+    resp = profiling_client.get("/api/users/me", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["username"] == "regular"
+    assert "x-profile-status" not in resp.headers
+
+
+def test_profile_header_reports_rejected_requests(profiling_client, admin_headers):
+    headers = {**admin_headers, "X-Profile": "1"}
+    resp = profiling_client.get("/api/calculations/999", headers=headers)
+    assert resp.headers["x-profile-status"] == "404"
+
+
+def test_admin_routes_absent_when_disabled(client):
+    assert client.post("/api/admin/profile?seconds=0.01").status_code == 404
@@ -0,0 +1,43 @@
+# tests/integration/test_queries.py
+from app.models import Calculation, CalculationType, User
+from app.queries import (
+    BROWSE_FIELDS,
+    STATS_FIELDS,
+    calculation_rows,
+    recent_statistics_rows,
+    statistics_rows,
+)
+from app.security import hash_password
+
+
+def _user_with_calcs(db_session, name, count):
+    user = User(username=name, email=f"{name}@example.com", password_hash=hash_password("secret123"))
+    db_session.add(user)
+    db_session.commit()
+    for i in range(count):
+        db_session.add(Calculation(a=i, b=1, type=CalculationType.ADD, result=i + 1, user_id=user.id))
+    db_session.commit()
+    return user
+
+
+def test_rows_are_projected_tuples_not_entities(db_session):
+    user_id = _user_with_calcs(db_session, "q_rows_user", 3).id
+    db_session.expunge_all()
+
+    rows = calculation_rows(db_session, user_id)
+    assert len(rows) == 3
+    assert tuple(rows[0]._fields) == BROWSE_FIELDS
+    assert rows[0].type == CalculationType.ADD
+    assert not any(isinstance(obj, Calculation) for obj in db_session.identity_map.values())
+
+    stats = statistics_rows(db_session, user_id)
+    assert tuple(stats[0]._fields) == STATS_FIELDS
+    assert sorted(r.result for r in stats) == [1, 2, 3]
+
+
+def test_recent_rows_newest_first_and_scoped_to_user(db_session):
+    user = _user_with_calcs(db_session, "q_recent_user", 5)
+    _user_with_calcs(db_session, "q_other_user", 2)
+
+    rows = recent_statistics_rows(db_session, user.id, 3)
+    assert [r.result for r in rows] == [5, 4, 3]
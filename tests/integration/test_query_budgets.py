@@ -0,0 +1,132 @@
+# tests/integration/test_query_budgets.py
+"""
+SQL statement budgets per endpoint, so an N+1 (e.g. a lazy
+User.calculations load per row) fails here instead of slipping through.
+
+Every user starts with several calculations: a per-row query would push
+the count past the budget, which is fixed and independent of row count.
+"""
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.query_stats import QueryStats, install, track
+
+ROWS = 6
+
+
+@pytest.fixture
+def seeded(client, auth_headers):
+    ids = []
+    for i in range(ROWS):
+        resp = client.post("/api/calculations", headers=auth_headers, json={"a": i, "b": 2, "type": "multiply"})
+        ids.append(resp.json()["id"])
+    return ids
+
+
+CALCULATIONS = [
+    ("GET", "/api/calculations", None, 2),
+    ("POST", "/api/calculations", {"a": 1, "b": 2, "type": "add"}, 3),
+    ("GET", "/api/calculations/{id}", None, 2),
+    ("PUT", "/api/calculations/{id}", {"a": 3, "b": 4, "type": "power"}, 5),
+    ("DELETE", "/api/calculations/{id}", None, 3),
+]
+
+STATISTICS = [
+    ("GET", "/api/statistics/summary", None, 2),
+    ("GET", "/api/statistics/recent?limit=5", None, 2),
+    ("GET", "/api/statistics/coalescing", None, 1),
+]
+
+USERS = [
+    ("GET", "/api/users/me", None, 1),
+    ("PUT", "/api/users/profile", {"email": "budget_{n}@example.com"}, 4),
+    ("POST", "/api/users/change-password", {"old_password": "testpass123", "new_password": "newpass1234"}, 2),
+]
+
+
+@pytest.mark.parametrize("method,path,body,budget", CALCULATIONS + STATISTICS + USERS)
+def test_authenticated_endpoint_budget(client, auth_headers, seeded, query_budget, method, path, body, budget):
+    path = path.format(id=seeded[0])
+    if body and "email" in body:
+        body = {"email": body["email"].format(n=seeded[0])}
+    with query_budget(budget):
+        resp = client.request(method, path, headers=auth_headers, json=body)
+    assert resp.status_code < 300, resp.text
+
+
+def test_register_and_login_budget(client, query_budget):
+    user = {"username": "budget_user", "email": "budget_user@example.com", "password": "securepass123"}
+    with query_budget(4):
+        assert client.post("/api/users/register", json=user).status_code == 200
+    with query_budget(1):
+        resp = client.post("/api/users/login", json={"username": user["username"], "password": user["password"]})
+    assert resp.status_code == 200
+
+
+def test_create_user_budget(client, query_budget):
+    user = {"username": "budget_user2", "email": "budget_user2@example.com", "password": "securepass123"}
+    with query_budget(4):
+        assert client.post("/api/users", json=user).status_code == 200
+
+
+def test_budget_failure_lists_statements(client, auth_headers, seeded, query_budget):
+    with pytest.raises(AssertionError, match="budget is 0"):
+        with query_budget(0):
+            client.get("/api/calculations", headers=auth_headers)
+
+
+def test_repeated_statements():
+    stats = QueryStats()
+    for _ in range(5):
+        stats.record("SELECT 1", 0.001)
+    stats.record("SELECT 2", 0.001)
+    assert stats.count == 6
+    assert stats.repeated(5) == [("SELECT 1", 5)]
+    assert stats.server_timing() == 'db;dur=6.00;desc="6 queries"'
+
+
+def test_track_collects_this_context_only(db_session):
+    from sqlalchemy import text
+
+    install()
+    with track() as stats:
+        db_session.execute(text("SELECT 1"))
+        db_session.execute(text("SELECT 1"))
+    db_session.execute(text("SELECT 1"))
+    assert stats.count == 2
+
+
+def test_server_timing_header_in_debug_mode(make_app):
+    app = make_app(query_debug=True)
+    with TestClient(app) as c:
+        resp = c.post("/api/users/register", json={"username": "dbg", "email": "dbg@example.com", "password": "securepass123"})
+        assert resp.status_code == 200
+        assert resp.headers["server-timing"].startswith("db;dur=")
+        assert 'queries"' in resp.headers["server-timing"]
+
+        # 401s are answered before any query
+        assert c.get("/api/users/me").headers["server-timing"].endswith('desc="0 queries"')
+
+
+def test_no_server_timing_by_default(client):
+    assert "server-timing" not in client.get("/").headers
+
+
+def test_repeated_statement_is_logged_as_n_plus_one(make_app, caplog):
+    from sqlalchemy import text
+
+    app = make_app(query_debug=True)
+
+    @app.get("/n-plus-one")
+    def n_plus_one():
+        with app.state.database.get_engine().connect() as conn:
+            for i in range(6):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {}
+
+    with TestClient(app) as c, caplog.at_level(logging.WARNING, logger="fastapi_calculator"):
+        resp = c.get("/n-plus-one")
+    assert resp.headers["server-timing"].endswith('desc="6 queries"')
+    assert any("Possible N+1 in GET /n-plus-one: ran 6 times" in r.getMessage() for r in caplog.records)
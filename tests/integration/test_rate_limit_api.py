@@ -0,0 +1,100 @@
+# tests/integration/test_rate_limit_api.py
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.rate_limit import MemoryStore, RateLimit, RateLimitMiddleware, Rule
+from app.security import create_access_token
+
+
+def make_client(burst=3, store=None):
+    app = FastAPI()
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=store if store is not None else MemoryStore(),
+        rules=[
+            Rule(frozenset({"POST"}), "/login", RateLimit("auth", 2, 60), per_ip=True),
+            Rule(None, "/api/", RateLimit("api", burst, 60)),
+        ],
+    )
+
+    @app.get("/api/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.post("/login")
+    def login():
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def bearer(user_id):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def test_headers_and_429():
+    client = make_client(burst=2)
+    first = client.get("/api/ping")
+    assert first.status_code == 200
+    assert first.headers["RateLimit-Limit"] == "2"
+    assert first.headers["RateLimit-Remaining"] == "1"
+    assert first.headers["RateLimit-Policy"] == "2;w=60"
+    assert int(first.headers["RateLimit-Reset"]) > 0
+
+    client.get("/api/ping")
+    limited = client.get("/api/ping")
+    assert limited.status_code == 429
+    assert limited.json() == {"detail": "Too many requests"}
+    assert limited.headers["RateLimit-Remaining"] == "0"
+    assert int(limited.headers["Retry-After"]) >= 1
+
+
+def test_unmatched_paths_are_not_limited():
+    client = make_client(burst=1)
+    for _ in range(5):
+        resp = client.get("/health")
+        assert resp.status_code == 200
+        assert "RateLimit-Limit" not in resp.headers
+
+
+def test_users_get_separate_buckets():
+    client = make_client(burst=3)
+    greedy, polite = bearer(1), bearer(2)
+    statuses = [client.get("/api/ping", headers=greedy).status_code for _ in range(10)]
+    assert statuses.count(200) == 3
+    # the greedy user's exhaustion does not affect anyone else
+    assert all(client.get("/api/ping", headers=polite).status_code == 200 for _ in range(3))
+
+
+def test_login_is_limited_per_ip_regardless_of_token():
+    client = make_client()
+    statuses = [client.post("/login", headers=bearer(i)).status_code for i in range(4)]
+    assert statuses == [200, 200, 429, 429]
+
+
+def test_blocking_stores_run_off_the_event_loop():
+    class RecordingStore(MemoryStore):
+        blocking = True
+
+        def consume(self, key, limit, now=None):
+            self.threads.append(threading.current_thread())
+            return super().consume(key, limit, now)
+
+    store = RecordingStore()
+    store.threads = []
+    client = make_client(store=store)
+    loop_thread = []
+
+    @client.app.get("/api/where")
+    async def where():
+        loop_thread.append(threading.current_thread())
+        return {}
+
+    assert client.get("/api/where").status_code == 200
+    assert store.threads and store.threads[0] is not loop_thread[0]
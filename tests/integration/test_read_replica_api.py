@@ -0,0 +1,83 @@
+# tests/integration/test_read_replica_api.py
+"""
+Read routing against two SQLite files standing in for primary and replica.
+Rows written straight into the replica file (a=999) show which one a
+request read from.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+
+from app import read_replica
+from app.db import Base
+from app.models import Calculation, CalculationType
+from tests.conftest import signup
+
+
+@pytest.fixture
+def replica_app(make_app, tmp_path, monkeypatch):
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    Base.metadata.create_all(create_engine(replica_url))
+    monkeypatch.setattr(read_replica, "monitor", read_replica.ReplicaMonitor())
+    monkeypatch.setattr(read_replica, "recent_writers", read_replica.RecentWriters())
+    with TestClient(make_app(database_read_url=replica_url)) as client:
+        yield client, create_engine(replica_url)
+
+
+@pytest.fixture
+def user(replica_app):
+    client, replica = replica_app
+    headers = signup(client, "reader")
+    user_id = client.get("/api/users/me", headers=headers).json()["id"]
+    with replica.begin() as conn:
+        conn.execute(insert(Calculation), [{"a": 999, "b": 1, "type": CalculationType.ADD, "result": 1000, "user_id": user_id}])
+    return client, headers
+
+
+def _browse_a(client, headers):
+    return [row["a"] for row in client.get("/api/calculations", headers=headers).json()]
+
+
+def test_reads_go_to_the_replica(user):
+    client, headers = user
+    assert _browse_a(client, headers) == [999]
+    assert client.get("/api/statistics/summary", headers=headers).json()["total_calculations"] == 1
+    assert client.get("/api/statistics/recent", headers=headers).json()["count"] == 1
+
+
+def test_reads_after_a_write_stick_to_the_primary(user):
+    client, headers = user
+    created = client.post("/api/calculations", headers=headers, json={"a": 1, "b": 2, "type": "add"}).json()
+
+    # read-your-writes: the replica has not seen it, so the primary answers
+    assert _browse_a(client, headers) == [1]
+    assert client.get(f"/api/calculations/{created['id']}", headers=headers).status_code == 200
+
+    # once the window has passed, reads return to the replica
+    read_replica.recent_writers.clear()
+    assert _browse_a(client, headers) == [999]
+
+
+def test_lagging_replica_falls_back_to_the_primary(user):
+    client, headers = user
+    read_replica.monitor.probe = lambda engine: read_replica.MAX_REPLICA_LAG + 30
+    read_replica.monitor.reset()
+    assert _browse_a(client, headers) == []
+
+
+def test_unreachable_replica_falls_back_to_the_primary(user):
+    client, headers = user
+
+    def down(engine):
+        raise ConnectionError("replica down")
+
+    read_replica.monitor.probe = down
+    read_replica.monitor.reset()
+    assert _browse_a(client, headers) == []
+    assert client.get("/api/statistics/summary", headers=headers).json()["total_calculations"] == 0
+
+
+def test_without_a_replica_reads_use_the_primary(client, auth_headers):
+    assert client.app.state.database.get_read_engine() is None
+    client.post("/api/calculations", headers=auth_headers, json={"a": 4, "b": 2, "type": "add"})
+    assert [row["a"] for row in client.get("/api/calculations", headers=auth_headers).json()] == [4]
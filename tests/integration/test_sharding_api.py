@@ -0,0 +1,132 @@
+# tests/integration/test_sharding_api.py
+"""
+Sharded calculations against three SQLite shard files and a SQLite primary.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+
+from app import sharding
+from app.sharding import shard_calculations
+from tests.conftest import signup
+
+SHARDS = ("s0", "s1", "s2")
+
+
+@pytest.fixture
+def sharded_app(make_app, tmp_path):
+    app = make_app(database_shards={name: f"sqlite:///{tmp_path / (name + '.db')}" for name in SHARDS})
+    with TestClient(app) as client:
+        yield client, app.state.settings
+
+
+def _rows_on(shards, shard, user_id):
+    with create_engine(shards[shard]).connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(shard_calculations).where(shard_calculations.c.user_id == user_id)
+        ).scalar()
+
+
+@pytest.fixture
+def users(sharded_app):
+    client, settings = sharded_app
+    found = {}
+    for n in range(12):
+        headers = signup(client, f"user{n}")
+        user_id = client.get("/api/users/me", headers=headers).json()["id"]
+        created = client.post("/api/calculations", headers=headers, json={"a": n, "b": 1, "type": "add"})
+        assert created.status_code == 200
+        found[user_id] = (headers, created.json()["id"])
+    return client, settings, found
+
+
+def test_calculations_live_on_the_ring_shard(users):
+    client, settings, found = users
+    shards = client.app.state.shards
+    assert len({shards.ring_shard(user_id) for user_id in found}) > 1
+    for user_id, (headers, calc_id) in found.items():
+        home = shards.ring_shard(user_id)
+        assert _rows_on(settings.database_shards, home, user_id) == 1
+        assert all(_rows_on(settings.database_shards, other, user_id) == 0 for other in SHARDS if other != home)
+        assert [row["id"] for row in client.get("/api/calculations", headers=headers).json()] == [calc_id]
+        assert client.get("/api/statistics/summary", headers=headers).json()["total_calculations"] == 1
+
+
+def test_ids_are_unique_across_shards(users):
+    client, _, found = users
+    for user_id, (_, calc_id) in found.items():
+        index = SHARDS.index(client.app.state.shards.ring_shard(user_id))
+        assert index * sharding.ID_BLOCK <= calc_id < (index + 1) * sharding.ID_BLOCK
+
+
+def test_update_and_delete_use_the_shard(users):
+    client, settings, found = users
+    user_id, (headers, calc_id) = next(iter(found.items()))
+    updated = client.put(f"/api/calculations/{calc_id}", headers=headers, json={"a": 5, "b": 5, "type": "multiply"})
+    assert updated.json()["result"] == 25
+    assert client.delete(f"/api/calculations/{calc_id}", headers=headers).status_code == 200
+    assert _rows_on(settings.database_shards, client.app.state.shards.ring_shard(user_id), user_id) == 0
+
+
+def test_move_user_keeps_ids_and_serves_from_the_target(users):
+    client, settings, found = users
+    shards = client.app.state.shards
+    user_id, (headers, calc_id) = next(iter(found.items()))
+    source = shards.ring_shard(user_id)
+    target = next(name for name in SHARDS if name != source)
+
+    assert shards.move_user(user_id, target, grace=0) == 1
+    assert _rows_on(settings.database_shards, source, user_id) == 0
+    assert _rows_on(settings.database_shards, target, user_id) == 1
+    with shards.database.session() as db:
+        assert shards.placement(db, user_id) == sharding.Placement(target, False, True)
+        others = [u for u in found if u != user_id]
+        assert shards.placements(db, [user_id] + others) == {
+            user_id: sharding.Placement(target, False, True),
+            **{u: sharding.Placement(shards.ring_shard(u)) for u in others},
+        }
+
+    assert client.get(f"/api/calculations/{calc_id}", headers=headers).status_code == 200
+    created = client.post("/api/calculations", headers=headers, json={"a": 1, "b": 1, "type": "add"})
+    assert created.status_code == 200
+    assert _rows_on(settings.database_shards, target, user_id) == 2
+
+
+def test_writes_wait_while_a_user_is_moving(users):
+    client, _, found = users
+    shards = client.app.state.shards
+    user_id, (headers, calc_id) = next(iter(found.items()))
+    sharding._set_directory(shards.database.get_engine(), user_id, shards.ring_shard(user_id), moving=True)
+
+    blocked = client.post("/api/calculations", headers=headers, json={"a": 1, "b": 1, "type": "add"})
+    assert blocked.status_code == 503
+    assert blocked.headers["retry-after"] == "1"
+    assert client.delete(f"/api/calculations/{calc_id}", headers=headers).status_code == 503
+    assert client.get(f"/api/calculations/{calc_id}", headers=headers).status_code == 200
+
+
+def test_pin_then_rebalance_after_adding_a_shard(users, tmp_path):
+    client, settings, found = users
+    grown = dict(settings.database_shards, s3=f"sqlite:///{tmp_path / 's3.db'}")
+
+    pinned = client.app.state.shards.pin(list(grown))
+    movers = [u for u in found if sharding.HashRing(list(grown)).shard_for(u) == "s3"]
+    assert pinned == len(movers)
+
+    shards = client.app.state.shards = sharding.Shards(grown, client.app.state.database)
+    shards.prepare()
+    # pinned users still read from where their rows are
+    with shards.database.session() as db:
+        assert all(shards.placement(db, u).shard != "s3" for u in movers)
+
+    assert shards.rebalance(grace=0, log=lambda line: None) == len(movers)
+    assert movers
+    with shards.database.session() as db:
+        assert all(shards.placement(db, u) == sharding.Placement("s3") for u in movers)
+    for user_id in found:
+        assert _rows_on(grown, shards.ring_shard(user_id), user_id) == 1
+
+
+def test_unsharded_app_uses_the_primary(client, auth_headers):
+    assert client.app.state.shards is None
+    assert client.post("/api/calculations", headers=auth_headers, json={"a": 1, "b": 1, "type": "add"}).status_code == 200
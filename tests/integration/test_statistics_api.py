@@ -262,3 +262,59 @@ class TestStatisticsPerformance:
         # Verify breakdown adds up
         breakdown_total = sum(data["operations_breakdown"].values())
         assert breakdown_total == 50
+
+
+class TestStatisticsCoalescing:
+    """Concurrent identical statistics requests share one query."""
+
+    def test_concurrent_summaries_share_one_query(self, client, auth_headers, monkeypatch):
+        import threading
+        import time
+        from types import SimpleNamespace
+
+        from app.auth import get_current_user
+        from app.main import app
+
+        calls = []
+        release = threading.Event()
+
+        def slow_rows(db, user_id):
+            calls.append(user_id)
+            release.wait(5)
+            return []
+
+        monkeypatch.setattr("app.statistics.statistics_rows", slow_rows)
+        # A stub principal keeps the shared test session off the worker threads
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=987654)
+        statistics_flight = app.state.statistics_flight
+        statistics_flight.reset_stats()
+
+        responses = []
+        threads = [
+            threading.Thread(target=lambda: responses.append(client.get("/api/statistics/summary")))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            call = statistics_flight._calls.get(("summary", 987654, "primary"))
+            if call is not None and call.waiters == 4:
+                break
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert calls == [987654]
+        assert [r.status_code for r in responses] == [200] * 5
+        assert all(r.json()["total_calculations"] == 0 for r in responses)
+
+        stats = client.get("/api/statistics/coalescing").json()
+        assert stats["executions"] == 1
+        assert stats["coalesced"] == 4
+
+    def test_recent_is_keyed_by_limit(self, client, auth_headers):
+        client.post("/api/calculations", headers=auth_headers, json={"a": 1, "b": 2, "type": "add"})
+        assert client.get("/api/statistics/recent?limit=1", headers=auth_headers).json()["count"] == 1
+        assert client.get("/api/statistics/recent?limit=5", headers=auth_headers).json()["count"] == 1
@@ -0,0 +1,69 @@
+# tests/integration/test_write_behind_api.py
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.conftest import signup
+
+
+@pytest.fixture
+def async_app(make_app, tmp_path):
+    app = make_app(write_behind=True, write_behind_durability="fsync", write_behind_spool_dir=str(tmp_path / "spool"))
+    with TestClient(app) as client:
+        yield client, signup(client, "writer")
+
+
+ASYNC = {"Prefer": "respond-async"}
+
+
+def test_respond_async_queues_and_flushes(async_app):
+    client, headers = async_app
+    resp = client.post("/api/calculations", headers={**headers, **ASYNC}, json={"a": 2, "b": 3, "type": "multiply"})
+    assert resp.status_code == 202
+    assert resp.headers["preference-applied"] == "respond-async"
+    body = resp.json()
+    assert body["status"] == "queued" and body["result"] == 6 and body["provisional_id"]
+    assert "id" not in body
+
+    assert client.app.state.write_behind.flush(timeout=5)
+    rows = client.get("/api/calculations", headers=headers).json()
+    assert [(row["a"], row["result"]) for row in rows] == [(2, 6)]
+    stats = client.get("/api/write-behind", headers=headers).json()
+    assert stats["accepted"] == 1 and stats["flushed"] == 1 and stats["pending"] == 0
+
+
+def test_exact_results_survive_the_buffer(async_app):
+    client, headers = async_app
+    payload = {"a": 1, "b": 3, "type": "divide", "precision": "decimal", "digits": 40}
+    queued = client.post("/api/calculations", headers={**headers, **ASYNC}, json=payload).json()
+    assert client.app.state.write_behind.flush(timeout=5)
+    [stored] = client.get("/api/calculations", headers=headers).json()
+    assert stored["result_exact"] == queued["result_exact"] == "0." + "3" * 40
+
+
+def test_without_the_header_writes_synchronously(async_app):
+    client, headers = async_app
+    resp = client.post("/api/calculations", headers=headers, json={"a": 1, "b": 1, "type": "add"})
+    assert resp.status_code == 200
+    assert isinstance(resp.json()["id"], int)
+
+
+def test_full_buffer_gets_503(async_app):
+    client, headers = async_app
+    client.app.state.write_behind.capacity = 0
+    resp = client.post("/api/calculations", headers={**headers, **ASYNC}, json={"a": 1, "b": 1, "type": "add"})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
+
+
+def test_invalid_input_is_still_rejected_up_front(async_app):
+    client, headers = async_app
+    resp = client.post("/api/calculations", headers={**headers, **ASYNC}, json={"a": 1, "b": 0, "type": "divide"})
+    assert resp.status_code in (400, 422)
+    assert client.app.state.write_behind.stats()["accepted"] == 0
+
+
+def test_disabled_by_default_ignores_the_header(client, auth_headers):
+    assert client.app.state.write_behind is None
+    resp = client.post("/api/calculations", headers={**auth_headers, **ASYNC}, json={"a": 1, "b": 1, "type": "add"})
+    assert resp.status_code == 200
+    assert "preference-applied" not in resp.headers
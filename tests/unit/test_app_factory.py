@@ -0,0 +1,137 @@
+# tests/unit/test_app_factory.py
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+
+from app import db as database
+from app.settings import Settings
+from tests.conftest import signup
+
+
+@pytest.fixture
+def default_url(tmp_path):
+    """Point the process default database at tmp_path for one test."""
+    original = database.DATABASE_URL
+    url = f"sqlite:///{tmp_path / 'factory.db'}"
+    database.configure(url)
+    yield url
+    database.configure(original)
+
+
+def test_create_app_is_lazy(make_app):
+    app = make_app()
+    settings = app.state.settings
+    assert isinstance(app, FastAPI)
+    assert app.state.database.url == settings.database_url
+    # the process default is left alone
+    assert database.DATABASE_URL != settings.database_url
+    # no engine, pool or log file yet
+    assert app.state.database._engine is None
+    assert not os.path.exists(os.path.join(settings.log_dir, "app.log"))
+
+
+def test_lifespan_creates_tables_and_disposes_engine(make_app):
+    app = make_app()
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        assert "calculations" in inspect(app.state.database.get_engine()).get_table_names()
+    assert app.state.database._engine is None
+
+
+def test_two_apps_keep_their_own_databases(make_app, tmp_path):
+    other = make_app(database_url=f"sqlite:///{tmp_path / 'other.db'}")
+    app = make_app()
+    with TestClient(app) as client, TestClient(other) as other_client:
+        assert client.get("/api/users/me", headers=signup(client, "alice")).status_code == 200
+        assert other_client.get("/api/users/me", headers=signup(other_client, "alice")).status_code == 200
+        with app.state.database.get_engine().connect() as conn:
+            assert conn.execute(text("select count(*) from users")).scalar() == 1
+    # nor coalesce each other's statistics
+    assert app.state.statistics_flight is not other.state.statistics_flight
+
+
+def test_each_app_logs_to_its_own_log_dir(make_app, tmp_path):
+    import logging
+
+    make_app()
+    make_app(log_dir=str(tmp_path / "other-logs"))
+    make_app(log_dir=str(tmp_path / "other-logs"))
+    files = [
+        h.baseFilename for h in logging.getLogger().handlers
+        if isinstance(h, logging.FileHandler) and h.baseFilename.startswith(str(tmp_path))
+    ]
+    assert sorted(files) == sorted(str(tmp_path / d / "app.log") for d in ("logs", "other-logs"))
+    logging.getLogger("fastapi_calculator").info("hello")
+    for name in files:
+        with open(name) as f:
+            assert "hello" in f.read()
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://u:p@db/app")
+    monkeypatch.setenv("LOG_DIR", "/tmp/calc-logs")
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "false")
+    settings = Settings.from_env()
+    assert settings.database_url == "postgresql://u:p@db/app"
+    assert settings.log_dir == "/tmp/calc-logs"
+    assert settings.rate_limit is False
+
+    monkeypatch.delenv("DATABASE_URL")
+    assert Settings.from_env().database_url == "sqlite:///./app.db"
+
+
+def test_engine_attribute_is_the_process_engine(default_url):
+    assert database.engine is database.get_engine()
+    with pytest.raises(AttributeError):
+        database.no_such_attribute
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_no_connections_are_shared_across_fork(default_url):
+    parent_engine = database.get_engine()
+    parent_conn = parent_engine.connect()
+    parent_dbapi = parent_conn.connection.dbapi_connection
+    parent_conn.close()  # back to the pool, where a child could pick it up
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        code = 1
+        try:
+            child_engine = database.get_engine()
+            with child_engine.connect() as conn:
+                conn.execute(text("select 1"))
+                shared = conn.connection.dbapi_connection is parent_dbapi
+            code = 0 if child_engine is not parent_engine and not shared else 2
+        finally:
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    # the child did not close the parent's pooled connection either
+    with parent_engine.connect() as conn:
+        assert conn.connection.dbapi_connection is parent_dbapi
+        assert conn.execute(text("select 1")).scalar() == 1
+
+
+def test_verify_mode_refuses_to_serve_an_old_schema(make_app):
+    from app.migrations import SchemaOutOfDate
+
+    app = make_app(schema_check="verify")
+    with pytest.raises(SchemaOutOfDate):
+        with TestClient(app):
+            pass
+
+
+def test_off_mode_does_not_touch_the_database(make_app):
+    app = make_app(schema_check="off")
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+    assert not os.path.exists(app.state.settings.database_url.replace("sqlite:///", ""))
+
+
+def test_unknown_schema_check_mode(make_app):
+    with pytest.raises(ValueError, match="SCHEMA_CHECK"):
+        make_app(schema_check="sometimes")
@@ -1,8 +1,10 @@
 # tests/unit/test_calculation_factory.py
+import time
+
 import pytest
 
 from app.models import CalculationType
-from app.calculation_factory import CalculationFactory
+from app.calculation_factory import CalculationFactory, CPUBudget, EvaluationBudgetExceeded, check_cost
 
 
 @pytest.mark.parametrize(
@@ -74,3 +76,58 @@ def test_log_base_validation():
     with pytest.raises(ValueError, match="cannot be 1"):
         op.compute(8, 1)
 
+
+
+@pytest.mark.parametrize(
+    "calc_type,a,b",
+    [
+        (CalculationType.POWER, 10, 10_000_000),
+        (CalculationType.POWER, 10.0, 1e7),
+        (CalculationType.POWER, 0.5, -2000),
+        (CalculationType.NTH_ROOT, 10, 0.001),
+    ],
+)
+def test_guard_rejects_huge_results_before_computing(calc_type, a, b):
+    op = CalculationFactory.get_operation(calc_type)
+    start = time.process_time()
+    with pytest.raises(OverflowError, match="too large"):
+        op.compute(a, b)
+    assert time.process_time() - start < 0.1
+
+
+def test_guard_allows_results_in_float_range():
+    op = CalculationFactory.get_operation(CalculationType.POWER)
+    assert op.compute(10, 300) == 10 ** 300
+    assert op.compute(1, 10 ** 12) == 1
+    assert op.compute(0.1, 400) == 0.1 ** 400  # underflows to 0.0, cheaply
+    assert CalculationFactory.get_operation(CalculationType.NTH_ROOT).compute(10, 0.01) == pytest.approx(1e100)
+
+
+def test_power_negative_base_fractional_exponent():
+    op = CalculationFactory.get_operation(CalculationType.POWER)
+    with pytest.raises(ValueError, match="integer exponent"):
+        op.compute(-8, 0.5)
+    assert op.compute(-2, 3) == -8
+
+
+def test_nth_root_negative_radicand_fractional_index():
+    op = CalculationFactory.get_operation(CalculationType.NTH_ROOT)
+    with pytest.raises(ValueError, match="fractional root"):
+        op.compute(-8, 2.5)
+    assert op.compute(-8, 3) == pytest.approx(-2)
+
+
+def test_check_cost_without_guard_is_noop():
+    check_cost(CalculationType.ADD, 1e308, 1e308)
+    with pytest.raises(OverflowError):
+        check_cost(CalculationType.POWER, 10, 1000)
+
+
+def test_cpu_budget():
+    CPUBudget(seconds=10).check()
+    budget = CPUBudget(seconds=0)
+    deadline = time.thread_time() + 0.01
+    while time.thread_time() <= deadline:
+        pass
+    with pytest.raises(EvaluationBudgetExceeded, match="CPU budget"):
+        budget.check()
@@ -0,0 +1,123 @@
+# tests/unit/test_compression.py
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import (
+    CompressionMiddleware,
+    get_encoder,
+    negotiate_encoding,
+    parse_accept_encoding,
+)
+
+
+def _make_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, encodings=("gzip",))
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse("x" * 5000)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/stream")
+    def stream():
+        def chunks():
+            for i in range(5):
+                yield f"chunk-{i}-" * 100
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"0" * 5000, media_type="image/png")
+
+    @app.get("/encoded")
+    def encoded():
+        body = gzip.compress(b"y" * 5000)
+        return Response(body, media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    return app
+
+
+@pytest.fixture
+def compress_client():
+    return TestClient(_make_app())
+
+
+def test_parse_accept_encoding_with_q_values():
+    parsed = parse_accept_encoding("gzip;q=0.5, br, zstd;q=0")
+    assert parsed == {"gzip": 0.5, "br": 1.0, "zstd": 0.0}
+
+
+def test_negotiate_prefers_server_order_on_ties():
+    assert negotiate_encoding("gzip, br, zstd", ("zstd", "br", "gzip")) == "zstd"
+    assert negotiate_encoding("gzip, br", ("zstd", "br", "gzip")) == "br"
+
+
+def test_negotiate_respects_q_and_identity():
+    assert negotiate_encoding("gzip;q=1, br;q=0.2", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("identity", ("br", "gzip")) is None
+    assert negotiate_encoding("*", ("gzip",)) == "gzip"
+    assert negotiate_encoding("gzip;q=0", ("gzip",)) is None
+
+
+def test_gzip_encoder_roundtrip_streaming():
+    enc = get_encoder("gzip")
+    data = enc.compress(b"hello ") + enc.finish(b"world")
+    assert gzip.decompress(data) == b"hello world"
+
+
+def test_unsupported_encoder_raises():
+    with pytest.raises(ValueError):
+        get_encoder("lzma")
+
+
+def test_large_response_is_compressed(compress_client):
+    resp = compress_client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert int(resp.headers["content-length"]) < 5000
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert resp.text == "x" * 5000
+
+
+def test_small_response_below_threshold_not_compressed(compress_client):
+    resp = compress_client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.text == "tiny"
+
+
+def test_no_accept_encoding_passes_through(compress_client):
+    resp = compress_client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.text == "x" * 5000
+
+
+def test_streaming_response_is_compressed(compress_client):
+    resp = compress_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "content-length" not in resp.headers
+    assert resp.text == "".join(f"chunk-{i}-" * 100 for i in range(5))
+
+
+def test_already_compressed_content_is_bypassed(compress_client):
+    resp = compress_client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+
+    resp = compress_client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.text == "y" * 5000
+
+
+def test_app_compresses_calculations_page(client):
+    resp = client.get("/calculations", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Calculations (BREAD)" in resp.text
@@ -0,0 +1,154 @@
+# tests/unit/test_expression_engine.py
+import math
+
+import pytest
+
+from app.calculation_factory import CPUBudget, EvaluationBudgetExceeded
+from app.expression_engine import (
+    Call,
+    ExpressionCache,
+    MAX_DEPTH,
+    ExpressionError,
+    Num,
+    Var,
+    canonicalize,
+    compile_expression,
+    evaluate,
+    parse,
+)
+from app.models import CalculationType
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("1 + 2 * 3", 7),
+        ("(1 + 2) * 3", 9),
+        ("2 ^ 3 ^ 2", 512),
+        ("-2 ^ 2", -4),
+        ("2 ^ -1", 0.5),
+        ("10 % 4 + 1", 3),
+        ("8 / 4 / 2", 1),
+        ("1.5e2 - .5", 149.5),
+        ("+3 - -3", 6),
+        ("percent_of(200, 15)", 30),
+        ("nth_root(27, 3) + log_base(8, 2)", 6),
+        ("modulus(17, 5) * power(2, 3)", 16),
+    ],
+)
+def test_evaluate_constants(text, expected):
+    assert math.isclose(evaluate(text), expected)
+
+
+def test_evaluate_with_variables():
+    compiled = compile_expression("(a + b) ^ c / d")
+    assert compiled.variables == ("a", "b", "c", "d")
+    assert compiled.evaluate({"a": 1, "b": 2, "c": 2, "d": 3}) == 3.0
+    assert compiled.evaluate_many([{"a": 1, "b": 1, "c": 3, "d": 2}, {"a": 0, "b": 4, "c": 0.5, "d": 1}]) == [4.0, 2.0]
+
+
+def test_parse_builds_calls_on_calculation_types():
+    assert parse("x * 2") == Call(CalculationType.MULTIPLY, (Var("x"), Num(2.0)))
+
+
+def test_compile_is_cached():
+    assert compile_expression("a + 1") is compile_expression("a + 1")
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "1 +", "(1 + 2", "1 2", "foo(1, 2)", "power(1)", "1 $ 2", ")"],
+)
+def test_malformed_expressions_raise(text):
+    with pytest.raises(ExpressionError):
+        compile_expression(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["(" * 300 + "1" + ")" * 300, "-" * 999 + "1", "2^" * 300 + "2", "power(" * 200 + "x" + ", 2)" * 200],
+)
+def test_deep_nesting_is_rejected(text):
+    with pytest.raises(ExpressionError, match="nested"):
+        parse(text)
+
+
+def test_nesting_up_to_the_limit_is_accepted():
+    depth = MAX_DEPTH - 1
+    assert evaluate("(" * depth + "1" + ")" * depth) == 1
+    assert evaluate("-" * depth + "1") == -1
+
+
+def test_missing_variable_raises():
+    with pytest.raises(ExpressionError):
+        evaluate("x + 1", {})
+
+
+def test_operation_errors_propagate():
+    with pytest.raises(ZeroDivisionError):
+        evaluate("1 / (a - a)", {"a": 3})
+    with pytest.raises(ValueError):
+        evaluate("log_base(-1, 2)")
+
+
+def test_equivalent_spellings_share_cache_entry():
+    assert compile_expression("q + r") is compile_expression("r + q")
+    assert compile_expression("q*r") is compile_expression("r * q")
+    # Non-commutative operators keep their order
+    assert compile_expression("q - r") is not compile_expression("r - q")
+
+
+def test_constant_folding():
+    assert canonicalize(parse("x * (2 + 3)")) == canonicalize(parse("5 * x"))
+    assert canonicalize(parse("--x")) == Var("x")
+    assert canonicalize(parse("-(2 ^ 2)")) == Num(-4.0)
+    # Folding never hides an error; it surfaces at evaluation time
+    assert canonicalize(parse("1 / 0")) == Call(CalculationType.DIVIDE, (Num(1.0), Num(0.0)))
+    with pytest.raises(ZeroDivisionError):
+        evaluate("1 / 0")
+
+
+def test_long_sums_are_canonicalized_without_recursion():
+    terms = [f"v{i % 7}" for i in range(5000)]
+    compiled = compile_expression(" + ".join(terms))
+    assert compile_expression(" + ".join(["v1", "v0"] + terms[2:])) is compiled
+    assert compiled.evaluate({f"v{i}": 1 for i in range(7)}) == 5000
+
+
+def test_common_subexpressions_computed_once():
+    compiled = compile_expression("log_base(x, 2) * 3 + log_base(x, 2)")
+    assert compiled.source.count("_op_log_base(") == 1
+    assert compiled.evaluate({"x": 8}) == 12.0
+
+
+def test_cache_is_bounded_and_reports_stats():
+    cache = ExpressionCache(maxsize=2)
+    first = cache.get("a + 1")
+    assert cache.get("a + 1") is first
+    assert cache.get("1 + a") is first
+    cache.get("a + 2")
+    cache.get("a + 3")
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["maxsize"] == 2
+    assert stats["hits"] == 2
+    assert stats["normalized_hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+
+    cache.clear()
+    assert cache.stats()["size"] == 0
+
+
+def test_evaluate_many_checks_budget():
+    compiled = compile_expression("x ^ 2")
+    assert compiled.evaluate_many([{"x": 2}, {"x": 3}], budget=CPUBudget(seconds=10)) == [4.0, 9.0]
+    with pytest.raises(EvaluationBudgetExceeded):
+        compiled.evaluate_many(({"x": i} for i in range(10 ** 7)), budget=CPUBudget(seconds=0.01))
+
+
+def test_guarded_power_is_not_folded():
+    assert canonicalize(parse("10 ^ 1000")) == Call(CalculationType.POWER, (Num(10.0), Num(1000.0)))
+    with pytest.raises(OverflowError, match="too large"):
+        evaluate("10 ^ 1000")
@@ -0,0 +1,48 @@
+# tests/unit/test_gunicorn_conf.py
+import gc
+import runpy
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+CONF = str(Path(__file__).resolve().parents[2] / "gunicorn.conf.py")
+
+
+def load(monkeypatch, **env):
+    for key in ("WEB_CONCURRENCY", "BIND", "PORT"):
+        monkeypatch.delenv(key, raising=False)
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    return runpy.run_path(CONF)
+
+
+def test_workers_default_to_cpu_count(monkeypatch):
+    with patch("multiprocessing.cpu_count", return_value=6):
+        conf = load(monkeypatch)
+    assert conf["workers"] == 6
+    assert conf["bind"] == "0.0.0.0:8000"
+    assert conf["preload_app"] is True
+    assert conf["worker_class"] == "uvicorn_worker.UvicornWorker"
+
+
+def test_web_concurrency_overrides(monkeypatch):
+    conf = load(monkeypatch, WEB_CONCURRENCY="3", PORT="9000")
+    assert conf["workers"] == 3
+    assert conf["bind"] == "0.0.0.0:9000"
+
+
+def test_post_fork_gives_worker_a_fresh_pool(monkeypatch):
+    conf = load(monkeypatch)
+    server = MagicMock()
+    with patch("app.db.dispose_engine") as dispose_engine:
+        conf["post_fork"](server, None)
+    dispose_engine.assert_called_once_with(close=False)
+    server.app.wsgi().state.database.dispose.assert_called_once_with(close=False)
+
+
+def test_when_ready_freezes_gc(monkeypatch):
+    conf = load(monkeypatch)
+    try:
+        conf["when_ready"](None)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
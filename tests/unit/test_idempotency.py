@@ -0,0 +1,85 @@
+# tests/unit/test_idempotency.py
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore, StoredResponse
+from app.security import create_access_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_store_expires_entries_after_the_ttl():
+    clock = FakeClock()
+    store = IdempotencyStore(ttl=60, clock=clock)
+    entry, leader = store.begin("k", "f")
+    assert leader
+    store.finish("k", entry, StoredResponse(200, [], b"{}"))
+    assert store.begin("k", "f") == (entry, False)
+    clock.now = 61
+    assert store.begin("k", "f")[1]
+
+
+def test_store_evicts_the_least_recently_used_finished_entry():
+    store = IdempotencyStore(max_keys=2)
+    for key in ("a", "b"):
+        entry, _ = store.begin(key, "f")
+        store.finish(key, entry, StoredResponse(200, [], b""))
+    store.begin("a", "f")  # touch a
+    store.begin("c", "f")  # in flight: never evicted
+    assert store.begin("a", "f")[1] is False
+    assert store.begin("b", "f")[1] is True
+    assert store.evictions >= 1
+
+
+def test_forgotten_entries_can_run_again():
+    store = IdempotencyStore()
+    entry, _ = store.begin("k", "f")
+    store.finish("k", entry, None)
+    assert entry.done.is_set()
+    assert store.begin("k", "f")[1]
+
+
+def _app(statuses):
+    calls = []
+
+    async def create(request: Request):
+        calls.append(await request.json())
+        return JSONResponse({"n": len(calls)}, status_code=statuses[min(len(calls), len(statuses)) - 1])
+
+    app = Starlette(routes=[Route("/api/calculations", create, methods=["POST"])])
+    app.add_middleware(IdempotencyMiddleware, store=IdempotencyStore())
+    return TestClient(app), calls
+
+
+def _headers(key="k", user_id=1):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}", "Idempotency-Key": key}
+
+
+def test_server_errors_are_not_stored():
+    client, calls = _app([500, 200])
+    assert client.post("/api/calculations", headers=_headers(), json={"a": 1}).status_code == 500
+    retried = client.post("/api/calculations", headers=_headers(), json={"a": 1})
+    assert retried.status_code == 200 and "idempotent-replayed" not in retried.headers
+    assert len(calls) == 2
+
+
+def test_key_length_is_checked():
+    client, calls = _app([200])
+    assert client.post("/api/calculations", headers=_headers(key="x" * 256), json={}).status_code == 400
+    assert calls == []
+
+
+def test_anonymous_requests_pass_through():
+    client, calls = _app([200])
+    for _ in range(2):
+        client.post("/api/calculations", headers={"Idempotency-Key": "k"}, json={})
+    assert len(calls) == 2
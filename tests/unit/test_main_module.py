@@ -50,7 +50,9 @@ def test_custom_openapi_builds_and_is_idempotent():
     assert schema2 is schema
 
 
-def test_on_startup_callable():
+def test_on_startup_callable(tmp_path):
     # Call the on_startup handler directly to cover its logic
     # It should run without raising
-    main_module.on_startup()
+    from app.db import Database
+
+    main_module.on_startup(db=Database(f"sqlite:///{tmp_path / 'startup.db'}"))
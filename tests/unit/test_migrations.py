@@ -0,0 +1,151 @@
+# tests/unit/test_migrations.py
+import multiprocessing
+import os
+from pathlib import Path
+
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import Base
+from app.migrations import (
+    HEAD_REVISION,
+    OPTIONAL_REVISIONS,
+    SchemaOutOfDate,
+    current_revision,
+    is_current,
+    main,
+    missing_from_schema,
+    upgrade,
+    verify,
+)
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _config():
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    config.attributes["configure_logger"] = False  # keep pytest's logging
+    return config
+
+
+def test_head_revision_matches_alembic_versions():
+    script = ScriptDirectory.from_config(_config())
+    assert script.get_revision("main@head").revision == HEAD_REVISION
+    assert set(script.get_heads()) == {HEAD_REVISION} | set(OPTIONAL_REVISIONS)
+    for optional, needs in OPTIONAL_REVISIONS.items():
+        assert script.get_revision(optional).dependencies == needs
+
+
+def test_partitioning_is_an_opt_in_branch(tmp_path):
+    from alembic import command
+
+    engine = _engine(tmp_path)
+    assert upgrade(engine) is True
+    assert "3f8a6c2e9b17" not in _stamped(engine)
+
+    config = _config()
+    config.set_main_option("sqlalchemy.url", str(engine.url))
+    command.upgrade(config, "partitioning@head")
+    # Alembic records only the branch head, which depends on HEAD_REVISION
+    assert _stamped(engine) == {"3f8a6c2e9b17"}
+    # the optional branch does not change what verify and upgrade see
+    assert current_revision(engine) == HEAD_REVISION
+    verify(engine)
+    assert upgrade(engine) is False
+
+
+def _stamped(engine):
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+
+def test_current_revision(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'm.db'}")
+    assert current_revision(engine) is None
+    assert not is_current(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        conn.execute(text("INSERT INTO alembic_version VALUES ('b01b1ad235d4')"))
+    assert current_revision(engine) == "b01b1ad235d4"
+    assert not is_current(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE alembic_version SET version_num = :v"), {"v": HEAD_REVISION})
+    assert is_current(engine)
+
+
+def _engine(tmp_path, name="m.db"):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def test_verify(tmp_path):
+    engine = _engine(tmp_path)
+    with pytest.raises(SchemaOutOfDate, match="no revision"):
+        verify(engine)
+
+
+def test_upgrade_migrates_once(tmp_path):
+    engine = _engine(tmp_path)
+    assert upgrade(engine) is True
+    assert is_current(engine)
+    assert {"users", "calculations"} <= set(inspect(engine).get_table_names())
+    assert upgrade(engine) is False
+    verify(engine)
+
+
+def test_upgrade_stamps_a_create_all_database(tmp_path):
+    engine = _engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    assert current_revision(engine) is None
+    assert missing_from_schema(engine) == []
+    assert upgrade(engine) is True
+    assert current_revision(engine) == HEAD_REVISION
+    assert upgrade(engine) is False
+
+
+def test_upgrade_refuses_an_unstamped_schema_it_cannot_place(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50))"))
+    with pytest.raises(SchemaOutOfDate, match="alembic stamp"):
+        upgrade(engine)
+    assert "users.email" in missing_from_schema(engine)
+    assert current_revision(engine) is None
+
+
+def _upgrade_in_child(url, results):
+    results.put(upgrade(create_engine(url)))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_parallel_upgrades_do_not_race(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    url = f"sqlite:///{tmp_path / 'parallel.db'}"
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_upgrade_in_child, args=(url, results)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert [p.exitcode for p in procs] == [0, 0, 0]
+    assert sorted(results.get(timeout=5) for _ in procs) == [False, False, True]
+    assert is_current(create_engine(url))
+
+
+def test_cli(tmp_path, monkeypatch, capsys):
+    from app import db as database
+
+    original = database.DATABASE_URL
+    database.configure(f"sqlite:///{tmp_path / 'cli.db'}")
+    try:
+        assert main(["check"]) == 1
+        assert main(["upgrade"]) == 0
+        assert main(["check"]) == 0
+        assert main(["bogus"]) == 2
+    finally:
+        database.configure(original)
+    assert "Migrated to" in capsys.readouterr().out
@@ -0,0 +1,46 @@
+# tests/unit/test_partitioning.py
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from app.migrations import upgrade
+from app.partitioning import is_partitioned, main, missing_remainders, parse_bound, partition_name
+
+
+def test_parse_bound():
+    assert parse_bound("FOR VALUES WITH (modulus 16, remainder 3)") == (16, 3)
+    with pytest.raises(ValueError):
+        parse_bound("FOR VALUES FROM (1) TO (10)")
+
+
+def test_missing_remainders():
+    assert missing_remainders([], 4) == [0, 1, 2, 3]
+    assert missing_remainders([(4, r) for r in range(4)], 4) == []
+    # (16, 3) was split into (32, 3) and (32, 19); both moduli coexist
+    after_split = [(16, r) for r in range(16) if r != 3] + [(32, 3), (32, 19)]
+    assert missing_remainders(after_split, 32) == []
+    assert missing_remainders([(16, r) for r in range(16) if r != 3] + [(32, 3)], 32) == [19]
+
+
+def test_partition_name():
+    assert partition_name(16, 3) == "calculations_m16_r3"
+
+
+def test_migration_is_a_no_op_on_sqlite(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'p.db'}")
+    assert upgrade(engine) is True
+    with engine.connect() as conn:
+        assert not is_partitioned(conn)
+    assert {"calculations"} <= set(inspect(engine).get_table_names())
+    assert not any(name.startswith("calculations_") for name in inspect(engine).get_table_names())
+
+
+def test_cli_refuses_an_unpartitioned_table(tmp_path, capsys):
+    from app import db as database
+
+    original = database.DATABASE_URL
+    database.configure(f"sqlite:///{tmp_path / 'cli.db'}")
+    try:
+        assert main(["status"]) == 1
+    finally:
+        database.configure(original)
+    assert "run `alembic upgrade partitioning@head`" in capsys.readouterr().err
@@ -0,0 +1,109 @@
+# tests/unit/test_precision.py
+from decimal import Decimal
+
+import pytest
+
+from app.models import CalculationType
+from app.precision import PrecisionMode, compute, format_exact, to_decimal, to_fraction
+
+
+DECIMAL = PrecisionMode.DECIMAL
+RATIONAL = PrecisionMode.RATIONAL
+
+
+def test_float_mode_matches_factory():
+    assert compute(CalculationType.ADD, 0.1, 0.2) == (0.1 + 0.2, None)
+
+
+def test_inputs_convert_through_shortest_repr():
+    assert to_decimal(0.1) == Decimal("0.1")
+    assert to_fraction(0.1).denominator == 10
+
+
+@pytest.mark.parametrize("mode", [DECIMAL, RATIONAL])
+def test_exact_addition(mode):
+    result, exact = compute(CalculationType.ADD, 0.1, 0.2, mode)
+    assert exact == Decimal("0.3")
+    assert result == 0.3
+
+
+@pytest.mark.parametrize(
+    "calc_type,a,b,expected",
+    [
+        (CalculationType.SUBTRACT, 1.1, 0.3, "0.8"),
+        (CalculationType.MULTIPLY, 1.1, 1.1, "1.21"),
+        (CalculationType.DIVIDE, 1, 8, "0.125"),
+        (CalculationType.PERCENT_OF, 19.99, 15, "2.9985"),
+        (CalculationType.MODULUS, -7, 3, "2"),
+        (CalculationType.MODULUS, 7, -3, "-2"),
+        (CalculationType.POWER, 1.1, 3, "1.331"),
+        (CalculationType.POWER, 2, -2, "0.25"),
+        (CalculationType.NTH_ROOT, 27, 3, "3"),
+        (CalculationType.NTH_ROOT, -32, 5, "-2"),
+        (CalculationType.LOG_BASE, 8, 2, "3"),
+        (CalculationType.LOG_BASE, 1000, 10, "3"),
+    ],
+)
+@pytest.mark.parametrize("mode", [DECIMAL, RATIONAL])
+def test_exact_results(mode, calc_type, a, b, expected):
+    _, exact = compute(calc_type, a, b, mode)
+    assert exact == Decimal(expected)
+
+
+def test_digits_controls_significant_digits():
+    _, exact = compute(CalculationType.DIVIDE, 1, 3, DECIMAL, digits=5)
+    assert exact == Decimal("0.33333")
+    _, exact = compute(CalculationType.DIVIDE, 2, 3, RATIONAL, digits=50)
+    assert format_exact(exact) == "0." + "6" * 49 + "7"
+
+
+def test_irrational_results_are_correctly_rounded():
+    _, exact = compute(CalculationType.NTH_ROOT, 2, 2, DECIMAL, digits=30)
+    assert format_exact(exact) == "1.41421356237309504880168872421"
+    _, exact = compute(CalculationType.POWER, 2, 0.5, RATIONAL, digits=30)
+    assert format_exact(exact) == "1.41421356237309504880168872421"
+
+
+@pytest.mark.parametrize("mode", [DECIMAL, RATIONAL])
+@pytest.mark.parametrize(
+    "calc_type,a,b,error",
+    [
+        (CalculationType.DIVIDE, 1, 0, ZeroDivisionError),
+        (CalculationType.MODULUS, 1, 0, ZeroDivisionError),
+        (CalculationType.POWER, 0, -1, ZeroDivisionError),
+        (CalculationType.POWER, -8, 0.5, ValueError),
+        (CalculationType.NTH_ROOT, -16, 4, ValueError),
+        (CalculationType.NTH_ROOT, 4, 0, ValueError),
+        (CalculationType.LOG_BASE, -1, 2, ValueError),
+        (CalculationType.LOG_BASE, 2, 1, ValueError),
+        (CalculationType.POWER, 10, 400, OverflowError),
+    ],
+)
+def test_exact_mode_errors(mode, calc_type, a, b, error):
+    with pytest.raises(error):
+        compute(calc_type, a, b, mode)
+
+
+@pytest.mark.parametrize("mode", [DECIMAL, RATIONAL])
+def test_huge_exponents_are_guarded(mode):
+    with pytest.raises(OverflowError, match="too large"):
+        compute(CalculationType.POWER, 10, 1e7, mode)
+    with pytest.raises(OverflowError, match="too large"):
+        compute(CalculationType.NTH_ROOT, 10, 0.001, mode)
+    with pytest.raises(OverflowError, match=r"\(about 10\^3e\+302\)$"):
+        compute(CalculationType.NTH_ROOT, 1e300, 1e-300, mode)
+
+
+def test_large_rational_power_falls_back_to_decimal():
+    # The exact fraction would have millions of digits; the rounded result is the same
+    _, rational = compute(CalculationType.POWER, 1.0001, 1e6, RATIONAL)
+    _, decimal = compute(CalculationType.POWER, 1.0001, 1e6, DECIMAL)
+    assert rational == decimal
+    assert str(rational).startswith("2.674710993142140172948354482E+43")
+
+
+@pytest.mark.parametrize("mode", [DECIMAL, RATIONAL])
+def test_underflow_stores_plain_zero(mode):
+    result, exact = compute(CalculationType.POWER, 0.1, 1e7, mode)
+    assert result == 0.0
+    assert format_exact(exact) == "0"
@@ -0,0 +1,89 @@
+# tests/unit/test_profiling.py
+import asyncio
+import threading
+import time
+
+from app.main import app
+from app.profiling import ProfilingMiddleware, RequestProfile, SamplingProfiler, _request_profile, profiled
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(200))
+
+
+def test_sampling_profiler_collapses_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        profiler = SamplingProfiler(interval=0.001).run(0.05)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 0
+    lines = profiler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy;")]
+    assert busy and all("busy_loop (" in line for line in busy)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    # the sampling thread itself is left out
+    assert not any("SamplingProfiler.run" in line or "run (" in line.split(";")[-1] for line in busy)
+
+
+def test_profiled_only_profiles_when_requested():
+    calls = []
+    wrapped = profiled(lambda x: calls.append(x) or x * 2)
+    assert wrapped(2) == 4
+
+    profile = RequestProfile()
+    token = _request_profile.set(profile)
+    try:
+        assert wrapped(3) == 6
+    finally:
+        _request_profile.reset(token)
+    assert profile.ran
+    assert "function calls" in profile.report()
+    assert calls == [2, 3]
+
+
+def test_profiled_keeps_async_endpoints_async():
+    async def endpoint():
+        return "ok"
+
+    wrapped = profiled(endpoint)
+    assert asyncio.iscoroutinefunction(wrapped)
+    assert asyncio.run(wrapped()) == "ok"
+
+
+def test_report_when_endpoint_never_ran():
+    assert "did not run" in RequestProfile().report()
+
+
+def test_disabled_by_default_installs_nothing():
+    # The default app (PROFILING_ENABLED unset) has no profiling middleware
+    # and no admin routes; only the endpoint wrapper below remains.
+    assert not app.state.settings.profiling
+    assert not any(m.cls is ProfilingMiddleware for m in app.user_middleware)
+    assert "/api/admin/profile" not in app.openapi()["paths"]
+
+
+def test_wrapper_overhead_is_small_when_not_triggered():
+    def endpoint(a, b):
+        return a + b
+
+    wrapped = profiled(endpoint)
+    n = 20000
+
+    def timed(fn):
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(n):
+                fn(1, 2)
+            best = min(best, time.perf_counter() - start)
+        return best / n
+
+    # One context variable lookup per call; generous bound for slow CI
+    assert timed(wrapped) - timed(endpoint) < 2e-6
@@ -0,0 +1,167 @@
+# tests/unit/test_rate_limit.py
+import threading
+
+import pytest
+from starlette.datastructures import Headers
+
+from app.rate_limit import (
+    MemoryStore,
+    RateLimit,
+    RateLimitMiddleware,
+    Rule,
+    SQLStore,
+    build_store,
+    client_key,
+    default_rules,
+    parse_limit,
+    parse_proxies,
+    rate_limit_enabled,
+)
+from app.security import create_access_token
+
+LIMIT = RateLimit("test", burst=3, period=3)  # 1 token per second
+
+
+@pytest.mark.parametrize(
+    "text,burst,period",
+    [("100/minute", 100, 60), ("5/second", 5, 1), ("20/10seconds", 20, 10), ("1000 / day", 1000, 86400)],
+)
+def test_parse_limit(text, burst, period):
+    limit = parse_limit("x", text)
+    assert (limit.burst, limit.period) == (burst, period)
+
+
+@pytest.mark.parametrize("text", ["", "10", "ten/minute", "10/fortnight"])
+def test_parse_limit_invalid(text):
+    with pytest.raises(ValueError):
+        parse_limit("x", text)
+
+
+@pytest.fixture(params=["memory", "sql"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore(shards=4)
+    return SQLStore.from_url(f"sqlite:///{tmp_path / 'buckets.db'}")
+
+
+def test_bucket_allows_burst_then_refills(store):
+    decisions = [store.consume("k", LIMIT, now=100.0) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions] == [2, 1, 0, 0]
+    assert decisions[-1].retry_after == pytest.approx(1.0)
+    assert decisions[-1].reset == pytest.approx(3.0)
+
+    assert store.consume("k", LIMIT, now=101.0).allowed
+    assert not store.consume("k", LIMIT, now=101.5).allowed
+    # refill is capped at the burst size
+    assert store.consume("k", LIMIT, now=1000.0).remaining == 2
+
+
+def test_buckets_are_per_key(store):
+    for _ in range(3):
+        store.consume("greedy", LIMIT, now=0.0)
+    assert not store.consume("greedy", LIMIT, now=0.0).allowed
+    assert store.consume("polite", LIMIT, now=0.0).allowed
+
+
+def test_concurrent_consumers_never_overdraw(store):
+    limit = RateLimit("burst", burst=50, period=3600)
+    allowed = []
+
+    def worker():
+        for _ in range(20):
+            allowed.append(store.consume("shared", limit, now=0.0).allowed)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert allowed.count(True) == 50
+
+
+def test_memory_store_prunes_full_buckets():
+    store = MemoryStore(shards=1, max_keys_per_shard=10)
+    for i in range(11):
+        store.consume(f"k{i}", LIMIT, now=0.0)
+    store.consume("late", LIMIT, now=100.0)
+    assert list(store._shards[0]) == ["late"]
+
+
+def test_memory_store_prunes_each_bucket_by_its_own_limit():
+    slow = RateLimit("slow", burst=3, period=3600)
+    store = MemoryStore(shards=1, max_keys_per_shard=2)
+    store.consume("slow:a", slow, now=0.0)
+    store.consume("fast:b", LIMIT, now=0.0)
+    # "slow:a" is far from full; pruning under the fast limit would reset it
+    store.consume("fast:c", LIMIT, now=10.0)
+    assert set(store._shards[0]) == {"slow:a", "fast:c"}
+
+
+def test_sql_store_prunes_rows_idle_for_a_full_period(tmp_path):
+    store = SQLStore.from_url(f"sqlite:///{tmp_path / 'prune.db'}")
+    store.consume("test:old", LIMIT, now=1000.0)
+    store.consume("other:old", RateLimit("other", 3, 300), now=1000.0)
+    store.consume("test:new", LIMIT, now=1003.0)  # prunes test:old, idle for a whole period
+    store.consume("test:newer", LIMIT, now=1004.0)  # no prune: one ran less than a period ago
+    store.consume("test:late", LIMIT, now=1006.5)  # prunes test:new
+    with store.engine.connect() as conn:
+        keys = set(conn.execute(store.table.select().with_only_columns(store.table.c.key)).scalars())
+    # the slower "other" limit is pruned on its own schedule
+    assert keys == {"other:old", "test:newer", "test:late"}
+
+
+def test_client_key_prefers_verified_user():
+    scope = {"client": ("10.0.0.1", 1234)}
+    token = create_access_token({"sub": "42"})
+    assert client_key(Headers({"authorization": f"Bearer {token}"}), scope) == "user:42"
+    assert client_key(Headers({"authorization": f"Bearer {token}"}), scope, per_ip=True) == "ip:10.0.0.1"
+    assert client_key(Headers({"authorization": "Bearer forged"}), scope) == "ip:10.0.0.1"
+    assert client_key(Headers({}), {}) == "ip:unknown"
+
+
+def test_forwarded_for_is_only_trusted_from_listed_proxies():
+    proxies = parse_proxies("10.0.0.0/8, 192.168.1.5")
+    headers = Headers({"x-forwarded-for": "1.2.3.4, 5.6.7.8, 192.168.1.5"})
+    assert client_key(headers, {"client": ("10.0.0.1", 1)}, proxies=proxies) == "ip:5.6.7.8"
+    # a client cannot pick its bucket by sending the header itself
+    assert client_key(headers, {"client": ("8.8.8.8", 1)}, proxies=proxies) == "ip:8.8.8.8"
+    assert client_key(headers, {"client": ("10.0.0.1", 1)}) == "ip:10.0.0.1"
+    assert client_key(Headers({}), {"client": ("10.0.0.1", 1)}, proxies=proxies) == "ip:10.0.0.1"
+    assert parse_proxies("") == ()
+
+
+def test_rule_matching():
+    auth = RateLimit("auth", 1, 60)
+    api = RateLimit("api", 10, 60)
+    middleware = RateLimitMiddleware(
+        None, store=MemoryStore(), rules=[Rule(frozenset({"POST"}), "/login", auth, True), Rule(None, "/api/", api)]
+    )
+    assert middleware.match("POST", "/login").limit is auth
+    assert middleware.match("GET", "/login") is None
+    assert middleware.match("GET", "/api/calculations").limit is api
+    assert middleware.match("GET", "/static/app.js") is None
+
+
+def test_anonymous_signup_is_limited_per_ip():
+    middleware = RateLimitMiddleware(None, store=MemoryStore(), rules=default_rules(), trusted_proxies=())
+    for path in ("/api/users", "/api/users/register", "/api/users/login", "/register", "/login"):
+        assert middleware.match("POST", path).limit.name == "auth", path
+    assert middleware.match("POST", "/api/users/change-password").limit.name == "api"
+    assert middleware.match("GET", "/api/users/me").limit.name == "api"
+
+
+def test_defaults_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("RATE_LIMIT_API", "50/second")
+    monkeypatch.delenv("RATE_LIMIT_AUTH", raising=False)
+    rules = default_rules()
+    assert rules[-1].limit == RateLimit("api", 50, 1)
+    assert rules[0].limit == RateLimit("auth", 10, 60) and rules[0].per_ip
+
+    monkeypatch.delenv("RATE_LIMIT_STORE_URL", raising=False)
+    assert isinstance(build_store(), MemoryStore)
+    assert isinstance(build_store(f"sqlite:///{tmp_path / 'b.db'}"), SQLStore)
+
+    for value, expected in [("true", True), ("FALSE", False), ("0", False), ("1", True)]:
+        monkeypatch.setenv("RATE_LIMIT_ENABLED", value)
+        assert rate_limit_enabled() is expected
@@ -0,0 +1,66 @@
+# tests/unit/test_read_replica.py
+from sqlalchemy import create_engine
+
+from app.read_replica import RecentWriters, ReplicaMonitor, replica_lag
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_recent_writers_window():
+    clock = FakeClock()
+    writers = RecentWriters(window=10, clock=clock)
+    writers.mark(1)
+    assert writers.is_recent(1)
+    assert not writers.is_recent(2)
+    clock.now += 10.5
+    assert not writers.is_recent(1)
+
+
+def test_recent_writers_prunes_expired_entries():
+    clock = FakeClock()
+    writers = RecentWriters(window=1, clock=clock)
+    writers.PRUNE_ABOVE = 3
+    for user_id in range(3):
+        writers.mark(user_id)
+    clock.now += 5
+    writers.mark(99)
+    writers.mark(100)
+    assert set(writers._until) == {99, 100}
+
+
+def test_monitor_caches_the_probe_for_an_interval():
+    clock = FakeClock()
+    lags = iter([0.5, 30.0])
+    calls = []
+
+    def probe(engine):
+        calls.append(engine)
+        return next(lags)
+
+    monitor = ReplicaMonitor(max_lag=5, interval=1, probe=probe, clock=clock)
+    assert monitor.usable("engine")
+    assert monitor.usable("engine")
+    assert len(calls) == 1
+
+    clock.now += 1
+    assert not monitor.usable("engine")
+    assert monitor.lag == 30.0
+
+
+def test_monitor_treats_probe_errors_as_unusable():
+    def probe(engine):
+        raise OSError("connection refused")
+
+    monitor = ReplicaMonitor(probe=probe, clock=FakeClock())
+    assert not monitor.usable("engine")
+    assert monitor.lag is None
+
+
+def test_replica_lag_is_zero_without_replication(tmp_path):
+    assert replica_lag(create_engine(f"sqlite:///{tmp_path / 'r.db'}")) == 0.0
@@ -0,0 +1,32 @@
+# tests/unit/test_responses.py
+import json
+
+from app import responses
+from app.models import CalculationType
+from app.responses import ORJSONResponse, dumps, render_rows, rows_response
+
+
+def test_dumps_matches_stdlib_json():
+    data = {"a": 1.5, "b": [1, 2, None], "name": "ünï", 3: "int key"}
+    assert json.loads(dumps(data)) == {"a": 1.5, "b": [1, 2, None], "name": "ünï", "3": "int key"}
+
+
+def test_render_rows_serializes_enums():
+    rows = [(1.0, CalculationType.ADD, 2.0, 7, 3.0, None)]
+    body = render_rows(("a", "type", "b", "id", "result", "user_id"), rows)
+    assert json.loads(body) == [{"a": 1.0, "type": "add", "b": 2.0, "id": 7, "result": 3.0, "user_id": None}]
+
+
+def test_rows_response_is_json():
+    resp = rows_response(("id",), [(1,), (2,)])
+    assert resp.media_type == "application/json"
+    assert json.loads(resp.body) == [{"id": 1}, {"id": 2}]
+
+
+def test_orjson_response_render():
+    assert json.loads(ORJSONResponse({"ok": True}).body) == {"ok": True}
+
+
+def test_dumps_falls_back_to_stdlib(monkeypatch):
+    monkeypatch.setattr(responses, "orjson", None)
+    assert json.loads(dumps({"type": CalculationType.DIVIDE})) == {"type": "divide"}
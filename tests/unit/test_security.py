@@ -8,3 +8,24 @@ def test_hash_and_verify_password():
     assert hashed != plain
     assert verify_password(plain, hashed)
     assert not verify_password("wrongpassword", hashed)
+
+
+def test_crypto_libraries_are_imported_lazily():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, app.main; "
+        "print(any(m in sys.modules for m in ('jose', 'passlib', 'cryptography')))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_load_backends_imports_them():
+    import sys
+
+    from app.security import load_backends
+
+    load_backends()
+    assert "jose.jwt" in sys.modules and "passlib.context" in sys.modules
@@ -0,0 +1,48 @@
+# tests/unit/test_seed.py
+import random
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.calculation_factory import CalculationFactory
+from app.models import Calculation, CalculationType, User
+from app.security import verify_password
+from benchmarks.seed import PASSWORD, compute_results, seed_database
+
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT a, b, type, result, user_id FROM calculations ORDER BY id").all()
+
+
+def test_seed_counts_and_login_password(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    names = seed_database(engine, users=5, per_user=30, seed=1, batch_size=40)
+
+    assert len(names) == 5
+    with Session(engine) as db:
+        assert db.scalar(select(func.count(Calculation.id))) == 150
+        user = db.scalars(select(User).where(User.username == names[0])).one()
+        assert verify_password(PASSWORD, user.password_hash)
+        assert len(user.calculations) == 30
+        calc = user.calculations[0]
+        assert calc.result == CalculationFactory.get_operation(calc.type).compute(calc.a, calc.b)
+
+
+def test_seed_is_deterministic_across_batch_sizes(tmp_path):
+    first = create_engine(f"sqlite:///{tmp_path / 'one.db'}")
+    second = create_engine(f"sqlite:///{tmp_path / 'two.db'}")
+    seed_database(first, users=4, per_user=25, seed=7, batch_size=10)
+    seed_database(second, users=4, per_user=25, seed=7, batch_size=1000)
+
+    assert _rows(first) == _rows(second)
+
+
+def test_compute_results_matches_per_row_dispatch():
+    rnd = random.Random(3)
+    types = [rnd.choice(list(CalculationType)) for _ in range(200)]
+    a = [rnd.uniform(1, 100) for _ in types]
+    b = [float(rnd.randint(2, 4)) for _ in types]
+
+    expected = [CalculationFactory.get_operation(t).compute(x, y) for t, x, y in zip(types, a, b)]
+    assert compute_results(types, a, b) == expected
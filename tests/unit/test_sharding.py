@@ -0,0 +1,38 @@
+# tests/unit/test_sharding.py
+from collections import Counter
+
+import pytest
+
+from app.settings import parse_shards
+from app.sharding import HashRing
+
+
+def test_ring_is_deterministic_and_balanced():
+    ring = HashRing(["s0", "s1", "s2"])
+    counts = Counter(ring.shard_for(user_id) for user_id in range(30_000))
+    assert set(counts) == {"s0", "s1", "s2"}
+    assert all(7_000 < count < 13_000 for count in counts.values())
+    assert [HashRing(["s0", "s1", "s2"]).shard_for(u) for u in range(100)] == [ring.shard_for(u) for u in range(100)]
+
+
+def test_adding_a_shard_moves_about_one_in_n_users():
+    before = HashRing(["s0", "s1", "s2"])
+    after = HashRing(["s0", "s1", "s2", "s3"])
+    moved = [u for u in range(20_000) if before.shard_for(u) != after.shard_for(u)]
+    # only users that land on the new shard move
+    assert all(after.shard_for(u) == "s3" for u in moved)
+    assert 0.15 < len(moved) / 20_000 < 0.35
+
+
+def test_ring_needs_a_shard():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_parse_shards():
+    assert parse_shards("") == {}
+    assert parse_shards("s0=sqlite:///a.db, s1=postgresql://u:p@h/db?sslmode=require") == {
+        "s0": "sqlite:///a.db",
+        "s1": "postgresql://u:p@h/db?sslmode=require",
+    }
+    assert parse_shards("sqlite:///a.db,sqlite:///b.db") == {"shard0": "sqlite:///a.db", "shard1": "sqlite:///b.db"}
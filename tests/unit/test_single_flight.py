@@ -0,0 +1,120 @@
+# tests/unit/test_single_flight.py
+import threading
+import time
+
+from app.single_flight import SingleFlight
+
+
+def slow_call(group, key, calls, release):
+    def fn():
+        calls.append(key)
+        release.wait(5)
+        return "value"
+
+    return lambda: group.do(key, fn)
+
+
+def wait_for_waiters(group, key, count):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        call = group._calls.get(key)
+        if call is not None and call.waiters >= count:
+            return
+        time.sleep(0.001)
+    raise AssertionError("waiters never arrived")
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    group = SingleFlight()
+    calls, release = [], threading.Event()
+    target = slow_call(group, "k", calls, release)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    wait_for_waiters(group, "k", 7)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["k"]
+    assert results == ["value"] * 8
+    assert group.stats() == {"in_flight": 0, "executions": 1, "coalesced": 7, "timeouts": 0}
+
+
+def test_different_keys_run_independently():
+    group = SingleFlight()
+    assert group.do("a", lambda: 1) == 1
+    assert group.do("b", lambda: 2) == 2
+    assert group.stats()["executions"] == 2
+
+
+def test_sequential_calls_are_not_cached():
+    group = SingleFlight()
+    values = iter([1, 2])
+    assert group.do("k", lambda: next(values)) == 1
+    assert group.do("k", lambda: next(values)) == 2
+    assert group.stats()["coalesced"] == 0
+
+
+def test_error_is_fanned_out_to_waiters():
+    group = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(group.do("k", fn))
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    wait_for_waiters(group, "k", 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == []
+    assert len(errors) == 3
+    assert group.in_flight() == 0
+    # the failed call is forgotten; the next caller retries
+    assert group.do("k", lambda: "ok") == "ok"
+
+
+def test_waiter_times_out_and_runs_itself():
+    group = SingleFlight(default_timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: group.do("k", lambda: release.wait(5) and "leader"))
+    leader.start()
+    while group.in_flight() == 0:
+        time.sleep(0.001)
+
+    assert group.do("k", lambda: "own") == "own"
+    release.set()
+    leader.join()
+    assert group.stats() == {"in_flight": 0, "executions": 2, "coalesced": 0, "timeouts": 1}
+
+
+def test_per_call_timeout_overrides_default():
+    group = SingleFlight(default_timeout=60)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: group.do("k", lambda: release.wait(5)))
+    leader.start()
+    while group.in_flight() == 0:
+        time.sleep(0.001)
+    start = time.monotonic()
+    group.do("k", lambda: None, timeout=0.01)
+    assert time.monotonic() - start < 1
+    release.set()
+    leader.join()
+
+    group.reset_stats()
+    assert group.stats()["timeouts"] == 0
@@ -1,9 +1,63 @@
 # tests/unit/test_startup.py
+from app.db import Database
 from app.main import on_startup
 
-def test_on_startup_runs():
+def test_on_startup_runs(tmp_path):
     """
     Call the startup handler directly to ensure it is covered.
     It should complete without raising any exceptions.
     """
-    on_startup()
+    from sqlalchemy import inspect
+
+    db = Database(f"sqlite:///{tmp_path / 'startup.db'}")
+    on_startup(db=db)
+    assert "calculations" in inspect(db.get_engine()).get_table_names()
+
+
+def test_on_startup_skips_create_all_at_alembic_head(tmp_path):
+    from sqlalchemy import inspect, text
+
+    from app import db as database
+    from app.migrations import HEAD_REVISION
+
+    original = database.DATABASE_URL
+    database.configure(f"sqlite:///{tmp_path / 'startup.db'}")
+    try:
+        engine = database.get_engine()
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": HEAD_REVISION})
+        on_startup()
+        assert inspect(engine).get_table_names() == ["alembic_version"]
+    finally:
+        database.configure(original)
+
+
+def test_on_startup_upgrades_a_database_behind_head(tmp_path):
+    import logging
+
+    from alembic import command
+    from sqlalchemy import inspect
+
+    from app import db as database
+    from app.migrations import HEAD_REVISION, _alembic_config, current_revision
+
+    original = database.DATABASE_URL
+    url = f"sqlite:///{tmp_path / 'behind.db'}"
+    database.configure(url)
+    try:
+        engine = database.get_engine()
+        command.upgrade(_alembic_config(url), "4609aba8a69c")
+        assert "precision_mode" not in {c["name"] for c in inspect(engine).get_columns("calculations")}
+
+        app_logger, root = logging.getLogger("fastapi_calculator"), logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+
+        on_startup()
+        assert current_revision(engine) == HEAD_REVISION
+        assert "precision_mode" in {c["name"] for c in inspect(engine).get_columns("calculations")}
+        # alembic's env.py did not reconfigure the app's logging
+        assert not app_logger.disabled
+        assert root.handlers == handlers and root.level == level
+    finally:
+        database.configure(original)
@@ -0,0 +1,86 @@
+# tests/unit/test_static_assets.py
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.static_assets import IMMUTABLE, PrecompressedStaticFiles, build_assets
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    src = tmp_path / "static"
+    src.mkdir()
+    (src / "page.html").write_text("<a href='/static/other.html'>other</a> <a href='/static/missing.html'>x</a>")
+    (src / "other.html").write_text("<p>" + "other " * 200 + "</p>")
+    return src
+
+
+def test_build_assets_fingerprints_and_rewrites(source_dir):
+    manifest = build_assets(str(source_dir))
+    dist = source_dir / "dist"
+
+    assert set(manifest) == {"page.html", "other.html"}
+    assert manifest["other.html"].startswith("other.") and manifest["other.html"].endswith(".html")
+    assert json.loads((dist / "manifest.json").read_text()) == manifest
+
+    page = (dist / manifest["page.html"]).read_text()
+    assert f"/static/dist/{manifest['other.html']}" in page
+    # Unknown references are left alone
+    assert "/static/missing.html" in page
+
+    other = dist / manifest["other.html"]
+    assert gzip.decompress((dist / (manifest["other.html"] + ".gz")).read_bytes()) == other.read_bytes()
+
+
+def test_build_assets_is_deterministic_and_skips_dist(source_dir):
+    first = build_assets(str(source_dir))
+    second = build_assets(str(source_dir))
+    assert first == second
+
+
+def test_build_assets_detects_cycles(tmp_path):
+    src = tmp_path / "static"
+    src.mkdir()
+    (src / "a.html").write_text("/static/b.html")
+    (src / "b.html").write_text("/static/a.html")
+    with pytest.raises(ValueError):
+        build_assets(str(src))
+
+
+def test_precompressed_variant_served_immutable(source_dir):
+    manifest = build_assets(str(source_dir))
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(source_dir)))
+    client = TestClient(app)
+
+    url = f"/static/dist/{manifest['other.html']}"
+    resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["content-type"].startswith("text/html")
+    assert resp.headers["cache-control"] == IMMUTABLE
+    assert "other other" in resp.text
+
+    # Revalidation costs no body bytes
+    again = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": resp.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    source = client.get("/static/other.html")
+    assert source.headers["cache-control"] == "no-cache"
+
+
+def test_pages_revalidate_with_etag(client):
+    resp = client.get("/login")
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "no-cache"
+
+    again = client.get("/login", headers={"If-None-Match": resp.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
@@ -214,3 +214,41 @@ class TestStatisticsEdgeCases:
         rounded = round(avg, 2)
         
         assert rounded == 0.2
+
+
+class TestCoalescingKey:
+    """Which requests may share a statistics query."""
+
+    @pytest.fixture
+    def flight(self, monkeypatch):
+        from app import read_replica
+        from app.single_flight import SingleFlight
+
+        class Recording(SingleFlight):
+            def do(self, key, fn, timeout=None):
+                self.keys.append(key)
+                return super().do(key, fn, timeout)
+
+        flight = Recording()
+        flight.keys = []
+        monkeypatch.setattr(read_replica, "recent_writers", read_replica.RecentWriters())
+        return flight
+
+    def test_key_includes_the_read_route(self, flight):
+        from types import SimpleNamespace
+
+        from app.statistics import coalesced
+
+        coalesced(flight, ("summary", 1), SimpleNamespace(info={"replica": True}), 1, dict)
+        coalesced(flight, ("summary", 1), SimpleNamespace(info={}), 1, dict)
+        assert flight.keys == [("summary", 1, "replica"), ("summary", 1, "primary")]
+
+    def test_recent_writers_are_not_coalesced(self, flight):
+        from types import SimpleNamespace
+
+        from app import read_replica
+        from app.statistics import coalesced
+
+        read_replica.recent_writers.mark(1)
+        assert coalesced(flight, ("summary", 1), SimpleNamespace(info={}), 1, lambda: {"fresh": True}) == {"fresh": True}
+        assert flight.keys == []
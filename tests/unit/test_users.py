@@ -2,25 +2,32 @@
 Unit tests for user authentication and profile management functions.
 """
 import pytest
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock, patch
 from fastapi import HTTPException, Request
 from sqlalchemy.orm import Session
-from app.users import get_current_user
+from app.auth import get_current_user
 from app.models import User
 from app.security import hash_password
 
 
+def _request(authorization):
+    request = Mock(spec=Request)
+    request.headers.get.return_value = authorization
+    request.state = SimpleNamespace()
+    return request
+
+
 class TestGetCurrentUser:
     """Test get_current_user function."""
     
     def test_missing_authorization_header(self):
         """Test error when Authorization header is missing."""
         db = Mock(spec=Session)
-        request = Mock(spec=Request)
-        request.headers.get.return_value = None
+        request = _request(None)
         
         with pytest.raises(HTTPException) as exc_info:
-            get_current_user(db, request)
+            get_current_user(request, db)
         
         assert exc_info.value.status_code == 401
         assert exc_info.value.detail == "Missing token"
@@ -28,37 +35,34 @@ class TestGetCurrentUser:
     def test_invalid_authorization_header_format(self):
         """Test error when Authorization header doesn't start with 'Bearer '."""
         db = Mock(spec=Session)
-        request = Mock(spec=Request)
-        request.headers.get.return_value = "InvalidFormat token123"
+        request = _request("InvalidFormat token123")
         
         with pytest.raises(HTTPException) as exc_info:
-            get_current_user(db, request)
+            get_current_user(request, db)
         
         assert exc_info.value.status_code == 401
-        assert exc_info.value.detail == "Missing token"
+        assert exc_info.value.detail == "Invalid Authorization header"
     
-    @patch('app.security.decode_access_token')
+    @patch('app.auth.decode_access_token')
     def test_invalid_jwt_token(self, mock_decode):
         """Test error when JWT token is invalid."""
         from jose import JWTError
         
         db = Mock(spec=Session)
-        request = Mock(spec=Request)
-        request.headers.get.return_value = "Bearer invalid_token"
+        request = _request("Bearer invalid_token")
         mock_decode.side_effect = JWTError("Invalid token")
         
         with pytest.raises(HTTPException) as exc_info:
-            get_current_user(db, request)
+            get_current_user(request, db)
         
         assert exc_info.value.status_code == 401
         assert exc_info.value.detail == "Invalid token"
     
-    @patch('app.security.decode_access_token')
+    @patch('app.auth.decode_access_token')
     def test_user_not_found_in_database(self, mock_decode):
         """Test error when user from token doesn't exist in database."""
         db = Mock(spec=Session)
-        request = Mock(spec=Request)
-        request.headers.get.return_value = "Bearer valid_token"
+        request = _request("Bearer valid_token")
         mock_decode.return_value = {"sub": "999"}
         
         # Mock database query to return None
@@ -67,17 +71,16 @@ class TestGetCurrentUser:
         query_mock.filter.return_value.first.return_value = None
         
         with pytest.raises(HTTPException) as exc_info:
-            get_current_user(db, request)
+            get_current_user(request, db)
         
         assert exc_info.value.status_code == 401
         assert exc_info.value.detail == "User not found"
     
-    @patch('app.security.decode_access_token')
+    @patch('app.auth.decode_access_token')
     def test_successful_user_retrieval(self, mock_decode):
         """Test successful user retrieval from valid token."""
         db = Mock(spec=Session)
-        request = Mock(spec=Request)
-        request.headers.get.return_value = "Bearer valid_token"
+        request = _request("Bearer valid_token")
         mock_decode.return_value = {"sub": "1"}
         
         # Mock user object
@@ -93,8 +96,37 @@ class TestGetCurrentUser:
         db.query.return_value = query_mock
         query_mock.filter.return_value.first.return_value = mock_user
         
-        result = get_current_user(db, request)
+        result = get_current_user(request, db)
         
         assert result == mock_user
         assert result.id == 1
         assert result.username == "testuser"
+
+    @patch('app.auth.decode_access_token')
+    def test_non_numeric_subject_is_invalid_token(self, mock_decode):
+        """A token whose subject is not a user id is rejected as invalid."""
+        db = Mock(spec=Session)
+        mock_decode.return_value = {"sub": "someusername"}
+
+        with pytest.raises(HTTPException) as exc_info:
+            get_current_user(_request("Bearer valid_token"), db)
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Invalid token"
+        db.query.assert_not_called()
+
+    @patch('app.auth.decode_access_token')
+    def test_user_cached_on_request_state(self, mock_decode):
+        """A second resolution in the same request reuses request.state."""
+        db = Mock(spec=Session)
+        request = _request("Bearer valid_token")
+        mock_decode.return_value = {"sub": "1"}
+        mock_user = User(id=1, username="cached", email="cached@example.com", password_hash="x")
+        db.query.return_value.filter.return_value.first.return_value = mock_user
+
+        assert get_current_user(request, db) is mock_user
+        assert get_current_user(request, db) is mock_user
+
+        assert mock_decode.call_count == 1
+        assert db.query.call_count == 1
+        assert request.state.current_user is mock_user
@@ -0,0 +1,206 @@
+# tests/unit/test_write_behind.py
+import json
+import os
+import threading
+from decimal import Decimal
+
+import pytest
+
+from app import write_behind
+from app.models import CalculationType
+from app.write_behind import BufferFull, WriteBehindBuffer, read_spool, recover, respond_async
+
+
+def row(a=1.0, user_id=1, exact=None):
+    return {
+        "a": a, "b": 2.0, "type": CalculationType.ADD, "result": a + 2,
+        "precision_mode": "float" if exact is None else "decimal", "result_exact": exact, "user_id": user_id,
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, shard, rows):
+        with self.lock:
+            self.batches.append((shard, list(rows)))
+        return len(rows)
+
+    @property
+    def rows(self):
+        return [r for _, rows in self.batches for r in rows]
+
+
+def test_respond_async():
+    assert respond_async("respond-async")
+    assert respond_async("return=minimal, Respond-Async; wait=10")
+    assert not respond_async("return=representation")
+    assert not respond_async(None)
+
+
+def test_flushes_a_full_batch_without_waiting_for_the_interval():
+    writer = Recorder()
+    buffer = WriteBehindBuffer(batch=3, interval=30, writer=writer)
+    ids = [buffer.submit(row(a=i)) for i in range(3)]
+    assert buffer.flush(timeout=5)
+    assert len(set(ids)) == 3
+    assert writer.batches == [(None, [row(a=0), row(a=1), row(a=2)])]
+    assert buffer.stats()["batches"] == 1
+    buffer.close()
+
+
+def test_flushes_a_partial_batch_after_the_interval():
+    writer = Recorder()
+    buffer = WriteBehindBuffer(batch=100, interval=0.05, writer=writer)
+    buffer.submit(row())
+    assert buffer.flush(timeout=5)
+    assert writer.rows == [row()]
+    buffer.close()
+
+
+def fixed(places):
+    """A locator with fixed placements: {user_id: (shard, moving)}."""
+    return lambda user_ids: {user_id: places[user_id] for user_id in user_ids}
+
+
+def test_batches_are_split_by_shard():
+    writer = Recorder()
+    locator = fixed({1: ("s1", False), 2: (None, False)})
+    buffer = WriteBehindBuffer(batch=3, interval=30, writer=writer, locator=locator)
+    buffer.submit(row(a=1, user_id=1))
+    buffer.submit(row(a=2, user_id=2))
+    buffer.submit(row(a=3, user_id=1))
+    assert buffer.flush(timeout=5)
+    assert sorted((shard or "", [r["a"] for r in rows]) for shard, rows in writer.batches) == [
+        ("", [2]), ("s1", [1, 3])
+    ]
+    buffer.close()
+
+
+def test_a_failing_shard_does_not_reinsert_the_others(monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0.01)
+    writer = Recorder()
+    s1_down = threading.Event()
+    s1_down.set()
+
+    def partly_down(shard, rows):
+        if shard == "s1" and s1_down.is_set():
+            raise ConnectionError("s1 down")
+        return writer(shard, rows)
+
+    locator = fixed({1: ("s0", False), 2: ("s1", False)})
+    buffer = WriteBehindBuffer(batch=10, interval=0.01, writer=partly_down, locator=locator)
+    buffer.submit(row(a=1, user_id=1))
+    buffer.submit(row(a=2, user_id=2))
+    assert not buffer.flush(timeout=0.3)
+    assert writer.batches == [("s0", [row(a=1, user_id=1)])]
+    assert buffer.stats()["pending"] == 1
+
+    s1_down.clear()
+    assert buffer.flush(timeout=5)
+    assert writer.batches == [("s0", [row(a=1, user_id=1)]), ("s1", [row(a=2, user_id=2)])]
+    buffer.close()
+
+
+def test_rows_follow_a_moved_user_and_wait_during_the_move(monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0.01)
+    writer = Recorder()
+    places = {1: ("s0", True), 2: ("s0", False)}
+    buffer = WriteBehindBuffer(batch=10, interval=0.01, writer=writer, locator=fixed(places))
+    buffer.submit(row(a=1, user_id=1))
+    buffer.submit(row(a=2, user_id=2))
+    assert not buffer.flush(timeout=0.3)
+    assert writer.batches == [("s0", [row(a=2, user_id=2)])]
+
+    places[1] = ("s1", False)  # the move finished
+    assert buffer.flush(timeout=5)
+    assert writer.batches[-1] == ("s1", [row(a=1, user_id=1)])
+    buffer.close()
+
+
+def test_full_buffer_rejects():
+    release = threading.Event()
+
+    def slow(shard, rows):
+        release.wait(5)
+        return len(rows)
+
+    buffer = WriteBehindBuffer(batch=1, interval=0.01, capacity=2, writer=slow)
+    buffer.submit(row())
+    buffer.submit(row())
+    with pytest.raises(BufferFull):
+        buffer.submit(row())
+    assert buffer.stats()["rejected"] == 1
+    release.set()
+    assert buffer.close()
+    assert buffer.stats()["flushed"] == 2
+
+
+def test_failed_flush_keeps_rows_and_retries(monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0.01)
+    writer = Recorder()
+    attempts = []
+
+    def flaky(shard, rows):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise ConnectionError("database down")
+        return writer(shard, rows)
+
+    buffer = WriteBehindBuffer(batch=1, interval=0.01, writer=flaky)
+    buffer.submit(row())
+    assert buffer.flush(timeout=5)
+    assert writer.rows == [row()]
+    assert buffer.stats()["failures"] == 1
+    buffer.close()
+
+
+def test_spool_survives_a_dead_database_and_is_recovered(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0.01)
+
+    def down(shard, rows):
+        raise ConnectionError("database down")
+
+    buffer = WriteBehindBuffer(batch=10, interval=0.01, durability="fsync", spool_dir=str(tmp_path), writer=down)
+    buffer.submit(row(a=1, exact=Decimal("3.000000000000000000001")))
+    buffer.submit(row(a=2, user_id=2))
+    assert not buffer.close(timeout=0.2)
+
+    [spool] = os.listdir(tmp_path)
+    writer = Recorder()
+    # placements are looked up at recovery; a user mid-move still gets their rows
+    assert recover(str(tmp_path), writer=writer, locator=fixed({1: (None, False), 2: ("s1", True)})) == 2
+    assert sorted(writer.rows, key=lambda r: r["a"]) == [
+        row(a=1, exact=Decimal("3.000000000000000000001")), row(a=2, user_id=2)
+    ]
+    assert ("s1", [row(a=2, user_id=2)]) in writer.batches
+    assert os.listdir(tmp_path) == []
+
+
+def test_recover_skips_a_live_workers_spool(tmp_path):
+    buffer = WriteBehindBuffer(batch=10, interval=30, durability="spool", spool_dir=str(tmp_path), writer=Recorder())
+    buffer.submit(row())
+    assert recover(str(tmp_path), writer=Recorder()) == 0
+    assert len(os.listdir(tmp_path)) == 1
+    assert buffer.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_read_spool_skips_checkpointed_rows_and_a_torn_line(tmp_path):
+    path = tmp_path / "calculations.1.spool"
+    encoded = write_behind.encode_row(row())
+    lines = [
+        {"seq": 1, "row": encoded},
+        {"seq": 2, "row": encoded},
+        {"seq": 3, "row": encoded},
+        {"done": [2]},
+    ]
+    path.write_bytes(b"".join(json.dumps(line).encode() + b"\n" for line in lines) + b'{"seq": 4, "ro')
+    assert [seq for seq, _ in read_spool(str(path))] == [1, 3]
+
+
+def test_unknown_durability_is_rejected():
+    with pytest.raises(ValueError):
+        WriteBehindBuffer(Recorder(), durability="eventually")